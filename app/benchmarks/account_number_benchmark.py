@@ -0,0 +1,104 @@
+"""
+Stress the account number allocator and check it never hands out a number twice.
+
+Every worker runs its own AccountNumberAllocator on a fresh benchmark agency
+with concurrent callers, and the numbers of all workers are checked for
+collisions and check digits. Block size 1 is the one round trip per account
+baseline. Workers are processes sharing MONGO_URL; with the in-memory driver
+they are allocators of one process sharing the mongomock counter.
+Exits 1 when a collision or a wrong digit is found.
+
+Run from the app folder (MONGO_URL is read from .env):
+    python -m benchmarks.account_number_benchmark --workers 8 --allocations 5000
+    MONGO_DRIVER=memory python -m benchmarks.account_number_benchmark
+"""
+import os
+import asyncio
+import argparse
+
+from time import perf_counter
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+
+async def allocate(agency, block_size, allocations, concurrency):
+    """
+    Take allocations numbers with concurrent callers on one allocator.
+    Returns:
+        list: (account_number, account_digit) pairs.
+    """
+    from services.account_numbers import AccountNumberAllocator
+
+    allocator = AccountNumberAllocator(agency=agency, block_size=block_size, start=1000000)
+    numbers = []
+
+    async def caller(count):
+        for _ in range(count):
+            numbers.extend(await allocator.allocate())
+
+    share, extra = divmod(allocations, concurrency)
+    await asyncio.gather(*(caller(share + (index < extra)) for index in range(concurrency)))
+    return numbers
+
+
+def process_worker(agency, block_size, allocations, concurrency):
+    return asyncio.run(allocate(agency, block_size, allocations, concurrency))
+
+
+async def in_process_workers(agency, block_size, allocations, concurrency, workers):
+    return await asyncio.gather(*(
+        allocate(agency, block_size, allocations, concurrency) for _ in range(workers)
+    ))
+
+
+def run(block_size, args):
+    """
+    Allocate with every worker and check the numbers.
+    Returns:
+        tuple: (seconds, numbers, collisions, bad digits)
+    """
+    from database import Collections
+    from database.base import get_sync_database
+    from services.account_numbers import check_digit
+
+    agency = f"bench-{os.getpid()}-{block_size}"
+    started = perf_counter()
+
+    if os.environ.get("MONGO_DRIVER") == "memory":
+        results = asyncio.run(in_process_workers(agency, block_size, args.allocations, args.concurrency, args.workers))
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            results = list(executor.map(
+                process_worker,
+                *zip(*[(agency, block_size, args.allocations, args.concurrency)] * args.workers)
+            ))
+
+    seconds = perf_counter() - started
+    numbers = [pair for result in results for pair in result]
+    collisions = sum(count - 1 for count in Counter(number for number, _ in numbers).values() if count > 1)
+    bad_digits = sum(digit != check_digit(number) for number, digit in numbers)
+
+    get_sync_database()[Collections.COUNTERS].delete_one({"_id": f"account_number:{agency}"})
+    return seconds, len(numbers), collisions, bad_digits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--allocations", type=int, default=2000, help="numbers per worker")
+    parser.add_argument("--concurrency", type=int, default=16, help="callers per worker")
+    parser.add_argument("--block-sizes", default="1,100,1000")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'block size':>10} {'numbers':>10} {'numbers/s':>12} {'collisions':>11} {'bad digits':>11}")
+    for block_size in map(int, args.block_sizes.split(",")):
+        seconds, numbers, collisions, bad_digits = run(block_size, args)
+        failed = failed or collisions or bad_digits
+        print(f"{block_size:>10} {numbers:>10} {numbers / seconds:>12.0f} {collisions:>11} {bad_digits:>11}")
+
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+CPU cost against bytes saved of each response encoding on our typical payloads.
+
+Payloads are a GET /users/{user_id}/ profile, a default and a max size
+accounts and address page, and an export chunk of NDJSON users, rendered with
+FastJSONResponse like the API does. Each encoding and level compresses the
+whole body once per run; br and zstd need the brotli and zstandard packages
+and are skipped without them.
+
+Run from the app folder:
+    python -m benchmarks.compression_benchmark --number 200
+"""
+import argparse
+
+from timeit import timeit
+
+from settings import settings
+
+from services.compression import GzipCompressor, BrotliCompressor, ZstdCompressor
+
+from utils.responses import FastJSONResponse
+
+from benchmarks.encoding_benchmark import build_user_payload
+
+
+ENCODINGS = [
+    ("gzip 1", lambda: GzipCompressor(1)),
+    ("gzip 6", lambda: GzipCompressor(6)),
+    ("gzip 9", lambda: GzipCompressor(9)),
+    ("br 4", lambda: BrotliCompressor(4)),
+    ("br 11", lambda: BrotliCompressor(11)),
+    ("zstd 3", lambda: ZstdCompressor(3)),
+    ("zstd 19", lambda: ZstdCompressor(19)),
+]
+
+
+def render(content):
+    return FastJSONResponse(content=content).body
+
+
+def build_payloads(export_users):
+    """
+    Render the typical response bodies.
+    Args:
+        export_users (int): Users in the export chunk.
+    Returns:
+        dict: name to body.
+    """
+    default_page = build_user_payload(settings.PAGE_SIZE_DEFAULT)
+    max_page = build_user_payload(settings.PAGE_SIZE_MAX)
+    return {
+        "user profile": render(build_user_payload(settings.USER_VIEW_PAGE_SIZE)),
+        f"accounts page {settings.PAGE_SIZE_DEFAULT}": render(default_page["accounts"]),
+        f"accounts page {settings.PAGE_SIZE_MAX}": render(max_page["accounts"]),
+        f"address page {settings.PAGE_SIZE_DEFAULT}": render(default_page["address"]),
+        f"address page {settings.PAGE_SIZE_MAX}": render(max_page["address"]),
+        f"export {export_users} users": b"".join(
+            render(build_user_payload(2)) + b"\n" for _ in range(export_users)
+        ),
+    }
+
+
+def available_encodings():
+    encodings = []
+    for name, factory in ENCODINGS:
+        try:
+            factory()
+
+        except ImportError:
+            print(f"{name}: skipped, package not installed")
+            continue
+
+        encodings.append((name, factory))
+    return encodings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument("--export-users", type=int, default=100)
+    args = parser.parse_args()
+
+    encodings = available_encodings()
+    print(f"\n{'payload':22} {'encoding':9} {'bytes':>9} {'ratio':>7} {'us/resp':>9} {'MB/s':>8} {'KB saved/ms':>12}")
+    for payload_name, body in build_payloads(args.export_users).items():
+        print(f"{payload_name:22} {'identity':9} {len(body):>9}")
+        for name, factory in encodings:
+            compressed = factory().compress(body, final=True)
+            seconds = timeit(lambda: factory().compress(body, final=True), number=args.number) / args.number
+            saved = (len(body) - len(compressed)) / 1024
+            print(
+                f"{'':22} {name:9} {len(compressed):>9} {len(body) / len(compressed):>6.1f}x"
+                f" {seconds * 1e6:>9.1f} {len(body) / seconds / 2 ** 20:>8.1f} {saved / (seconds * 1000):>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
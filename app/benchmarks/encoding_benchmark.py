@@ -0,0 +1,93 @@
+"""
+Compare jsonable_encoder + JSONResponse against FastJSONResponse on user payloads.
+
+Run from the app folder:
+    python -m benchmarks.encoding_benchmark --children 10 --number 2000
+"""
+import argparse
+
+from timeit import timeit
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from models import AccountTypeEnum, DocumentTypeEnum
+from models.users.users_model import User
+from models.users.users_address_model import Address
+from models.users.users_bank_account_model import BankAccount
+from models.users.users_documents_model import Documents
+
+from utils.responses import FastJSONResponse
+
+
+def build_user_payload(children):
+    """
+    Build a GET /users/{user_id}/ payload shaped like get_user_by_id.
+    Args:
+        children (int): Accounts, documents and addresses per user.
+    """
+    user = User(
+        first_name="luck",
+        last_name="bank",
+        email="luck@bank.com",
+        password="hash",
+        phone="5511999999999",
+    ).dict(exclude={"password"})
+    user_id = user["id"]
+
+    accounts = [
+        BankAccount(
+            user_id=user_id,
+            account_type=AccountTypeEnum.CHECKING,
+            account_number=1000000 + index,
+            account_digit=0,
+        ).dict()
+        for index in range(children)
+    ]
+    documents = [
+        Documents(user_id=user_id, document_type=DocumentTypeEnum.PASSPORT, document_number=str(index)).dict()
+        for index in range(children)
+    ]
+    addresses = [
+        Address(
+            user_id=user_id,
+            street="paulista avenue",
+            number=str(index),
+            complement=None,
+            neighborhood="bela vista",
+            city="sao paulo",
+            state="sp",
+            country="brazil",
+            zip_code="01310-100",
+        ).dict()
+        for index in range(children)
+    ]
+
+    user["accounts"] = {"count": children, "items": accounts, "next": None}
+    user["documents"] = {"count": children, "items": documents, "next": None}
+    user["address"] = {"count": children, "items": addresses, "next": None}
+    return user
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--children", type=int, default=10)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    payload = build_user_payload(args.children)
+
+    legacy = JSONResponse(content=jsonable_encoder(payload)).body
+    fast = FastJSONResponse(content=payload).body
+    print(f"payload: {len(legacy)} bytes (jsonable_encoder), {len(fast)} bytes (orjson)")
+
+    legacy_time = timeit(lambda: JSONResponse(content=jsonable_encoder(payload)), number=args.number)
+    fast_time = timeit(lambda: FastJSONResponse(content=payload), number=args.number)
+
+    print(f"jsonable_encoder + json: {legacy_time / args.number * 1e6:.1f}us per response")
+    print(f"orjson: {fast_time / args.number * 1e6:.1f}us per response")
+    print(f"speedup: {legacy_time / fast_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
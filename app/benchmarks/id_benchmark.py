@@ -0,0 +1,120 @@
+"""
+Insert throughput with random uuid4 ids against time-ordered uuid7 ids.
+
+Each scheme inserts the same account documents with insert_many into a fresh
+collection carrying the account indexes, then reports documents per second
+per phase and the size of the id index. Random ids land anywhere in the
+B-tree once it outgrows the cache, time-ordered ids append to its right edge,
+so the gap grows with --documents. The in-memory driver has no B-tree and
+only shows the id generation cost.
+
+Run from the app folder (MONGO_URL is read from .env):
+    python -m benchmarks.id_benchmark --documents 1000000 --batch-size 1000
+    MONGO_DRIVER=memory python -m benchmarks.id_benchmark --documents 20000
+"""
+import asyncio
+import argparse
+
+from uuid import uuid4
+from time import perf_counter
+from timeit import timeit
+from datetime import datetime
+
+from pymongo.errors import OperationFailure
+
+
+SCHEMES = {
+    "uuid4": lambda: str(uuid4()),
+}
+
+
+def account(document_id, index):
+    now = datetime.now()
+    return {
+        "id": document_id,
+        "user_id": "benchmark",
+        "account_type": "CHECKING",
+        "account_number": 1000000 + index,
+        "account_digit": 0,
+        "agency": "bench",
+        "agency_digit": 0,
+        "status": "PENDING",
+        "created_at": now,
+        "updated_at": now,
+        "deleted_at": "",
+    }
+
+
+async def insert(database, name, make_id, args):
+    """
+    Insert --documents accounts into a fresh collection.
+    Returns:
+        tuple: (documents per second of each phase, id index bytes or None)
+    """
+    from database.indexes import INDEXES
+    from database.collections import Collections
+
+    collection = database[f"benchmark_ids_{name}"]
+    await collection.drop()
+    await collection.create_indexes(INDEXES[Collections.USER_BANK_ACCOUNTS])
+
+    phase_size = args.documents // args.phases
+    rates = []
+    for phase in range(args.phases):
+        started = perf_counter()
+        for offset in range(0, phase_size, args.batch_size):
+            first = phase * phase_size + offset
+            await collection.insert_many(
+                [account(make_id(), index) for index in range(first, first + min(args.batch_size, phase_size - offset))],
+                ordered=False,
+            )
+        rates.append(phase_size / (perf_counter() - started))
+
+    try:
+        stats = await database.command({"collStats": collection.name})
+        index_size = stats["indexSizes"].get("id_unique")
+
+    except (OperationFailure, KeyError, NotImplementedError):
+        index_size = None
+
+    if not args.keep:
+        await collection.drop()
+    return rates, index_size
+
+
+async def run(args):
+    from database import database
+
+    results = {}
+    for name, make_id in SCHEMES.items():
+        results[name] = await insert(database, name, make_id, args)
+    return results
+
+
+def main():
+    from utils.ids import new_id
+
+    SCHEMES["uuid7"] = new_id
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--phases", type=int, default=4, help="report throughput as the indexes grow")
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark collections")
+    args = parser.parse_args()
+
+    print(f"{'scheme':8} {'us/id':>8}")
+    for name, make_id in SCHEMES.items():
+        print(f"{name:8} {timeit(make_id, number=100000) / 100000 * 1e6:>8.2f}")
+
+    results = asyncio.run(run(args))
+
+    phases = " ".join(f"{f'phase {phase + 1} docs/s':>16}" for phase in range(args.phases))
+    print(f"\n{'scheme':8} {phases} {'id index MB':>12}")
+    for name, (rates, index_size) in results.items():
+        size = f"{index_size / 2 ** 20:.1f}" if index_size else "-"
+        print(f"{name:8} {' '.join(f'{rate:>16.0f}' for rate in rates)} {size:>12}")
+
+
+if __name__ == "__main__":
+    main()
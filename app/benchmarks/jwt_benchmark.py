@@ -0,0 +1,73 @@
+"""
+Tokens verified per second on one core.
+
+Compares the fastapi_jwt_auth path, which parses the PEM public key and
+checks the signature on every call, with the key objects of token_verifier,
+with and without the verified token memo. Per request numbers run
+jwt_required and get_jwt_subject, like require_user, on the base AuthJWT and
+on services.oauth2.AuthJWT.
+
+Run from the app folder (JWT settings are read from .env):
+    python -m benchmarks.jwt_benchmark --number 2000
+"""
+import argparse
+
+from time import perf_counter
+from datetime import timedelta
+
+
+def rate(call, number):
+    started = perf_counter()
+    for _ in range(number):
+        call()
+    return number / (perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    from fastapi_jwt_auth import AuthJWT as BaseAuthJWT
+
+    from services.oauth2 import AuthJWT, JWTSettings
+    from services.token_verifier import TokenVerifier, token_verifier
+
+    BaseAuthJWT.load_config(JWTSettings)
+    BaseAuthJWT.token_in_denylist_loader(AuthJWT._token_in_denylist_callback)
+
+    token = AuthJWT().create_access_token(subject="benchmark", expires_time=timedelta(minutes=15))
+    uncached = TokenVerifier(
+        algorithm=token_verifier.algorithm,
+        private_key=token_verifier.signing_key,
+        public_key=token_verifier.public_key,
+        key_id=token_verifier.key_id,
+        cache_size=0,
+    )
+
+    def request(auth_class):
+        def call():
+            authorize = auth_class()
+            authorize._token = token
+            authorize.jwt_required()
+            authorize.get_jwt_subject()
+        return call
+
+    print(f"{'per token':36} {'tokens/s':>10}")
+    for name, call in (
+        ("PEM parsed per call", lambda: BaseAuthJWT()._verified_token(token)),
+        ("cached key object", lambda: uncached.verify(token)),
+        ("cached key object, memo hit", lambda: token_verifier.verify(token)),
+    ):
+        print(f"{name:36} {rate(call, args.number):>10.0f}")
+
+    print(f"\n{'per request':36} {'requests/s':>10}")
+    for name, call in (
+        ("fastapi_jwt_auth AuthJWT", request(BaseAuthJWT)),
+        ("services.oauth2 AuthJWT", request(AuthJWT)),
+    ):
+        print(f"{name:36} {rate(call, args.number):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Latency and throughput benchmark for every router.
+
+Boots the app from main.py against the in-memory database and drives a
+realistic mix: register, login, fetch profile, list accounts and documents,
+and address CRUD. Reports p50/p95/p99 latency, throughput and peak allocated
+memory per endpoint, and saves the results as JSON so versions can be diffed.
+
+Run from the app folder (JWT settings are read from .env):
+    python -m benchmarks.load_benchmark --users 10 --requests 2000 --concurrency 20
+    python -m benchmarks.load_benchmark --compare bench-1.0.0.json
+"""
+import os
+import json
+import random
+import asyncio
+import argparse
+import tracemalloc
+
+from time import perf_counter
+from datetime import datetime
+from collections import defaultdict
+
+
+PROFILE_MIX = [
+    ("GET /users/{user_id}/", 30),
+    ("GET /users/{user_id}/accounts/", 20),
+    ("GET /users/{user_id}/documents/", 10),
+    ("GET /users/{user_id}/address/", 15),
+    ("POST /users/{user_id}/address/", 10),
+    ("GET /users/{user_id}/address/{address_id}/", 5),
+    ("PATCH /users/{user_id}/address/{address_id}/", 5),
+    ("DELETE /users/{user_id}/address/{address_id}/", 5),
+]
+
+
+def percentile(samples, rank):
+    """
+    Nearest-rank percentile.
+    Args:
+        samples (list): Sorted samples.
+        rank (int): The percentile, 0 to 100.
+    """
+    if not samples:
+        return 0
+    index = max(int(round(rank / 100 * len(samples))) - 1, 0)
+    return samples[min(index, len(samples) - 1)]
+
+
+def address_payload(index):
+    return {
+        "street": "paulista avenue",
+        "number": str(index),
+        "complement": None,
+        "neighborhood": "bela vista",
+        "city": "sao paulo",
+        "state": "sp",
+        "country": "brazil",
+        "zip_code": "01310-100",
+    }
+
+
+def register_payload(index):
+    return {
+        "first_name": "luck",
+        "last_name": f"user{index}",
+        "email": f"user{index}@luckbank.com",
+        "password": "benchmark-password",
+        "confirm_password": "benchmark-password",
+        "phone": "5511999999999",
+        "documents": [{"document_type": "PASSPORT", "document_number": f"P{index}"}],
+        "address": [address_payload(number) for number in range(3)],
+        "accounts": [{"account_type": "CHECKING"}, {"account_type": "SAVINGS"}],
+    }
+
+
+class Recorder:
+    """
+    Collects latency and allocation samples per endpoint label.
+    """
+    def __init__(self, track_allocations):
+        self.track_allocations = track_allocations
+        self.latencies = defaultdict(list)
+        self.allocations = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    async def request(self, client, label, method, url, **kwargs):
+        if self.track_allocations:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+
+        started = perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[label].append(perf_counter() - started)
+
+        if self.track_allocations:
+            self.allocations[label].append(tracemalloc.get_traced_memory()[1] - before)
+
+        self.statuses[label][response.status_code] += 1
+        return response
+
+    def report(self, elapsed):
+        endpoints = {}
+        for label, samples in sorted(self.latencies.items()):
+            samples = sorted(samples)
+            allocations = self.allocations.get(label) or [0]
+            endpoints[label] = {
+                "count": len(samples),
+                "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+                "p50_ms": round(percentile(samples, 50) * 1000, 3),
+                "p95_ms": round(percentile(samples, 95) * 1000, 3),
+                "p99_ms": round(percentile(samples, 99) * 1000, 3),
+                "throughput_rps": round(len(samples) / elapsed.get(label, sum(samples)), 1),
+                "peak_alloc_kib": round(sum(allocations) / len(allocations) / 1024, 1),
+                "statuses": dict(self.statuses[label]),
+            }
+        return endpoints
+
+
+async def run(args):
+    from httpx import ASGITransport, AsyncClient
+
+    from main import app, lifespan
+    from database import database, Collections
+    from services.principal_cache import principal_cache
+
+    recorder = Recorder(args.allocations)
+    elapsed = {}
+    random.seed(args.seed)
+
+    async with lifespan(app):
+        run_started = perf_counter()
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            started = perf_counter()
+            for index in range(args.users):
+                await recorder.request(client, "POST /register/", "POST", "/register/", json=register_payload(index))
+            elapsed["POST /register/"] = perf_counter() - started
+
+            await database[Collections.USERS].update_many({}, {"$set": {"is_active": True}})
+            principal_cache.clear()
+
+            sessions = []
+            started = perf_counter()
+            for index in range(args.users):
+                response = await recorder.request(
+                    client, "POST /login/", "POST", "/login/",
+                    json={"email": f"user{index}@luckbank.com", "password": "benchmark-password"}
+                )
+                access_token = response.json()["access_token"]
+                profile = await client.get("/user_details/", headers={"Authorization": f"Bearer {access_token}"})
+                sessions.append({
+                    "user_id": profile.json()["id"],
+                    "headers": {"Authorization": f"Bearer {access_token}"},
+                    "addresses": [],
+                    "next_number": 1000,
+                })
+            elapsed["POST /login/"] = perf_counter() - started
+
+            labels = [label for label, _ in PROFILE_MIX]
+            weights = [weight for _, weight in PROFILE_MIX]
+            queue = asyncio.Queue()
+            for _ in range(args.requests):
+                queue.put_nowait((random.choice(sessions), random.choices(labels, weights)[0]))
+
+            async def worker():
+                while not queue.empty():
+                    session, label = queue.get_nowait()
+                    await drive(client, recorder, session, label)
+
+            started = perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            mixed = perf_counter() - started
+            for label in labels:
+                elapsed[label] = mixed
+
+        wall = perf_counter() - run_started
+
+    total = sum(len(samples) for samples in recorder.latencies.values())
+    return recorder.report(elapsed), total / wall
+
+
+async def drive(client, recorder, session, label):
+    """
+    Send one request of the mix, falling back to a create when no address is known.
+    """
+    user_id = session["user_id"]
+    headers = session["headers"]
+    method, _ = label.split(" ", 1)
+
+    if "{address_id}" in label and not session["addresses"]:
+        label, method = "POST /users/{user_id}/address/", "POST"
+
+    if label == "POST /users/{user_id}/address/":
+        session["next_number"] += 1
+        response = await recorder.request(
+            client, label, method, f"/users/{user_id}/address/",
+            headers=headers, json=address_payload(session["next_number"])
+        )
+        if response.status_code == 201:
+            session["addresses"].append(response.json()["payload"]["id"])
+        return
+
+    if "{address_id}" in label:
+        address_id = random.choice(session["addresses"])
+        url = f"/users/{user_id}/address/{address_id}/"
+        if method == "PATCH":
+            await recorder.request(client, label, method, url, headers=headers, json={"complement": "apt 1"})
+        elif method == "DELETE":
+            session["addresses"].remove(address_id)
+            await recorder.request(client, label, method, url, headers=headers)
+        else:
+            await recorder.request(client, label, method, url, headers=headers)
+        return
+
+    await recorder.request(client, label, method, label.split(" ", 1)[1].format(user_id=user_id), headers=headers)
+
+
+def compare(current, previous):
+    """
+    Print p95 and throughput changes against a previous result file.
+    """
+    for label, stats in current["endpoints"].items():
+        old = previous["endpoints"].get(label)
+        if not old:
+            continue
+        p95 = (stats["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0
+        print(f"{label:50} p95 {old['p95_ms']:>8}ms -> {stats['p95_ms']:>8}ms ({p95:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--allocations", action="store_true", help="track peak allocations, process wide so use --concurrency 1 for per request numbers")
+    parser.add_argument("--output", help="result file, defaults to bench-<version>.json")
+    parser.add_argument("--compare", help="previous result file to diff against")
+    args = parser.parse_args()
+
+    os.environ.setdefault("MONGO_DRIVER", "memory")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    from version import __version__
+
+    if args.allocations:
+        tracemalloc.start()
+
+    endpoints, throughput = asyncio.run(run(args))
+
+    result = {
+        "version": __version__,
+        "driver": os.environ["MONGO_DRIVER"],
+        "created_at": datetime.now().isoformat(),
+        "config": {"users": args.users, "requests": args.requests, "concurrency": args.concurrency},
+        "throughput_rps": round(throughput, 1),
+        "endpoints": endpoints,
+    }
+
+    for label, stats in endpoints.items():
+        print(
+            f"{label:50} n={stats['count']:<6} p50={stats['p50_ms']:>8}ms p95={stats['p95_ms']:>8}ms "
+            f"p99={stats['p99_ms']:>8}ms {stats['throughput_rps']:>8}rps {stats['peak_alloc_kib']:>8}KiB"
+        )
+
+    output = args.output or f"bench-{__version__}.json"
+    with open(output, "w", encoding="utf-8") as result_file:
+        json.dump(result, result_file, indent=2)
+    print(f"saved {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as previous_file:
+            compare(result, json.load(previous_file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Cost of logging, per call and per request.
+
+Per call: an eager f-string on a synchronous StreamHandler (the old Logger)
+against lazy %-style arguments on the queue pipeline, sampled out and below
+the level. Per request: the mean latency of the load benchmark mix with
+logging disabled, written synchronously, and sent through the queue pipeline.
+Records are written to --log-file, /dev/null by default.
+
+Run from the app folder (JWT settings are read from .env):
+    python -m benchmarks.logging_benchmark --number 100000 --requests 1000
+    python -m benchmarks.logging_benchmark --log-file /tmp/luck-bank.log
+"""
+import os
+import asyncio
+import logging
+import argparse
+
+from timeit import timeit
+
+
+LOG_FILE = os.devnull
+
+PAYLOAD = {"first_name": "luck", "last_name": "bank", "email": "luck@bank.com", "phone": "5511999999999"}
+
+
+def log_stream():
+    return open(LOG_FILE, "a", encoding="utf-8")
+
+
+def sync_handler():
+    from utils.logger import TEXT_FORMAT
+
+    handler = logging.StreamHandler(log_stream())
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    return handler
+
+
+def use_sync_handler():
+    """
+    Write the app records in the calling thread, like the old Logger did.
+    """
+    from utils.logger import LogPipeline
+
+    LogPipeline.root.removeHandler(LogPipeline.handler)
+    LogPipeline.root.addHandler(sync_handler())
+
+
+def use_queue_handler():
+    from utils.logger import LogPipeline
+
+    LogPipeline.start()
+    for handler in list(LogPipeline.root.handlers):
+        LogPipeline.root.removeHandler(handler)
+    LogPipeline.root.addHandler(LogPipeline.handler)
+    LogPipeline.listener.handlers[0].setStream(log_stream())
+
+
+def per_call(number):
+    """
+    Time one info call in each style.
+    Args:
+        number (int): Calls per style.
+    """
+    from utils.logger import Logger
+
+    sync_logger = logging.getLogger("benchmark.sync")
+    sync_logger.propagate = False
+    sync_logger.setLevel(logging.INFO)
+    sync_logger.addHandler(sync_handler())
+
+    logger = Logger.init(__name__)
+    use_queue_handler()
+
+    cases = [
+        ("sync handler, f-string", lambda: sync_logger.info(f"update user by id ->: {1}\npayload: {PAYLOAD}")),
+        ("queue handler, %-style", lambda: logger.info("update user by id ->: %s payload: %s", 1, PAYLOAD)),
+        ("queue handler, sampled out", lambda: logger.info("update user by id ->: %s payload: %s", 1, PAYLOAD)),
+        ("below level, f-string", lambda: logger.debug(f"update user by id ->: {1}\npayload: {PAYLOAD}")),
+        ("below level, %-style", lambda: logger.debug("update user by id ->: %s payload: %s", 1, PAYLOAD)),
+    ]
+
+    print(f"{'per call':30} {'us/call':>10}")
+    for name, case in cases:
+        Logger.set_sample_rate(0 if "sampled" in name else 1)
+        seconds = timeit(case, number=number)
+        print(f"{name:30} {seconds / number * 1e6:>10.2f}")
+    Logger.set_sample_rate(1)
+
+
+def per_request(requests, users):
+    """
+    Run the load benchmark mix once per logging mode.
+    Args:
+        requests (int): Requests of the mixed phase.
+        users (int): Registered users.
+    """
+    from benchmarks.load_benchmark import PROFILE_MIX, run
+
+    args = argparse.Namespace(users=users, requests=requests, concurrency=1, seed=42, allocations=False)
+    modes = [
+        ("disabled", lambda: logging.disable(logging.CRITICAL)),
+        ("sync handler", use_sync_handler),
+        ("queue handler", use_queue_handler),
+    ]
+
+    baseline = None
+    print(f"\n{'per request':30} {'us/request':>12} {'logging us':>12}")
+    for name, setup in modes:
+        logging.disable(logging.NOTSET)
+        setup()
+        endpoints, _ = asyncio.run(run(args))
+        mix = [endpoints[label] for label, _ in PROFILE_MIX if label in endpoints]
+        cost = sum(stats["mean_ms"] * stats["count"] for stats in mix) / sum(stats["count"] for stats in mix) * 1000
+        baseline = cost if baseline is None else baseline
+        print(f"{name:30} {cost:>12.1f} {cost - baseline:>12.1f}")
+    logging.disable(logging.NOTSET)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--log-file", default=os.devnull)
+    args = parser.parse_args()
+
+    global LOG_FILE
+    LOG_FILE = args.log_file
+
+    os.environ.setdefault("MONGO_DRIVER", "memory")
+    os.environ.setdefault("PASSWORD_POOL_SIZE", "0")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    per_call(args.number)
+    per_request(args.requests, args.users)
+
+
+if __name__ == "__main__":
+    main()
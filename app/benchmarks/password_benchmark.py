@@ -0,0 +1,64 @@
+"""
+Compare bcrypt throughput inline against the process pool.
+
+Run from the app folder:
+    python -m benchmarks.password_benchmark --requests 64 --concurrency 16
+"""
+import asyncio
+import argparse
+
+from os import cpu_count
+from time import perf_counter
+
+from services.password import Password, PasswordPool
+
+
+PASSWORD = "benchmark-password"
+
+
+async def run_inline(requests):
+    """
+    Hash on the event loop, as the sync handlers did on each request thread.
+    """
+    started = perf_counter()
+    for _ in range(requests):
+        Password.get_password_hash(PASSWORD)
+    return perf_counter() - started
+
+
+async def run_pooled(requests, concurrency, workers):
+    """
+    Hash through the process pool with concurrent callers.
+    """
+    pool = PasswordPool(max_workers=workers, max_pending=requests)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def hash_one():
+        async with semaphore:
+            await pool.get_password_hash(PASSWORD)
+
+    await pool.get_password_hash(PASSWORD)
+
+    started = perf_counter()
+    await asyncio.gather(*(hash_one() for _ in range(requests)))
+    elapsed = perf_counter() - started
+    pool.shutdown()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=cpu_count())
+    args = parser.parse_args()
+
+    inline = asyncio.run(run_inline(args.requests))
+    pooled = asyncio.run(run_pooled(args.requests, args.concurrency, args.workers))
+
+    print(f"inline: {args.requests / inline:.1f} hashes/s ({inline:.2f}s)")
+    print(f"pooled ({args.workers} workers): {args.requests / pooled:.1f} hashes/s ({pooled:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Measure app import time and lifespan startup time.
+
+Importing must not touch the network, startup opens the worker client,
+pings the server and creates the indexes.
+
+Run from the app folder:
+    python -m benchmarks.startup_benchmark --runs 5
+"""
+import sys
+import asyncio
+import argparse
+import subprocess
+
+from time import perf_counter
+from statistics import median
+
+
+IMPORT_SCRIPT = "import time; started = time.perf_counter(); import main; print(time.perf_counter() - started)"
+
+
+def measure_import():
+    """
+    Import main in a fresh interpreter so module caches do not hide the cost.
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+async def measure_startup():
+    """
+    Run the lifespan startup and shutdown once.
+    """
+    from main import app, lifespan
+
+    started = perf_counter()
+    async with lifespan(app):
+        elapsed = perf_counter() - started
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    startups = [asyncio.run(measure_startup()) for _ in range(args.runs)]
+
+    print(f"import main: median {median(imports) * 1000:.1f}ms, max {max(imports) * 1000:.1f}ms")
+    print(f"lifespan startup: median {median(startups) * 1000:.1f}ms, max {max(startups) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+from starlette.concurrency import run_in_threadpool
+
+
+ASYNC_COLLECTION_METHODS = {
+    "bulk_write",
+    "count_documents",
+    "create_index",
+    "create_indexes",
+    "delete_many",
+    "delete_one",
+    "distinct",
+    "drop",
+    "drop_index",
+    "estimated_document_count",
+    "find_one",
+    "find_one_and_update",
+    "index_information",
+    "insert_many",
+    "insert_one",
+    "replace_one",
+    "update_many",
+    "update_one",
+}
+
+
+def _next_document(cursor):
+    """
+    Get the next document of a sync cursor or None when exhausted.
+    Args:
+        cursor (Cursor): The sync cursor.
+    """
+    return next(cursor, None)
+
+
+def _drain(cursor, length):
+    """
+    Read up to length documents from a sync cursor.
+    Args:
+        cursor (Cursor): The sync cursor.
+        length (int): Max documents to read, None reads everything.
+    """
+    if length is None:
+        return list(cursor)
+
+    documents = []
+    for document in cursor:
+        documents.append(document)
+        if len(documents) >= length:
+            break
+    return documents
+
+
+class AsyncCursor:
+    """
+    Motor-like cursor over a blocking pymongo compatible cursor.
+    Args:
+        factory (callable): Builds the sync cursor when it is first read.
+    """
+    def __init__(self, factory):
+        self._factory = factory
+        self._chain = []
+        self._cursor = None
+
+    def _chained(self, method, *args, **kwargs):
+        self._chain.append((method, args, kwargs))
+        return self
+
+    def sort(self, *args, **kwargs):
+        return self._chained("sort", *args, **kwargs)
+
+    def skip(self, *args, **kwargs):
+        return self._chained("skip", *args, **kwargs)
+
+    def limit(self, *args, **kwargs):
+        return self._chained("limit", *args, **kwargs)
+
+    def batch_size(self, *args, **kwargs):
+        return self._chained("batch_size", *args, **kwargs)
+
+    def _get_cursor(self):
+        if self._cursor is None:
+            cursor = self._factory()
+            for method, args, kwargs in self._chain:
+                cursor = getattr(cursor, method)(*args, **kwargs)
+            self._cursor = cursor
+        return self._cursor
+
+    async def to_list(self, length=None):
+        """
+        Read the cursor into a list.
+        Args:
+            length (int): Max documents to read, None reads everything.
+        """
+        return await run_in_threadpool(lambda: _drain(self._get_cursor(), length))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        document = await run_in_threadpool(lambda: _next_document(self._get_cursor()))
+        if document is None:
+            raise StopAsyncIteration
+        return document
+
+
+class AsyncCollection:
+    """
+    Motor-like collection running a blocking collection in the threadpool.
+    Args:
+        collection (Collection): The pymongo compatible collection.
+    """
+    def __init__(self, collection):
+        self.delegate = collection
+
+    @property
+    def name(self):
+        return self.delegate.name
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(lambda: self.delegate.find(*args, **kwargs))
+
+    def aggregate(self, pipeline, *args, **kwargs):
+        return AsyncCursor(lambda: self.delegate.aggregate(pipeline, *args, **kwargs))
+
+    def __getattr__(self, name):
+        if name not in ASYNC_COLLECTION_METHODS:
+            raise AttributeError(name)
+
+        method = getattr(self.delegate, name)
+
+        async def call(*args, **kwargs):
+            return await run_in_threadpool(method, *args, **kwargs)
+
+        return call
+
+
+class AsyncDatabase:
+    """
+    Motor-like database over a blocking database.
+    Args:
+        database (Database): The pymongo compatible database.
+    """
+    def __init__(self, database):
+        self.delegate = database
+
+    @property
+    def name(self):
+        return self.delegate.name
+
+    def __getitem__(self, name):
+        return AsyncCollection(self.delegate[name])
+
+    async def command(self, *args, **kwargs):
+        return await run_in_threadpool(self.delegate.command, *args, **kwargs)
+
+    async def list_collection_names(self, *args, **kwargs):
+        return await run_in_threadpool(self.delegate.list_collection_names, *args, **kwargs)
+
+
+class AsyncClient:
+    """
+    Motor-like client over a blocking pymongo compatible client.
+    Keeps the sync driver and the in-memory backend usable from async controllers.
+    Args:
+        client (MongoClient): The pymongo compatible client.
+    """
+    def __init__(self, client):
+        self.delegate = client
+
+    def __getitem__(self, name):
+        return AsyncDatabase(self.delegate[name])
+
+    def close(self):
+        self.delegate.close()
@@ -0,0 +1,193 @@
+import os
+import socket
+import asyncio
+
+from datetime import datetime, timedelta
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+
+from settings import settings
+
+from database import database, Collections
+
+from utils.logger import Logger, LogPipeline
+
+
+logger = Logger.init(__name__)
+
+ARCHIVES = {
+    Collections.USER_ADDRESSES: Collections.USER_ADDRESSES_ARCHIVE,
+    Collections.USER_DOCUMENTS: Collections.USER_DOCUMENTS_ARCHIVE,
+    Collections.USER_BANK_ACCOUNTS: Collections.USER_BANK_ACCOUNTS_ARCHIVE,
+}
+
+ARCHIVER_LEASE = "archiver"
+
+
+async def archive_collection(collection, cutoff, batch_size=settings.ARCHIVE_BATCH_SIZE):
+    """
+    Move the rows deleted before cutoff into the archive collection, one batch at a time.
+    Rows are copied before they are removed, and a row restored in between is
+    removed from the archive again, so the job can stop and rerun at any point.
+    Args:
+        collection (Collections): The hot collection.
+        cutoff (datetime): Rows deleted before it are archived.
+        batch_size (int): Rows per batch.
+    Returns:
+        int: Rows archived.
+    """
+    archive = ARCHIVES[collection]
+    query = {"deleted_at": {"$type": "date", "$lt": cutoff}}
+    archived = 0
+
+    while True:
+        rows = await database[collection].find(query, {"_id": 0}).limit(batch_size).to_list(batch_size)
+        if not rows:
+            return archived
+
+        ids = [row["id"] for row in rows]
+        try:
+            await database[archive].insert_many(rows, ordered=False)
+
+        except BulkWriteError as error:
+            if any(write_error["code"] != 11000 for write_error in error.details["writeErrors"]):
+                raise
+
+        result = await database[collection].delete_many({"id": {"$in": ids}, **query})
+        if result.deleted_count < len(ids):
+            restored = await database[collection].distinct("id", {"id": {"$in": ids}})
+            await database[archive].delete_many({"id": {"$in": restored}})
+
+        archived += result.deleted_count
+
+
+async def archive_deleted(days=settings.ARCHIVE_AFTER_DAYS, batch_size=settings.ARCHIVE_BATCH_SIZE):
+    """
+    Archive the addresses, documents and accounts deleted more than days ago.
+    Args:
+        days (int): Days a deleted row stays in the hot collection.
+        batch_size (int): Rows per batch.
+    Returns:
+        dict: Rows archived per collection.
+    """
+    cutoff = datetime.now() - timedelta(days=days)
+    archived = {}
+    for collection in ARCHIVES:
+        archived[collection.value] = await archive_collection(collection, cutoff, batch_size)
+        logger.info("Archived %s rows of %s", archived[collection.value], collection.value)
+    return archived
+
+
+async def acquire_lease(name, owner, seconds):
+    """
+    Take the lease name for owner, or renew it when owner holds it.
+    A lease not renewed within seconds can be taken by another owner.
+    Args:
+        name (str): The lease name.
+        owner (str): The process asking for it.
+        seconds (int): Lease duration.
+    Returns:
+        bool: owner holds the lease.
+    """
+    now = datetime.utcnow()
+    try:
+        await database[Collections.LOCKS].find_one_and_update(
+            {"_id": name, "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=seconds)}},
+            upsert=True,
+        )
+
+    except DuplicateKeyError:
+        return False
+
+    return True
+
+
+async def run_archiver(interval=settings.ARCHIVE_INTERVAL):
+    """
+    Archive deleted rows every interval seconds until cancelled.
+    Every worker runs it, only the holder of the archiver lease archives, and
+    another worker takes over when the holder stops renewing it.
+    Args:
+        interval (int): Seconds between runs.
+    """
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    while True:
+        try:
+            if await acquire_lease(ARCHIVER_LEASE, owner, interval * 2):
+                await archive_deleted()
+
+        except PyMongoError as error:
+            logger.error("Archive run failed: %s", error)
+
+        await asyncio.sleep(interval)
+
+
+async def find_archived(collection, query):
+    """
+    Find the archived rows matching query.
+    Args:
+        collection (Collections): The hot collection.
+        query (dict): The filter.
+    Returns:
+        list: The archived rows.
+    """
+    return await database[ARCHIVES[collection]].find(query, {"_id": 0}).to_list(None)
+
+
+def restored(row):
+    """
+    Copy an archived row as a live row.
+    Args:
+        row (dict): The archived row.
+    """
+    return {**row, "deleted_at": "", "updated_at": datetime.now()}
+
+
+async def remove_archived(collection, ids):
+    """
+    Remove restored rows from the archive.
+    Args:
+        collection (Collections): The hot collection.
+        ids (list): The restored row ids.
+    """
+    if ids:
+        await database[ARCHIVES[collection]].delete_many({"id": {"$in": ids}})
+
+
+async def unarchive(collection, query):
+    """
+    Move one archived row back into the hot collection as a live row.
+    When a concurrent restore inserted it first, the row it restored is returned.
+    Args:
+        collection (Collections): The hot collection.
+        query (dict): The filter of the row.
+    Returns:
+        dict: The restored row, None when no archived row matches.
+    """
+    row = await database[ARCHIVES[collection]].find_one(query, {"_id": 0})
+    if row is None:
+        return None
+
+    row = restored(row)
+    try:
+        await database[collection].insert_one(dict(row))
+
+    except DuplicateKeyError:
+        row = await database[collection].find_one({"id": row["id"]}, {"_id": 0}) or row
+
+    await remove_archived(collection, [row["id"]])
+    return row
+
+
+if __name__ == "__main__":
+    import argparse
+
+    LogPipeline.start()
+
+    parser = argparse.ArgumentParser(description="Archive the rows deleted more than --days ago.")
+    parser.add_argument("--days", type=int, default=settings.ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    logger.info("Archive finished: %s", asyncio.run(archive_deleted(args.days, args.batch_size)))
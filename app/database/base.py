@@ -1,36 +1,154 @@
+import os
+
 from pymongo import MongoClient
 
 from settings import settings
 
+from services.metrics import command_listener
+
+from database.adapters import AsyncClient
+
 
-class Index(type):
+def create_client():
     """
-    Metaclass to create indexes in MongoDB.
-    Args:
-        type (type): Metaclass.
+    Create the async database client for the configured driver.
+    - **motor**: native asyncio driver.
+    - **pymongo**: blocking driver running in the threadpool (migration path).
+    - **memory**: in-memory mongomock backend used by tests.
+    Returns:
+        client: Motor-like client.
     """
-    def __init__(cls, *args, **kwargs):
-        if hasattr(cls, "index"):
-            cls.get_instance().create_index(cls.index, unique=True)
-        super().__init__(*args, **kwargs)
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    }
+    if settings.METRICS_ENABLED:
+        options["event_listeners"] = [command_listener]
+    if settings.MONGO_SSL is True:
+        options.update({
+            "tls": True,
+            "tlsCAFile": settings.PATH_CERT,
+            "tlsAllowInvalidHostnames": True,
+            "retryWrites": False,
+            "directConnection": True,
+        })
+
+    if settings.MONGO_DRIVER == "motor":
+        from motor.motor_asyncio import AsyncIOMotorClient
+        return AsyncIOMotorClient(settings.MONGO_URL, **options)
+
+    if settings.MONGO_DRIVER == "memory":
+        import mongomock
+        return AsyncClient(mongomock.MongoClient())
+
+    return AsyncClient(MongoClient(settings.MONGO_URL, **options))
 
 
 class BaseConnection:
-    if settings.MONGO_SSL is True:
-        connection = MongoClient(
-            settings.MONGO_URL,
-            tls=True,
-            tlsCAFile=settings.PATH_CERT,
-            tlsAllowInvalidHostnames=True,
-            retryWrites=False,
-            directConnection=True,
-        )
-    else:
-        connection = MongoClient(settings.MONGO_URL)
-
-
-class BaseDB(BaseConnection, metaclass=Index):
+    """
+    Per worker database client.
+    Created by the app lifespan, or on first use by scripts, never at import time.
+    A client inherited through fork is replaced since it is not fork-safe.
+    """
+    connection = None
+    pid = None
+
+    @classmethod
+    def get_client(cls):
+        if cls.connection is None or cls.pid != os.getpid():
+            cls.connection = create_client()
+            cls.pid = os.getpid()
+        return cls.connection
+
+    @classmethod
+    def close_client(cls):
+        if cls.connection is not None and cls.pid == os.getpid():
+            cls.connection.close()
+        cls.connection = None
+        cls.pid = None
+
+
+class BaseDB(BaseConnection):
     database = settings.DATABASE_ENVIRONMENT
 
+    @classmethod
+    def get_database(cls):
+        return cls.get_client()[cls.database]
+
+
+class LazyDatabase:
+    """
+    Module level database handle resolving the worker client on each access.
+    """
+    def __getitem__(self, name):
+        return BaseDB.get_database()[name]
+
+    def __getattr__(self, name):
+        return getattr(BaseDB.get_database(), name)
+
+
+database = LazyDatabase()
+
+
+async def connect():
+    """
+    Create the worker client and open a first connection before serving requests.
+    """
+    await BaseDB.get_database().command("ping")
+
+
+def disconnect():
+    """
+    Close the worker client.
+    """
+    BaseDB.close_client()
+
+
+_transactions_supported = None
+
+
+async def supports_transactions():
+    """
+    Check once if the server is a replica set or mongos member able to run transactions.
+    """
+    global _transactions_supported
 
-database = BaseDB.connection[BaseDB.database]
+    if _transactions_supported is None:
+        client = BaseDB.get_client()
+        if not hasattr(client, "start_session"):
+            _transactions_supported = False
+        else:
+            hello = await client.admin.command("hello")
+            _transactions_supported = "setName" in hello or hello.get("msg") == "isdbgrid"
+
+    return _transactions_supported
+
+
+async def run_in_transaction(callback, rollback=None):
+    """
+    Run callback(session) inside a transaction.
+    Standalone servers run callback(None) and await rollback() when it fails.
+    Args:
+        callback (coroutine function): Receives the session to pass to every write.
+        rollback (coroutine function): Compensates partial writes without transactions.
+    """
+    if await supports_transactions():
+        async with await BaseDB.get_client().start_session() as session:
+            return await session.with_transaction(callback)
+
+    try:
+        return await callback(None)
+
+    except Exception:
+        if rollback is not None:
+            await rollback()
+        raise
+
+
+def get_sync_database():
+    """
+    Blocking database handle sharing the client pool.
+    For callbacks that cannot await, like the JWT denylist loader.
+    """
+    return BaseDB.get_client().delegate[BaseDB.database]
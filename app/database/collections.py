@@ -10,4 +10,12 @@ class Collections(str, Enum):
     USERS = "users"
     USER_BANK_ACCOUNTS = "user_bank_accounts"
     USER_DOCUMENTS = "user_documents"
-    USER_ADDRESSES = "user_addresses"
\ No newline at end of file
+    USER_ADDRESSES = "user_addresses"
+    USER_BANK_ACCOUNTS_ARCHIVE = "user_bank_accounts_archive"
+    USER_DOCUMENTS_ARCHIVE = "user_documents_archive"
+    USER_ADDRESSES_ARCHIVE = "user_addresses_archive"
+    USER_PROFILES = "user_profiles"
+    TOKEN_DENYLIST = "token_denylist"
+    COUNTERS = "counters"
+    RATE_LIMITS = "rate_limits"
+    LOCKS = "locks"
\ No newline at end of file
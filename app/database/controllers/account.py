@@ -13,87 +13,105 @@ from pymongo.errors import (
 from utils import AccountNotSalary
 from utils.logger import Logger
 
+from settings import settings
+
 from database import database, Collections
+from database.profiles import user_profiles
+from database.pagination import find_page, build_projection
+
+from services.account_numbers import account_numbers
 
 from models.users.users_bank_account_model import BankAccount
 
-logger = Logger.init("AccountControllerLogger")
+logger = Logger.init(__name__)
 
 
-def create_account(user_id, account):
+async def create_account(user_id, account):
     """
     Create account from user create request.
     Args:
         user_id (str): The user id.
         account (UserBankAccount): The account data.
     """
-    logger.info(f"Create account from user_id ->: {user_id}")
+    logger.info("Create account from user_id ->: %s", user_id)
     try:
+        (account_number, account_digit), = await account_numbers.allocate()
         account = BankAccount(
             user_id=user_id,
-            account_type=account.account_type
+            account_type=account.account_type,
+            account_number=account_number,
+            account_digit=account_digit,
         ).dict()
 
-        database[Collections.USER_BANK_ACCOUNTS].insert_one(account)
+        await database[Collections.USER_BANK_ACCOUNTS].insert_one(account)
+        await user_profiles.refresh(user_id)
 
         account.pop("_id")
 
         return account
 
     except ServerSelectionTimeoutError as error:
-        logger.error(f"ServerSelectionTimeoutError: {error}")
+        logger.error("ServerSelectionTimeoutError: %s", error)
 
     except ConnectionFailure as error:
-        logger.error(f"ConnectionFailure: {error}")
+        logger.error("ConnectionFailure: %s", error)
 
     except OperationFailure as error:
-        logger.error(f"OperationFailure: {error}")
+        logger.error("OperationFailure: %s", error)
 
     except PyMongoError as error:
-        logger.error(f"PyMongoError: {error}")
+        logger.error("PyMongoError: %s", error)
 
 
-def get_accounts_per_user(user_id):
+async def get_accounts_per_user(user_id, limit=settings.PAGE_SIZE_DEFAULT, cursor=None, fields=None, with_count=False):
     """
     Get accounts per user.
     Args:
         user_id (str): The user id.
+        limit (int): Page size.
+        cursor (str): The next token of the previous page.
+        fields (str): Comma separated fields to return.
+        with_count (bool): Also count every account of the user.
+    Returns:
+        dict: The page with items and next token.
     """
-    logger.info(f"Get accounts per user_id ->: {user_id}")
-    payload = []
+    logger.info("Get accounts per user_id ->: %s", user_id)
+
     try:
-        accounts = database[Collections.USER_BANK_ACCOUNTS].find(
+        accounts = await find_page(
+            Collections.USER_BANK_ACCOUNTS,
             {"user_id": user_id, "deleted_at": ""},
-            {"_id": 0}
+            limit,
+            cursor=cursor,
+            projection=build_projection(fields, BankAccount.__fields__),
+            with_count=with_count,
         )
 
-        for account in accounts:
-            payload.append(account)
-        return payload
+        return accounts
 
     except ServerSelectionTimeoutError as error:
-        logger.error(f"ServerSelectionTimeoutError: {error}")
+        logger.error("ServerSelectionTimeoutError: %s", error)
 
     except ConnectionFailure as error:
-        logger.error(f"ConnectionFailure: {error}")
+        logger.error("ConnectionFailure: %s", error)
 
     except OperationFailure as error:
-        logger.error(f"OperationFailure: {error}")
+        logger.error("OperationFailure: %s", error)
 
     except PyMongoError as error:
-        logger.error(f"PyMongoError: {error}")
+        logger.error("PyMongoError: %s", error)
 
 
-def get_account_by_id(user_id , account_id):
+async def get_account_by_id(user_id , account_id):
     """
     Get account by id.
     Args:
         account_id (str): The account id.
     """
-    logger.info(f"Get account detail user id: ->: {user_id}")
+    logger.info("Get account detail user id: ->: %s", user_id)
 
     try:
-        account = database[Collections.USER_BANK_ACCOUNTS].find_one(
+        account = await database[Collections.USER_BANK_ACCOUNTS].find_one(
             {"id": account_id, "user_id": user_id},
             {"_id": 0}
         )
@@ -109,30 +127,30 @@ def get_account_by_id(user_id , account_id):
         return account
 
     except ServerSelectionTimeoutError as error:
-        logger.error(f"ServerSelectionTimeoutError: {error}")
+        logger.error("ServerSelectionTimeoutError: %s", error)
 
     except ConnectionFailure as error:
-        logger.error(f"ConnectionFailure: {error}")
+        logger.error("ConnectionFailure: %s", error)
 
     except OperationFailure as error:
-        logger.error(f"OperationFailure: {error}")
+        logger.error("OperationFailure: %s", error)
 
     except PyMongoError as error:
-        logger.error(f"PyMongoError: {error}")
+        logger.error("PyMongoError: %s", error)
 
 
-def update_account_type(user_id, account_id, payload):
+async def update_account_type(user_id, account_id, payload):
     """
     Update account per user.
     Args:
         user_id (str): The user id.
         account (account): The account data.
     """
-    logger.info(f"Update account per user_id: ->: {user_id}")
+    logger.info("Update account per user_id: ->: %s", user_id)
 
     try:
 
-        account = database[Collections.USER_BANK_ACCOUNTS].find_one(
+        account = await database[Collections.USER_BANK_ACCOUNTS].find_one(
             {"id": account_id},
             {"_id": 0}
         )
@@ -151,11 +169,11 @@ def update_account_type(user_id, account_id, payload):
         account = payload.dict()
         account["updated_at"] = datetime.now()
 
-        database[Collections.USER_BANK_ACCOUNTS].update_one(
+        await database[Collections.USER_BANK_ACCOUNTS].update_one(
             {"id": account_id},
             {"$set": account}
         )
-
+        await user_profiles.refresh(user_id)
 
         return account
 
@@ -170,42 +188,43 @@ def update_account_type(user_id, account_id, payload):
         )
 
     except ServerSelectionTimeoutError as error:
-        logger.error(f"ServerSelectionTimeoutError: {error}")
+        logger.error("ServerSelectionTimeoutError: %s", error)
 
     except ConnectionFailure as error:
-        logger.error(f"ConnectionFailure: {error}")
+        logger.error("ConnectionFailure: %s", error)
 
     except OperationFailure as error:
-        logger.error(f"OperationFailure: {error}")
+        logger.error("OperationFailure: %s", error)
 
     except PyMongoError as error:
-        logger.error(f"PyMongoError: {error}")
+        logger.error("PyMongoError: %s", error)
 
 
-def delete_account(account_id, user_id):
+async def delete_account(account_id, user_id):
     """
     Delete account per user.
     Args:
         account_id (str): The account id.
     """
-    logger.info(f"Delete account per user id: ->: {user_id}")
+    logger.info("Delete account per user id: ->: %s", user_id)
 
     try:
-        database[Collections.USER_BANK_ACCOUNTS].update_one(
+        await database[Collections.USER_BANK_ACCOUNTS].update_one(
             {"id": account_id},
             {"$set": {"deleted_at": datetime.now()}}
         )
+        await user_profiles.refresh(user_id)
 
         return True
 
     except ServerSelectionTimeoutError as error:
-        logger.error(f"ServerSelectionTimeoutError: {error}")
+        logger.error("ServerSelectionTimeoutError: %s", error)
 
     except ConnectionFailure as error:
-        logger.error(f"ConnectionFailure: {error}")
+        logger.error("ConnectionFailure: %s", error)
 
     except OperationFailure as error:
-        logger.error(f"OperationFailure: {error}")
+        logger.error("OperationFailure: %s", error)
 
     except PyMongoError as error:
-        logger.error(f"PyMongoError: {error}")
+        logger.error("PyMongoError: %s", error)
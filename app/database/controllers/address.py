@@ -12,33 +12,36 @@ from pymongo.errors import (
 
 from utils.logger import Logger
 
+from settings import settings
+
 from database import database, Collections
+from database.archive import unarchive
+from database.profiles import user_profiles
+from database.pagination import find_page, build_projection
 
 from models.users.users_address_model import Address
 
 
-logger = Logger.init("AddressControllerLogger")
+logger = Logger.init(__name__)
 
 
-def create_address(user_id, address):
+async def create_address(user_id, address):
     """
     Create address from user create request.
     Args:
         user_id (str): The user id.
         address (Address): The address data.
     """
-    logger.info(f"Create address from user_id: ->: {user_id}")
+    logger.info("Create address from user_id: ->: %s", user_id)
     try:
-
-        address_has_exist = database[Collections.USER_ADDRESSES].find_one(
-            {
-                "user_id": user_id,
-                "street": address.street,
-                "number": address.number,
-                "zip_code": address.zip_code,
-            },
-            {"_id": 0}
-        )
+        address_key = {
+            "user_id": user_id,
+            "street": address.street,
+            "number": address.number,
+            "zip_code": address.zip_code,
+        }
+
+        address_has_exist = await database[Collections.USER_ADDRESSES].find_one(address_key, {"_id": 0})
         if address_has_exist and address_has_exist["deleted_at"] == "":
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -49,7 +52,7 @@ def create_address(user_id, address):
             )
 
         elif address_has_exist and address_has_exist["deleted_at"] != "":
-            database[Collections.USER_ADDRESSES].update_one(
+            await database[Collections.USER_ADDRESSES].update_one(
                 {"id": address_has_exist["id"]},
                 {
                     "$set": {
@@ -58,9 +61,15 @@ def create_address(user_id, address):
                     }
                 }
             )
+            await user_profiles.refresh(user_id)
 
             return address_has_exist
 
+        archived_address = await unarchive(Collections.USER_ADDRESSES, address_key)
+        if archived_address:
+            await user_profiles.refresh(user_id)
+            return archived_address
+
         address = Address(
             user_id=user_id,
             street=address.street,
@@ -73,67 +82,95 @@ def create_address(user_id, address):
             zip_code=address.zip_code
         ).dict()
 
-        database[Collections.USER_ADDRESSES].insert_one(address)
+        await database[Collections.USER_ADDRESSES].insert_one(address)
+        await user_profiles.refresh(user_id)
 
         address.pop("_id")
 
         return address
 
     except ServerSelectionTimeoutError as error:
-        logger.error(f"ServerSelectionTimeoutError: {error}")
+        logger.error("ServerSelectionTimeoutError: %s", error)
 
     except ConnectionFailure as error:
-        logger.error(f"ConnectionFailure: {error}")
+        logger.error("ConnectionFailure: %s", error)
 
     except OperationFailure as error:
-        logger.error(f"OperationFailure: {error}")
+        logger.error("OperationFailure: %s", error)
 
     except PyMongoError as error:
-        logger.error(f"PyMongoError: {error}")
+        logger.error("PyMongoError: %s", error)
 
 
-def get_address_per_user(user_id):
+def validate_new_addresses(addresses):
+    """
+    Validate the addresses of a new user, which can only clash among themselves.
+    Args:
+        addresses (list): The AddressCreateRequest list.
+    """
+    keys = set()
+    for address in addresses:
+        key = (address.street, address.number, address.zip_code)
+        if key in keys:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    "message": "Address already exists",
+                    "address": jsonable_encoder(address),
+                }
+            )
+        keys.add(key)
+
+
+async def get_address_per_user(user_id, limit=settings.PAGE_SIZE_DEFAULT, cursor=None, fields=None, with_count=False):
     """
     Get address per user.
     Args:
         user_id (str): The user id.
+        limit (int): Page size.
+        cursor (str): The next token of the previous page.
+        fields (str): Comma separated fields to return.
+        with_count (bool): Also count every address of the user.
+    Returns:
+        dict: The page with items and next token.
     """
-    logger.info(f"Get address per user_id: ->: {user_id}")
-    payload = []
+    logger.info("Get address per user_id: ->: %s", user_id)
 
     try:
-        addresses = database[Collections.USER_ADDRESSES].find(
+        addresses = await find_page(
+            Collections.USER_ADDRESSES,
             {"user_id": user_id, "deleted_at": ""},
-            {"_id": 0}
+            limit,
+            cursor=cursor,
+            projection=build_projection(fields, Address.__fields__),
+            with_count=with_count,
         )
 
-        for address in addresses:
-            payload.append(address)
-        return payload
+        return addresses
 
     except ServerSelectionTimeoutError as error:
-        logger.error(f"ServerSelectionTimeoutError: {error}")
+        logger.error("ServerSelectionTimeoutError: %s", error)
 
     except ConnectionFailure as error:
-        logger.error(f"ConnectionFailure: {error}")
+        logger.error("ConnectionFailure: %s", error)
 
     except OperationFailure as error:
-        logger.error(f"OperationFailure: {error}")
+        logger.error("OperationFailure: %s", error)
 
     except PyMongoError as error:
-        logger.error(f"PyMongoError: {error}")
+        logger.error("PyMongoError: %s", error)
 
 
-def get_address_by_id(user_id , address_id):
+async def get_address_by_id(user_id , address_id):
     """
     Get address by id.
     Args:
         address_id (str): The address id.
     """
-    logger.info(f"Get address detail user id: ->: {user_id}")
+    logger.info("Get address detail user id: ->: %s", user_id)
 
     try:
-        address = database[Collections.USER_ADDRESSES].find_one(
+        address = await database[Collections.USER_ADDRESSES].find_one(
             {"id": address_id, "user_id": user_id},
             {"_id": 0}
         )
@@ -149,37 +186,38 @@ def get_address_by_id(user_id , address_id):
         return address
 
     except ServerSelectionTimeoutError as error:
-        logger.error(f"ServerSelectionTimeoutError: {error}")
+        logger.error("ServerSelectionTimeoutError: %s", error)
 
     except ConnectionFailure as error:
-        logger.error(f"ConnectionFailure: {error}")
+        logger.error("ConnectionFailure: %s", error)
 
     except OperationFailure as error:
-        logger.error(f"OperationFailure: {error}")
+        logger.error("OperationFailure: %s", error)
 
     except PyMongoError as error:
-        logger.error(f"PyMongoError: {error}")
+        logger.error("PyMongoError: %s", error)
 
 
-def update_address(user_id, address_id, payload):
+async def update_address(user_id, address_id, payload):
     """
     Update address per user.
     Args:
         user_id (str): The user id.
         address (Address): The address data.
     """
-    logger.info(f"Update address per user_id: ->: {user_id}")
+    logger.info("Update address per user_id: ->: %s", user_id)
 
     try:
         address = payload.dict(exclude_none=True)
         address["updated_at"] = datetime.now()
 
-        database[Collections.USER_ADDRESSES].update_one(
+        await database[Collections.USER_ADDRESSES].update_one(
             {"id": address_id},
             {"$set": address}
         )
+        await user_profiles.refresh(user_id)
 
-        address = database[Collections.USER_ADDRESSES].find_one(
+        address = await database[Collections.USER_ADDRESSES].find_one(
             {"id": address_id},
             {"_id": 0}
         )
@@ -187,42 +225,43 @@ def update_address(user_id, address_id, payload):
         return address
 
     except ServerSelectionTimeoutError as error:
-        logger.error(f"ServerSelectionTimeoutError: {error}")
+        logger.error("ServerSelectionTimeoutError: %s", error)
 
     except ConnectionFailure as error:
-        logger.error(f"ConnectionFailure: {error}")
+        logger.error("ConnectionFailure: %s", error)
 
     except OperationFailure as error:
-        logger.error(f"OperationFailure: {error}")
+        logger.error("OperationFailure: %s", error)
 
     except PyMongoError as error:
-        logger.error(f"PyMongoError: {error}")
+        logger.error("PyMongoError: %s", error)
 
 
-def delete_address(address_id, user_id):
+async def delete_address(address_id, user_id):
     """
     Delete address per user.
     Args:
         address_id (str): The address id.
     """
-    logger.info(f"Delete address per user id: ->: {user_id}")
+    logger.info("Delete address per user id: ->: %s", user_id)
 
     try:
-        database[Collections.USER_ADDRESSES].update_one(
+        await database[Collections.USER_ADDRESSES].update_one(
             {"id": address_id},
             {"$set": {"deleted_at": datetime.now()}}
         )
+        await user_profiles.refresh(user_id)
 
         return True
 
     except ServerSelectionTimeoutError as error:
-        logger.error(f"ServerSelectionTimeoutError: {error}")
+        logger.error("ServerSelectionTimeoutError: %s", error)
 
     except ConnectionFailure as error:
-        logger.error(f"ConnectionFailure: {error}")
+        logger.error("ConnectionFailure: %s", error)
 
     except OperationFailure as error:
-        logger.error(f"OperationFailure: {error}")
+        logger.error("OperationFailure: %s", error)
 
     except PyMongoError as error:
-        logger.error(f"PyMongoError: {error}")
+        logger.error("PyMongoError: %s", error)
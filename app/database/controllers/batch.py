@@ -0,0 +1,373 @@
+from datetime import datetime
+
+from pydantic import ValidationError
+
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import (
+    BulkWriteError,
+    ServerSelectionTimeoutError,
+    ConnectionFailure,
+    OperationFailure,
+    PyMongoError
+)
+
+from utils.logger import Logger
+
+from services.account_numbers import account_numbers
+
+from database import database, Collections
+from database.archive import find_archived, restored, remove_archived
+from database.profiles import user_profiles
+from database.controllers.document import get_taken_document_types, MULTIPLE_DOCUMENT_TYPES
+
+from models.users.users_address_model import Address, AddressCreateRequest, AddressBulkCreateRequest
+from models.users.users_bank_account_model import (
+    BankAccount,
+    BankAccountCreateRequest,
+    BankAccountBulkCreateRequest,
+)
+from models.users.users_documents_model import Documents, DocumentsCreateRequest, DocumentsBulkCreateRequest
+
+
+logger = Logger.init(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+def item_result(index, status_code, message, **data):
+    """
+    Build the result of one batch item.
+    Args:
+        index (int): The item position in the request.
+        status_code (int): The item HTTP status.
+        message (str): The item message.
+    """
+    return {"index": index, "status": status_code, "message": message, **data}
+
+
+def parse_items(items, model, user_id=None):
+    """
+    Validate every item on its own.
+    Args:
+        items (list): The raw items.
+        model (BaseModel): The item create request model.
+        user_id (str): The path user id, None reads it from each item.
+    Returns:
+        tuple: (results, parsed) with parsed a list of (index, user_id, item).
+    """
+    results = [None] * len(items)
+    parsed = []
+    for index, item in enumerate(items):
+        try:
+            request = model.parse_obj(item)
+
+        except ValidationError as error:
+            results[index] = item_result(index, 422, "Invalid item", errors=error.errors())
+            continue
+
+        parsed.append((index, user_id or request.user_id, request))
+
+    return results, parsed
+
+
+async def keep_live_users(results, parsed):
+    """
+    Reject the items of missing or deleted users with a single query.
+    Args:
+        results (list): The batch results.
+        parsed (list): The (index, user_id, item) list.
+    """
+    if not parsed:
+        return parsed
+
+    user_ids = list({user_id for _, user_id, _ in parsed})
+    users = await database[Collections.USERS].find(
+        {"id": {"$in": user_ids}, "deleted_at": ""},
+        {"_id": 0, "id": 1}
+    ).to_list(None)
+    live = {user["id"] for user in users}
+
+    kept = []
+    for index, user_id, item in parsed:
+        if user_id in live:
+            kept.append((index, user_id, item))
+        else:
+            results[index] = item_result(index, 404, "User not found")
+    return kept
+
+
+async def write_batch(collection, results, operations):
+    """
+    Send every operation with one unordered bulk_write and record each outcome.
+    Args:
+        collection (Collections): The collection.
+        results (list): The batch results.
+        operations (list): (index, operation, id, status) of the valid items.
+    """
+    if not operations:
+        return
+
+    failed = {}
+    try:
+        await database[collection].bulk_write([operation for _, operation, _, _ in operations], ordered=False)
+
+    except BulkWriteError as error:
+        failed = {write_error["index"]: write_error for write_error in error.details["writeErrors"]}
+
+    except ServerSelectionTimeoutError as error:
+        logger.error("ServerSelectionTimeoutError: %s", error)
+        failed = None
+
+    except ConnectionFailure as error:
+        logger.error("ConnectionFailure: %s", error)
+        failed = None
+
+    except OperationFailure as error:
+        logger.error("OperationFailure: %s", error)
+        failed = None
+
+    except PyMongoError as error:
+        logger.error("PyMongoError: %s", error)
+        failed = None
+
+    for position, (index, _, item_id, status_code) in enumerate(operations):
+        if failed is None:
+            results[index] = item_result(index, 503, "Database unavailable, please try again.")
+
+        elif position in failed:
+            write_error = failed[position]
+            results[index] = item_result(
+                index,
+                409 if write_error.get("code") == DUPLICATE_KEY_ERROR else 400,
+                write_error.get("errmsg", "Write failed"),
+            )
+
+        else:
+            results[index] = item_result(
+                index, status_code, "Created" if status_code == 201 else "Restored", id=item_id
+            )
+
+
+async def refresh_profiles(results, parsed):
+    """
+    Refresh the profiles of the users with a created or restored item.
+    Args:
+        results (list): The batch results.
+        parsed (list): The (index, user_id, item) list.
+    """
+    await user_profiles.refresh_many(
+        user_id for index, user_id, _ in parsed if results[index]["status"] in (200, 201)
+    )
+
+
+def restore(document_id):
+    return UpdateOne(
+        {"id": document_id},
+        {"$set": {"deleted_at": "", "updated_at": datetime.now()}}
+    )
+
+
+async def find_existing(collection, user_ids, fields, key_fields):
+    """
+    Read the rows of the users, live, deleted or archived, keyed by key_fields.
+    Archived rows are only used when the hot collection has no row for the key.
+    Args:
+        collection (Collections): The hot collection.
+        user_ids (list): The user ids.
+        fields (tuple): The fields to read.
+        key_fields (tuple): The fields of the row key.
+    Returns:
+        dict: key to row, archived rows carry archived=True.
+    """
+    projection = {"_id": 0, **{field: 1 for field in fields}}
+    existing = {}
+    async for row in database[collection].find({"user_id": {"$in": user_ids}}, projection):
+        existing[tuple(row[field] for field in key_fields)] = row
+
+    for row in await find_archived(collection, {"user_id": {"$in": user_ids}}):
+        existing.setdefault(tuple(row[field] for field in key_fields), {**row, "archived": True})
+
+    return existing
+
+
+async def remove_restored(collection, results, archived_ids):
+    """
+    Remove from the archive the rows restored by the batch.
+    Args:
+        collection (Collections): The hot collection.
+        results (list): The batch results.
+        archived_ids (dict): Item index to archived row id.
+    """
+    await remove_archived(collection, [
+        row_id for index, row_id in archived_ids.items() if results[index]["status"] == 200
+    ])
+
+
+def restore_operation(row):
+    """
+    Restore a deleted row in place, or insert back an archived one.
+    Args:
+        row (dict): The existing row.
+    """
+    if row.get("archived"):
+        row = restored(row)
+        row.pop("archived")
+        return InsertOne(row)
+    return restore(row["id"])
+
+
+async def create_accounts_batch(items, user_id=None):
+    """
+    Create many accounts, of one user or of the user_id of each item.
+    Args:
+        items (list): The raw BankAccountCreateRequest items.
+        user_id (str): The user id, None for a cross-user bulk request.
+    Returns:
+        list: One result per item, in the request order.
+    """
+    logger.info("Create accounts batch of %s items", len(items))
+
+    model = BankAccountCreateRequest if user_id else BankAccountBulkCreateRequest
+    results, parsed = parse_items(items, model, user_id)
+    parsed = await keep_live_users(results, parsed)
+
+    operations = []
+    numbers = await account_numbers.allocate(len(parsed)) if parsed else []
+    for (index, item_user_id, item), (account_number, account_digit) in zip(parsed, numbers):
+        account = BankAccount(
+            user_id=item_user_id,
+            account_type=item.account_type,
+            account_number=account_number,
+            account_digit=account_digit,
+        ).dict()
+        operations.append((index, InsertOne(account), account["id"], 201))
+
+    await write_batch(Collections.USER_BANK_ACCOUNTS, results, operations)
+    await refresh_profiles(results, parsed)
+    return results
+
+
+async def create_addresses_batch(items, user_id=None):
+    """
+    Create many addresses, restoring the deleted ones like create_address.
+    Args:
+        items (list): The raw AddressCreateRequest items.
+        user_id (str): The user id, None for a cross-user bulk request.
+    Returns:
+        list: One result per item, in the request order.
+    """
+    logger.info("Create addresses batch of %s items", len(items))
+
+    model = AddressCreateRequest if user_id else AddressBulkCreateRequest
+    results, parsed = parse_items(items, model, user_id)
+    parsed = await keep_live_users(results, parsed)
+    if not parsed:
+        return results
+
+    existing = await find_existing(
+        Collections.USER_ADDRESSES,
+        list({item_user_id for _, item_user_id, _ in parsed}),
+        ("id", "user_id", "street", "number", "zip_code", "deleted_at"),
+        ("user_id", "street", "number", "zip_code"),
+    )
+
+    seen = set()
+    operations = []
+    archived_ids = {}
+    for index, item_user_id, item in parsed:
+        key = (item_user_id, item.street, item.number, item.zip_code)
+        address = existing.get(key)
+
+        if key in seen or (address and address["deleted_at"] == ""):
+            results[index] = item_result(index, 409, "Address already exists")
+            continue
+        seen.add(key)
+
+        if address:
+            if address.get("archived"):
+                archived_ids[index] = address["id"]
+            operations.append((index, restore_operation(address), address["id"], 200))
+            continue
+
+        new_address = Address(user_id=item_user_id, **item.dict(exclude={"user_id"})).dict()
+        operations.append((index, InsertOne(new_address), new_address["id"], 201))
+
+    await write_batch(Collections.USER_ADDRESSES, results, operations)
+    await remove_restored(Collections.USER_ADDRESSES, results, archived_ids)
+    await refresh_profiles(results, parsed)
+    return results
+
+
+async def create_documents_batch(items, user_id=None):
+    """
+    Create many documents with the create_document rules: a document type
+    other than passport and CNPJ can only exist once, and deleted documents are restored.
+    Args:
+        items (list): The raw DocumentsCreateRequest items.
+        user_id (str): The user id, None for a cross-user bulk request.
+    Returns:
+        list: One result per item, in the request order.
+    """
+    logger.info("Create documents batch of %s items", len(items))
+
+    model = DocumentsCreateRequest if user_id else DocumentsBulkCreateRequest
+    results, parsed = parse_items(items, model, user_id)
+    parsed = await keep_live_users(results, parsed)
+    if not parsed:
+        return results
+
+    single_types = list({
+        item.document_type.value for _, _, item in parsed
+        if item.document_type not in MULTIPLE_DOCUMENT_TYPES
+    })
+    taken_types = await get_taken_document_types(single_types) if single_types else set()
+
+    existing = await find_existing(
+        Collections.USER_DOCUMENTS,
+        list({item_user_id for _, item_user_id, _ in parsed}),
+        ("id", "user_id", "document_type", "document_number", "deleted_at"),
+        ("user_id", "document_type", "document_number"),
+    )
+
+    seen = set()
+    operations = []
+    archived_ids = {}
+    for index, item_user_id, item in parsed:
+        document_type = item.document_type.value
+
+        if document_type in taken_types:
+            results[index] = item_result(
+                index, 409,
+                "the selected document type already exists in the database"
+                    "and there can only be one of them. Please contact support."
+            )
+            continue
+
+        key = (item_user_id, document_type, item.document_number)
+        document = existing.get(key)
+
+        if key in seen or (document and document["deleted_at"] == ""):
+            results[index] = item_result(index, 409, "Document already exists")
+            continue
+        seen.add(key)
+
+        if document_type not in MULTIPLE_DOCUMENT_TYPES:
+            taken_types.add(document_type)
+
+        if document:
+            if document.get("archived"):
+                archived_ids[index] = document["id"]
+            operations.append((index, restore_operation(document), document["id"], 200))
+            continue
+
+        new_document = Documents(
+            user_id=item_user_id,
+            document_type=item.document_type,
+            document_number=item.document_number
+        ).dict()
+        operations.append((index, InsertOne(new_document), new_document["id"], 201))
+
+    await write_batch(Collections.USER_DOCUMENTS, results, operations)
+    await remove_restored(Collections.USER_DOCUMENTS, results, archived_ids)
+    await refresh_profiles(results, parsed)
+    return results
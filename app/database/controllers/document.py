@@ -13,44 +13,59 @@ from pymongo.errors import (
 from utils import ExistOneInDatabase
 from utils.logger import Logger
 
+from settings import settings
+
 from database import database, Collections
+from database.archive import unarchive
+from database.profiles import user_profiles
+from database.pagination import find_page, build_projection
 
 from models import DocumentTypeEnum
 from models.users.users_documents_model import Documents
 
 
-logger = Logger.init("DocumentControllerLogger")
+logger = Logger.init(__name__)
+
+MULTIPLE_DOCUMENT_TYPES = [DocumentTypeEnum.PASSPORT.value, DocumentTypeEnum.CNPJ.value]
 
 
-def create_document(user_id, document):
+async def get_taken_document_types(document_types):
+    """
+    Get the document types already held by a live, deleted or archived document.
+    Args:
+        document_types (list): The document types to check.
+    Returns:
+        set: The taken document types.
+    """
+    taken = set()
+    for collection in (Collections.USER_DOCUMENTS, Collections.USER_DOCUMENTS_ARCHIVE):
+        taken.update(await database[collection].distinct("document_type", {"document_type": {"$in": document_types}}))
+    return taken
+
+
+async def create_document(user_id, document):
     """
     Create document from user create request.
     Args:
         user_id (str): The user id.
         document (Documents): The document data.
     """
-    logger.info(f"Create document from user_id ->: {user_id}")
+    logger.info("Create document from user_id ->: %s", user_id)
     try:
-        if document.document_type not in [DocumentTypeEnum.PASSPORT.value, DocumentTypeEnum.CNPJ.value]:
-            has_cpf_on_database = database[Collections.USER_DOCUMENTS].find_one(
-                {"document_type":document.document_type},
-                {"_id": 0}
-            )
-
-            if has_cpf_on_database:
+        if document.document_type not in MULTIPLE_DOCUMENT_TYPES:
+            if await get_taken_document_types([document.document_type]):
                 raise ExistOneInDatabase(
                     "the selected document type already exists in the database"
                         "and there can only be one of them. Please contact support."
                 )
 
-        document_has_exist = database[Collections.USER_DOCUMENTS].find_one(
-            {
-                "user_id": user_id,
-                "document_type": document.document_type,
-                "document_number": document.document_number,
-            },
-            {"_id": 0}
-        )
+        document_key = {
+            "user_id": user_id,
+            "document_type": document.document_type,
+            "document_number": document.document_number,
+        }
+
+        document_has_exist = await database[Collections.USER_DOCUMENTS].find_one(document_key, {"_id": 0})
         if document_has_exist and document_has_exist["deleted_at"] == "":
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -61,8 +76,8 @@ def create_document(user_id, document):
             )
         
         if document_has_exist and document_has_exist["deleted_at"] != "":
-            database[Collections.USER_DOCUMENTS].update_one(
-                {"_id": document_has_exist["_id"]},
+            await database[Collections.USER_DOCUMENTS].update_one(
+                {"id": document_has_exist["id"]},
                 {
                     "$set": {
                         "deleted_at": "",
@@ -70,23 +85,30 @@ def create_document(user_id, document):
                     }
                 }
             )
+            await user_profiles.refresh(user_id)
 
             return document_has_exist
 
+        archived_document = await unarchive(Collections.USER_DOCUMENTS, document_key)
+        if archived_document:
+            await user_profiles.refresh(user_id)
+            return archived_document
+
         document = Documents(
             user_id=user_id,
             document_type=document.document_type,
             document_number=document.document_number
         ).dict()
 
-        database[Collections.USER_DOCUMENTS].insert_one(document)
+        await database[Collections.USER_DOCUMENTS].insert_one(document)
+        await user_profiles.refresh(user_id)
 
         document.pop("_id")
 
         return document
 
     except ExistOneInDatabase as error:
-        logger.error(f"ExistOneInDatabase: {error}")
+        logger.error("ExistOneInDatabase: %s", error)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={
@@ -96,59 +118,108 @@ def create_document(user_id, document):
         )
 
     except ServerSelectionTimeoutError as error:
-        logger.error(f"ServerSelectionTimeoutError: {error}")
+        logger.error("ServerSelectionTimeoutError: %s", error)
 
     except ConnectionFailure as error:
-        logger.error(f"ConnectionFailure: {error}")
+        logger.error("ConnectionFailure: %s", error)
 
     except OperationFailure as error:
-        logger.error(f"OperationFailure: {error}")
+        logger.error("OperationFailure: %s", error)
 
     except PyMongoError as error:
-        logger.error(f"PyMongoError: {error}")
+        logger.error("PyMongoError: %s", error)
+
+
+async def validate_new_documents(documents):
+    """
+    Validate the documents of a new user with a single query.
+    Args:
+        documents (list): The DocumentsCreateRequest list.
+    """
+    keys = set()
+    for document in documents:
+        key = (document.document_type, document.document_number)
+        if key in keys:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    "message": "Document already exists",
+                    "address": jsonable_encoder(document),
+                }
+            )
+        keys.add(key)
+
+    single_types = [
+        document.document_type for document in documents
+        if document.document_type not in MULTIPLE_DOCUMENT_TYPES
+    ]
+    if not single_types:
+        return
+
+    has_single_type_on_database = len(single_types) != len(set(single_types)) or (
+        await get_taken_document_types(single_types)
+    )
+
+    if has_single_type_on_database:
+        logger.error("ExistOneInDatabase: new user document type already exists")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "message": "the selected document type already exists in the database"
+                    "and there can only be one of them. Please contact support."
+            }
+        )
 
 
-def get_documents_per_user(user_id):
+async def get_documents_per_user(user_id, limit=settings.PAGE_SIZE_DEFAULT, cursor=None, fields=None, with_count=False):
     """
     Get documents per user.
     Args:
         user_id (str): The user id.
+        limit (int): Page size.
+        cursor (str): The next token of the previous page.
+        fields (str): Comma separated fields to return.
+        with_count (bool): Also count every document of the user.
+    Returns:
+        dict: The page with items and next token.
     """
-    logger.info(f"Get documents per user_id ->: {user_id}")
-    payload = []
+    logger.info("Get documents per user_id ->: %s", user_id)
+
     try:
-        documents = database[Collections.USER_DOCUMENTS].find(
+        documents = await find_page(
+            Collections.USER_DOCUMENTS,
             {"user_id": user_id, "deleted_at": ""},
-            {"_id": 0}
+            limit,
+            cursor=cursor,
+            projection=build_projection(fields, Documents.__fields__),
+            with_count=with_count,
         )
 
-        for document in documents:
-            payload.append(document)
-        return payload
+        return documents
 
     except ServerSelectionTimeoutError as error:
-        logger.error(f"ServerSelectionTimeoutError: {error}")
+        logger.error("ServerSelectionTimeoutError: %s", error)
 
     except ConnectionFailure as error:
-        logger.error(f"ConnectionFailure: {error}")
+        logger.error("ConnectionFailure: %s", error)
 
     except OperationFailure as error:
-        logger.error(f"OperationFailure: {error}")
+        logger.error("OperationFailure: %s", error)
 
     except PyMongoError as error:
-        logger.error(f"PyMongoError: {error}")
+        logger.error("PyMongoError: %s", error)
 
 
-def get_document_by_id(user_id , document_id):
+async def get_document_by_id(user_id , document_id):
     """
     Get document by id.
     Args:
         document_id (str): The document id.
     """
-    logger.info(f"Get document detail user id: ->: {user_id}")
+    logger.info("Get document detail user id: ->: %s", user_id)
 
     try:
-        document = database[Collections.USER_DOCUMENTS].find_one(
+        document = await database[Collections.USER_DOCUMENTS].find_one(
             {"id": document_id, "user_id": user_id},
             {"_id": 0}
         )
@@ -164,42 +235,43 @@ def get_document_by_id(user_id , document_id):
         return document
 
     except ServerSelectionTimeoutError as error:
-        logger.error(f"ServerSelectionTimeoutError: {error}")
+        logger.error("ServerSelectionTimeoutError: %s", error)
 
     except ConnectionFailure as error:
-        logger.error(f"ConnectionFailure: {error}")
+        logger.error("ConnectionFailure: %s", error)
 
     except OperationFailure as error:
-        logger.error(f"OperationFailure: {error}")
+        logger.error("OperationFailure: %s", error)
 
     except PyMongoError as error:
-        logger.error(f"PyMongoError: {error}")
+        logger.error("PyMongoError: %s", error)
 
 
-def delete_document(document_id, user_id):
+async def delete_document(document_id, user_id):
     """
     Delete document per user.
     Args:
         document_id (str): The document id.
     """
-    logger.info(f"Delete document per user id: ->: {user_id}")
+    logger.info("Delete document per user id: ->: %s", user_id)
 
     try:
-        database[Collections.USER_DOCUMENTS].update_one(
+        await database[Collections.USER_DOCUMENTS].update_one(
             {"id": document_id},
             {"$set": {"deleted_at": datetime.now()}}
         )
+        await user_profiles.refresh(user_id)
 
         return True
 
     except ServerSelectionTimeoutError as error:
-        logger.error(f"ServerSelectionTimeoutError: {error}")
+        logger.error("ServerSelectionTimeoutError: %s", error)
 
     except ConnectionFailure as error:
-        logger.error(f"ConnectionFailure: {error}")
+        logger.error("ConnectionFailure: %s", error)
 
     except OperationFailure as error:
-        logger.error(f"OperationFailure: {error}")
+        logger.error("OperationFailure: %s", error)
 
     except PyMongoError as error:
-        logger.error(f"PyMongoError: {error}")
+        logger.error("PyMongoError: %s", error)
@@ -2,221 +2,352 @@ from datetime import datetime
 
 from utils.logger import Logger
 
-from services import Password
+from fastapi import HTTPException, status
+
+from services.password import password_pool
+from services.email_filter import email_filter
+from services.principal_cache import principal_cache
+from services.account_numbers import account_numbers
 
 from database import database, Collections
-from database.controllers.address import create_address, get_address_per_user
-from database.controllers.account import create_account, get_accounts_per_user
-from database.controllers.document import create_document, get_documents_per_user
+from database.base import run_in_transaction
+from database.profiles import user_profiles
+from database.controllers.address import validate_new_addresses
+from database.controllers.document import validate_new_documents
+
+from models.users.users_address_model import Address
+from models.users.users_bank_account_model import BankAccount
+from models.users.users_documents_model import Documents
 
 from pymongo.errors import (
+    DuplicateKeyError,
     ServerSelectionTimeoutError,
     ConnectionFailure,
     OperationFailure,
     PyMongoError
 )
 
-logger = Logger.init("UserControllerLogger")
+logger = Logger.init(__name__)
+
+USER_AUTH_PROJECTION = {"_id": 0, "id": 1, "is_active": 1, "deleted_at": 1, "status": 1}
+USER_LOGIN_PROJECTION = {"_id": 0, "id": 1, "password": 1}
+USER_VERSION_FIELDS = ("id", "updated_at", "last_login", "deleted_at")
+
+
+def email_exists():
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="email already exists in database"
+    )
+
 
+async def is_duplicate_email(error, email):
+    """
+    Check a duplicate key error was raised by the unique email index.
+    Servers without keyPattern in the error details are asked for the email.
+    Args:
+        error (DuplicateKeyError): The error.
+        email (str): The email written.
+    """
+    key_pattern = (error.details or {}).get("keyPattern")
+    if key_pattern is not None:
+        return "email" in key_pattern
+    return bool(await check_user_by_email(email))
 
-def create_user_model(user):
+
+async def create_user_model(user):
     from models.users.users_model import User
     """
-    Create user
+    Create user with addresses, documents and accounts.
+    Validation runs before any write, then each collection is written
+    with one insert_many inside a transaction when the server supports it.
+    The unique email index rejects a registered email when the user is written,
+    the email filter only saves the bcrypt hash of the likely duplicates.
     Args:
         user (User): The user data.
     Returns:
         UserResponse: User data
     """
-    logger.info(f"Create user ->: {user.email}")
+    logger.info("Create user ->: %s", user.email)
 
     try:
+        validate_new_addresses(user.address)
+        await validate_new_documents(user.documents)
+
+        if email_filter.needs_lookup(user.email) and await check_user_by_email(user.email):
+            raise email_exists()
+
         user_payload = User(
             first_name=user.first_name,
             last_name=user.last_name,
             email=user.email,
-            password=Password.get_password_hash(user.password),
+            password=await password_pool.get_password_hash(user.password),
             phone=user.phone,
         ).dict()
+        user_id = user_payload["id"]
+        numbers = await account_numbers.allocate(len(user.accounts)) if user.accounts else []
+
+        children = {
+            Collections.USER_ADDRESSES: [
+                Address(user_id=user_id, **address.dict()).dict() for address in user.address
+            ],
+            Collections.USER_DOCUMENTS: [
+                Documents(user_id=user_id, **document.dict()).dict() for document in user.documents
+            ],
+            Collections.USER_BANK_ACCOUNTS: [
+                BankAccount(
+                    user_id=user_id,
+                    account_type=account.account_type,
+                    account_number=account_number,
+                    account_digit=account_digit,
+                ).dict()
+                for account, (account_number, account_digit) in zip(user.accounts, numbers)
+            ],
+        }
+
+        async def insert_user(session):
+            await database[Collections.USERS].insert_one(user_payload, session=session)
+            for collection, documents in children.items():
+                if documents:
+                    await database[collection].insert_many(documents, session=session)
+
+        async def remove_user():
+            for collection in children:
+                await database[collection].delete_many({"user_id": user_id})
+            await database[Collections.USERS].delete_one({"id": user_id})
 
-        for address in user.address:
-            create_address(user_payload["id"], address)
-        for document in user.documents:
-            create_document(user_payload["id"], document)
-        for account in user.accounts:
-            create_account(user_payload["id"], account)
+        try:
+            await run_in_transaction(insert_user, rollback=remove_user)
 
-        database[Collections.USERS].insert_one(user_payload)
+        except DuplicateKeyError as error:
+            if await is_duplicate_email(error, user.email):
+                raise email_exists()
 
+            logger.error("DuplicateKeyError creating user: %s", error)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Could not create user."
+            )
+
+        email_filter.add(user.email)
+        await user_profiles.refresh(user_id)
         return user
 
     except ValueError as error:
-        logger.error(f"Error creating user: {error}")
+        logger.error("Error creating user: %s", error)
         raise ValueError(error)
 
     except ServerSelectionTimeoutError as error:
-        logger.error(f"ServerSelectionTimeoutError: {error}")
+        logger.error("ServerSelectionTimeoutError: %s", error)
 
     except ConnectionFailure as error:
-        logger.error(f"ConnectionFailure: {error}")
+        logger.error("ConnectionFailure: %s", error)
 
     except OperationFailure as error:
-        logger.error(f"OperationFailure: {error}")
+        logger.error("OperationFailure: %s", error)
 
     except PyMongoError as error:
-        logger.error(f"PyMongoError: {error}")
+        logger.error("PyMongoError: %s", error)
 
 
-def check_user_by_email(email):
+async def check_user_by_email(email):
     """
     check email exists in database
     Args:
         email (str): The user email.
     """
-    logger.info(f"Check user by email ->: {email}")
-    user = database[Collections.USERS].find_one({"email": email}, {"_id": 0})
+    logger.info("Check user by email ->: %s", email)
+    user = await database[Collections.USERS].find_one({"email": email}, {"_id": 0, "id": 1})
 
     if user:
-        logger.error(f"User already exists: {email}")
+        logger.error("User already exists: %s", email)
         return user
 
-    logger.info(f"User not exists: {email}")
+    logger.info("User not exists: %s", email)
     return False
 
 
-def get_user_by_id(user_id):
+async def get_user_login(email):
     """
-    Get user by id
+    Get the id and password hash of a user by email.
+    Args:
+        email (str): The user email.
+    """
+    logger.info("Get user login by email ->: %s", email)
+    return await database[Collections.USERS].find_one({"email": email}, USER_LOGIN_PROJECTION)
+
+
+async def get_user_by_id(user_id):
+    """
+    Get user by id with the count and first page of accounts, documents and address.
+    Served by the user_profiles read model when USER_PROFILES_ENABLED is set,
+    else the user and the child collections are read concurrently.
     Args:
         user_id (str): The user id.
     """
-    logger.info(f"Get user by id ->: {user_id}")
-    response = None
+    logger.info("Get user by id ->: %s", user_id)
     try:
-        user = database[Collections.USERS].find_one({"id": user_id}, {"_id": 0, "password": 0})
+        user = await user_profiles.get(user_id)
 
         if not user:
-            logger.error(f"User not found: {user_id}")
+            logger.error("User not found: %s", user_id)
             raise ValueError("User not found")
 
-        response = {
-            "id": user["id"],
-            "first_name": user["first_name"],
-            "last_name": user["last_name"],
-            "email": user["email"],
-            "phone": user["phone"],
-            "status": user["status"],
-            "is_active": user["is_active"],
-            "last_login": user["last_login"],
-            "accounts": get_accounts_per_user(user["id"]),
-            "documents": get_documents_per_user(user["id"]),
-            "address": get_address_per_user(user["id"]),
-            "created_at": user["created_at"],
-            "updated_at": user["updated_at"],
-            "deleted_at": user["deleted_at"],
-        }
+        return user
+
+    except ServerSelectionTimeoutError as error:
+        logger.error("ServerSelectionTimeoutError: %s", error)
+
+    except ConnectionFailure as error:
+        logger.error("ConnectionFailure: %s", error)
+
+    except OperationFailure as error:
+        logger.error("OperationFailure: %s", error)
+
+    except PyMongoError as error:
+        logger.error("PyMongoError: %s", error)
+
+
+async def get_user_version(user_id):
+    """
+    Get the values the user profile ETag is built from: the user updated_at,
+    last_login and deleted_at, and the count, next token and id and updated_at
+    of the first page of accounts, documents and address.
+    Args:
+        user_id (str): The user id.
+    Returns:
+        dict: The user fields and one page per list, None if not found.
+    """
+    logger.info("Get user version by id ->: %s", user_id)
+    try:
+        return await user_profiles.get_version(user_id, USER_VERSION_FIELDS)
+
+    except ServerSelectionTimeoutError as error:
+        logger.error("ServerSelectionTimeoutError: %s", error)
+
+    except ConnectionFailure as error:
+        logger.error("ConnectionFailure: %s", error)
+
+    except OperationFailure as error:
+        logger.error("OperationFailure: %s", error)
+
+    except PyMongoError as error:
+        logger.error("PyMongoError: %s", error)
 
-        return response
+
+async def get_user_auth_status(user_id):
+    """
+    Get only the user status fields needed to authorize a request.
+    Args:
+        user_id (str): The user id.
+    Returns:
+        dict: id, is_active, deleted_at and status or None if not found.
+    """
+    logger.info("Get user auth status by id ->: %s", user_id)
+    try:
+        return await database[Collections.USERS].find_one({"id": user_id}, USER_AUTH_PROJECTION)
 
     except ServerSelectionTimeoutError as error:
-        logger.error(f"ServerSelectionTimeoutError: {error}")
+        logger.error("ServerSelectionTimeoutError: %s", error)
 
     except ConnectionFailure as error:
-        logger.error(f"ConnectionFailure: {error}")
+        logger.error("ConnectionFailure: %s", error)
 
     except OperationFailure as error:
-        logger.error(f"OperationFailure: {error}")
+        logger.error("OperationFailure: %s", error)
 
     except PyMongoError as error:
-        logger.error(f"PyMongoError: {error}")
+        logger.error("PyMongoError: %s", error)
 
 
-def update_user_model(user_id, user):
+async def update_user_model(user_id, user):
     """
     Update user by id
     Args:
         user_id (str): The user id.
         payload (dict): The user data.
     """
-    logger.info(f"update user by id ->: {user_id}\npayload: {user}")
+    logger.info("update user by id ->: %s payload: %s", user_id, user)
     try:
         payload = user.dict(exclude_none=True)
         payload["updated_at"] = datetime.now()
         
-        database[Collections.USERS].update_one(
+        await database[Collections.USERS].update_one(
             {"id": user_id},
             {"$set": payload}
         )
+        principal_cache.invalidate(user_id)
+        await user_profiles.set_fields(user_id, payload)
 
-        user = database[Collections.USERS].find_one({"id": user_id}, {"_id": 0, "password": 0})
+        user = await database[Collections.USERS].find_one({"id": user_id}, {"_id": 0, "password": 0})
 
         return user
 
     except ServerSelectionTimeoutError as error:
-        logger.error(f"ServerSelectionTimeoutError: {error}")
+        logger.error("ServerSelectionTimeoutError: %s", error)
         return False
 
     except ConnectionFailure as error:
-        logger.error(f"ConnectionFailure: {error}")
+        logger.error("ConnectionFailure: %s", error)
         return False
 
     except OperationFailure as error:
-        logger.error(f"OperationFailure: {error}")
+        logger.error("OperationFailure: %s", error)
         return False
 
     except PyMongoError as error:
-        logger.error(f"PyMongoError: {error}")
+        logger.error("PyMongoError: %s", error)
         return False
 
 
-def delete_user_by_id(user_id):
+async def delete_user_by_id(user_id):
     """
     Delete user by id
     Args:
         user_id (str): The user id.
     """
-    logger.info(f"delete user by id ->: {user_id}")
+    logger.info("delete user by id ->: %s", user_id)
     try:
-        user = database[Collections.USERS].find_one({"id": user_id}, {"_id": 0, "password": 0})
+        user = await database[Collections.USERS].find_one({"id": user_id}, {"_id": 0, "password": 0})
         
         if not user:
-            logger.error(f"User not found: {user_id}")
+            logger.error("User not found: %s", user_id)
             raise ValueError("User not found")
         
-        database[Collections.USERS].update_one(
-            {"id": user_id},
-            {"$set": {"deleted_at": datetime.now()}}
-        )
+        deleted = {"deleted_at": datetime.now()}
+        await database[Collections.USERS].update_one({"id": user_id}, {"$set": deleted})
+        principal_cache.invalidate(user_id)
+        await user_profiles.set_fields(user_id, deleted)
 
         return True
 
     except ServerSelectionTimeoutError as error:
-        logger.error(f"ServerSelectionTimeoutError: {error}")
+        logger.error("ServerSelectionTimeoutError: %s", error)
         return False
 
     except ConnectionFailure as error:
-        logger.error(f"ConnectionFailure: {error}")
+        logger.error("ConnectionFailure: %s", error)
         return False
 
     except OperationFailure as error:
-        logger.error(f"OperationFailure: {error}")
+        logger.error("OperationFailure: %s", error)
         return False
 
     except PyMongoError as error:
-        logger.error(f"PyMongoError: {error}")
+        logger.error("PyMongoError: %s", error)
         return False
 
 
-def user_detail(user_id):
+async def user_detail(user_id):
     """
     Get user detail by id
     Args:
         user_id (str): The user id.
     """
-    logger.info(f"get user detail by id ->: {user_id}")
+    logger.info("get user detail by id ->: %s", user_id)
 
     try:
-        user = database[Collections.USERS].find_one({"id": user_id}, {"_id": 0, "password": 0})
+        user = await database[Collections.USERS].find_one({"id": user_id}, {"_id": 0, "password": 0})
 
         return {
             "id": user["id"],
@@ -232,49 +363,84 @@ def user_detail(user_id):
         }
 
     except ServerSelectionTimeoutError as error:
-        logger.error(f"ServerSelectionTimeoutError: {error}")
+        logger.error("ServerSelectionTimeoutError: %s", error)
         return False
 
     except ConnectionFailure as error:
-        logger.error(f"ConnectionFailure: {error}")
+        logger.error("ConnectionFailure: %s", error)
         return False
 
     except OperationFailure as error:
-        logger.error(f"OperationFailure: {error}")
+        logger.error("OperationFailure: %s", error)
         return False
 
     except PyMongoError as error:
-        logger.error(f"PyMongoError: {error}")
+        logger.error("PyMongoError: %s", error)
         return False
 
 
-def set_last_login(user_id):
+async def update_user_password(user_id, password):
     """
-    Set last login in user database
+    Replace the user password hash
     Args:
         user_id (str): The user id.
+        password (str): The new password hash.
     """
-    logger.info(f"set user last login id ->: {user_id}")
-    try:    
-        database[Collections.USERS].update_one(
+    logger.info("update user password hash id ->: %s", user_id)
+    try:
+        updated_at = datetime.now()
+        await database[Collections.USERS].update_one(
             {"id": user_id},
-            {"$set": {"last_login": datetime.now()}}
+            {"$set": {"password": password, "updated_at": updated_at}}
         )
+        await user_profiles.set_fields(user_id, {"updated_at": updated_at})
+
+        return True
+
+    except ServerSelectionTimeoutError as error:
+        logger.error("ServerSelectionTimeoutError: %s", error)
+        return False
+
+    except ConnectionFailure as error:
+        logger.error("ConnectionFailure: %s", error)
+        return False
+
+    except OperationFailure as error:
+        logger.error("OperationFailure: %s", error)
+        return False
+
+    except PyMongoError as error:
+        logger.error("PyMongoError: %s", error)
+        return False
+
+
+async def set_last_login(user_id):
+    """
+    Set last login in user database
+    Args:
+        user_id (str): The user id.
+    """
+    logger.info("set user last login id ->: %s", user_id)
+    try:    
+        last_login = {"last_login": datetime.now()}
+        await database[Collections.USERS].update_one({"id": user_id}, {"$set": last_login})
+        principal_cache.invalidate(user_id)
+        await user_profiles.set_fields(user_id, last_login)
 
         return True
 
     except ServerSelectionTimeoutError as error:
-        logger.error(f"ServerSelectionTimeoutError: {error}")
+        logger.error("ServerSelectionTimeoutError: %s", error)
         return False
 
     except ConnectionFailure as error:
-        logger.error(f"ConnectionFailure: {error}")
+        logger.error("ConnectionFailure: %s", error)
         return False
 
     except OperationFailure as error:
-        logger.error(f"OperationFailure: {error}")
+        logger.error("OperationFailure: %s", error)
         return False
 
     except PyMongoError as error:
-        logger.error(f"PyMongoError: {error}")
+        logger.error("PyMongoError: %s", error)
         return False
@@ -0,0 +1,124 @@
+import zlib
+import asyncio
+
+from collections import defaultdict
+
+import orjson
+
+from settings import settings
+
+from database import database, Collections
+from database.archive import ARCHIVES
+
+from utils.logger import Logger, LogPipeline
+from utils.responses import default
+
+
+logger = Logger.init(__name__)
+
+CHILDREN = {
+    "accounts": Collections.USER_BANK_ACCOUNTS,
+    "address": Collections.USER_ADDRESSES,
+    "documents": Collections.USER_DOCUMENTS,
+}
+
+
+async def _children(collection, user_ids, include_deleted):
+    query = {"user_id": {"$in": user_ids}}
+    if not include_deleted:
+        query["deleted_at"] = ""
+
+    grouped = defaultdict(list)
+    async for document in database[collection].find(query, {"_id": 0}):
+        grouped[document["user_id"]].append(document)
+
+    if include_deleted:
+        async for document in database[ARCHIVES[collection]].find(query, {"_id": 0}):
+            grouped[document["user_id"]].append(document)
+    return grouped
+
+
+async def export_users(batch_size=settings.EXPORT_BATCH_SIZE, include_deleted=False):
+    """
+    Read every user with its accounts, address and documents.
+    Users are read with one server-side cursor, and the children of each batch
+    are read with one $in query per collection, so memory holds one batch.
+    Args:
+        batch_size (int): Users per batch.
+        include_deleted (bool): Also export deleted users and children, archived ones included.
+    Yields:
+        list: The users of one batch.
+    """
+    query = {} if include_deleted else {"deleted_at": ""}
+    cursor = database[Collections.USERS].find(query, {"_id": 0, "password": 0}).batch_size(batch_size)
+
+    while True:
+        users = await cursor.to_list(batch_size)
+        if not users:
+            return
+
+        user_ids = [user["id"] for user in users]
+        children = await asyncio.gather(*(
+            _children(collection, user_ids, include_deleted) for collection in CHILDREN.values()
+        ))
+        for user in users:
+            for name, grouped in zip(CHILDREN, children):
+                user[name] = grouped.get(user["id"], [])
+
+        yield users
+
+
+async def export_ndjson(batch_size=settings.EXPORT_BATCH_SIZE, include_deleted=False, compress=False):
+    """
+    Encode the export as NDJSON, one chunk per batch.
+    Args:
+        batch_size (int): Users per batch.
+        include_deleted (bool): Also export deleted users and children.
+        compress (bool): Gzip the stream.
+    Yields:
+        bytes: The next chunk.
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+    exported = 0
+
+    async for users in export_users(batch_size, include_deleted):
+        chunk = b"".join(
+            orjson.dumps(user, default=default, option=orjson.OPT_APPEND_NEWLINE) for user in users
+        )
+        exported += len(users)
+
+        if compressor is not None:
+            chunk = compressor.compress(chunk)
+        if chunk:
+            yield chunk
+
+    if compressor is not None:
+        yield compressor.flush()
+
+    logger.info("Exported %s users", exported)
+
+
+if __name__ == "__main__":
+    import sys
+    import argparse
+
+    LogPipeline.start()
+
+    parser = argparse.ArgumentParser(description="Export the users with their children as NDJSON.")
+    parser.add_argument("--output", help="output file, stdout when missing, gzipped when it ends with .gz")
+    parser.add_argument("--batch-size", type=int, default=settings.EXPORT_BATCH_SIZE)
+    parser.add_argument("--include-deleted", action="store_true")
+    parser.add_argument("--gzip", action="store_true", help="gzip the output")
+    args = parser.parse_args()
+
+    compress = args.gzip or bool(args.output and args.output.endswith(".gz"))
+
+    async def export(output):
+        async for chunk in export_ndjson(args.batch_size, args.include_deleted, compress):
+            output.write(chunk)
+
+    if args.output:
+        with open(args.output, "wb") as output_file:
+            asyncio.run(export(output_file))
+    else:
+        asyncio.run(export(sys.stdout.buffer))
@@ -0,0 +1,399 @@
+import csv
+import json
+import asyncio
+
+from pydantic import ValidationError
+
+from fastapi import HTTPException
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from settings import settings
+
+from services.password import Password, PasswordPool
+from services.account_numbers import account_numbers
+
+from database import database, Collections
+from database.profiles import user_profiles
+from database.controllers.address import validate_new_addresses
+from database.controllers.document import MULTIPLE_DOCUMENT_TYPES
+
+from models.users.users_model import User, UserCreateRequest
+from models.users.users_address_model import Address
+from models.users.users_bank_account_model import BankAccount
+from models.users.users_documents_model import Documents
+
+from utils.logger import Logger, LogPipeline
+
+
+logger = Logger.init(__name__)
+
+CHILD_COLUMNS = ("documents", "address", "accounts")
+PLACEHOLDER_PASSWORD = "pre-hashed"
+
+
+async def read_rows(lines, file_format="ndjson", start=0):
+    """
+    Parse NDJSON or CSV lines into row dicts.
+    CSV rows hold the user columns, documents, address and accounts are JSON arrays.
+    Args:
+        lines (async iterable): The text lines.
+        file_format (str): ndjson or csv.
+        start (int): Rows to skip, from a checkpoint.
+    Yields:
+        tuple: (row number, row dict or None when it cannot be parsed)
+    """
+    header = None
+    number = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+
+        if file_format == "csv" and header is None:
+            header = next(csv.reader([line]))
+            continue
+
+        number += 1
+        if number <= start:
+            continue
+
+        try:
+            if file_format == "csv":
+                row = dict(zip(header, next(csv.reader([line]))))
+                for column in CHILD_COLUMNS:
+                    row[column] = json.loads(row[column]) if row.get(column) else []
+            else:
+                row = json.loads(line)
+
+        except (ValueError, StopIteration):
+            row = None
+
+        yield number, row
+
+
+def prepare_row(row, pre_hashed):
+    """
+    Validate one row with UserCreateRequest, like /register/.
+    Args:
+        row (dict): The row.
+        pre_hashed (bool): The row holds a bcrypt password hash.
+    Returns:
+        tuple: (UserCreateRequest, password hash or None)
+    """
+    row = dict(row)
+    password_hash = None
+
+    if pre_hashed:
+        password_hash = row.pop("password_hash", None) or row.get("password")
+        if not password_hash or not password_hash.startswith("$2"):
+            raise ValueError("password_hash is not a bcrypt hash")
+        row["password"] = PLACEHOLDER_PASSWORD
+
+    row.setdefault("confirm_password", row.get("password"))
+    user = UserCreateRequest.parse_obj(row)
+    validate_new_addresses(user.address)
+
+    return user, password_hash
+
+
+class UserImporter:
+    """
+    Imports validated users in chunks, one insert_many per collection and chunk.
+    Emails already registered are skipped, so replaying a chunk is harmless.
+    Children are written before their users, a user is only visible once complete.
+    The children of the users whose write fails are removed, and a chunk
+    failing on the server is removed whole before the error stops the import.
+    Args:
+        chunk_size (int): Rows per chunk.
+        pre_hashed (bool): Rows carry bcrypt hashes instead of passwords.
+        hash_workers (int): Processes hashing the passwords.
+        max_errors (int): Failed rows kept in errors, None keeps every one
+            until the caller clears them. Every failure is counted in summary.
+    """
+    def __init__(
+        self,
+        chunk_size=settings.IMPORT_CHUNK_SIZE,
+        pre_hashed=False,
+        hash_workers=settings.IMPORT_HASH_WORKERS,
+        max_errors=settings.IMPORT_MAX_ERRORS,
+    ):
+        self.chunk_size = chunk_size
+        self.pre_hashed = pre_hashed
+        self.hash_workers = hash_workers
+        self.password_pool = PasswordPool(max_workers=hash_workers, max_pending=chunk_size)
+        self.taken_types = None
+        self.summary = {"rows": 0, "imported": 0, "skipped": 0, "failed": 0, "last_row": 0}
+        self.max_errors = max_errors
+        self.errors = []
+
+    def fail(self, number, reason):
+        self.summary["failed"] += 1
+        if self.max_errors is None or len(self.errors) < self.max_errors:
+            self.errors.append({"row": number, "error": reason})
+
+    async def run(self, rows, on_chunk=None):
+        """
+        Import every row.
+        Args:
+            rows (async iterable): (row number, row) pairs from read_rows.
+            on_chunk (coroutine function): Awaited with the last row number of each chunk.
+        Returns:
+            dict: rows, imported, skipped and failed counters and the last row imported.
+        """
+        chunk = []
+        try:
+            async for number, row in rows:
+                chunk.append((number, row))
+                if len(chunk) >= self.chunk_size:
+                    await self.import_chunk(chunk, on_chunk)
+                    chunk = []
+
+            if chunk:
+                await self.import_chunk(chunk, on_chunk)
+
+        finally:
+            self.password_pool.shutdown(wait=True)
+
+        return self.summary
+
+    async def import_chunk(self, chunk, on_chunk=None):
+        """
+        Validate, hash and write one chunk, then checkpoint its last row.
+        Args:
+            chunk (list): (row number, row) pairs.
+            on_chunk (coroutine function): Awaited with the last row number.
+        """
+        await self.write_chunk(chunk)
+
+        self.summary["rows"] += len(chunk)
+        self.summary["last_row"] = chunk[-1][0]
+        if on_chunk:
+            await on_chunk(chunk[-1][0])
+
+    async def write_chunk(self, chunk):
+        """
+        Validate every row, drop the registered emails, hash and write the rest.
+        """
+        valid = []
+        for number, row in chunk:
+            if not isinstance(row, dict):
+                self.fail(number, "Invalid row")
+                continue
+            try:
+                user, password_hash = prepare_row(row, self.pre_hashed)
+                valid.append((number, user, password_hash))
+
+            except ValidationError as error:
+                self.fail(number, error.errors())
+
+            except HTTPException as error:
+                self.fail(number, error.detail)
+
+            except ValueError as error:
+                self.fail(number, str(error))
+
+        valid = await self.skip_registered(valid)
+        valid = await self.check_documents(valid)
+        if not valid:
+            return
+
+        if not self.pre_hashed:
+            passwords = [user.password for _, user, _ in valid]
+            size = -(-len(passwords) // max(self.hash_workers, 1))
+            slices = await asyncio.gather(*(
+                self.password_pool.run(Password.get_password_hashes, passwords[index:index + size])
+                for index in range(0, len(passwords), size)
+            ))
+            hashes = [password_hash for hashes in slices for password_hash in hashes]
+            valid = [(number, user, password_hash) for (number, user, _), password_hash in zip(valid, hashes)]
+
+        await self.write(valid)
+
+    async def skip_registered(self, valid):
+        emails = [user.email for _, user, _ in valid]
+        registered = {
+            user["email"] for user in await database[Collections.USERS].find(
+                {"email": {"$in": emails}}, {"_id": 0, "email": 1}
+            ).to_list(None)
+        }
+
+        kept = []
+        seen = set()
+        for number, user, password_hash in valid:
+            if user.email in registered:
+                self.summary["skipped"] += 1
+            elif user.email in seen:
+                self.fail(number, "email already exists in file")
+            else:
+                seen.add(user.email)
+                kept.append((number, user, password_hash))
+        return kept
+
+    async def check_documents(self, valid):
+        """
+        Apply the single document type rule of validate_new_documents with one query per import.
+        """
+        if self.taken_types is None:
+            self.taken_types = set()
+            for collection in (Collections.USER_DOCUMENTS, Collections.USER_DOCUMENTS_ARCHIVE):
+                self.taken_types.update(await database[collection].distinct(
+                    "document_type", {"document_type": {"$nin": MULTIPLE_DOCUMENT_TYPES}}
+                ))
+
+        kept = []
+        for number, user, password_hash in valid:
+            keys = [(document.document_type, document.document_number) for document in user.documents]
+            single_types = [
+                document.document_type.value for document in user.documents
+                if document.document_type not in MULTIPLE_DOCUMENT_TYPES
+            ]
+
+            if len(keys) != len(set(keys)):
+                self.fail(number, "Document already exists")
+            elif len(single_types) != len(set(single_types)) or self.taken_types.intersection(single_types):
+                self.fail(number, "the selected document type already exists in the database")
+            else:
+                self.taken_types.update(single_types)
+                kept.append((number, user, password_hash))
+        return kept
+
+    async def remove(self, children, user_ids, users=False):
+        """
+        Delete what a chunk wrote for some users, so no child is left without its user.
+        Args:
+            children (dict): The child collections written.
+            user_ids (iterable): The user ids.
+            users (bool): Delete the users too.
+        """
+        user_ids = list(user_ids)
+        for collection in children:
+            await database[collection].delete_many({"user_id": {"$in": user_ids}})
+        if users:
+            await database[Collections.USERS].delete_many({"id": {"$in": user_ids}})
+
+    async def write(self, valid):
+        users = []
+        children = {
+            Collections.USER_ADDRESSES: [],
+            Collections.USER_DOCUMENTS: [],
+            Collections.USER_BANK_ACCOUNTS: [],
+        }
+        numbers = {}
+        account_count = sum(len(user.accounts) for _, user, _ in valid)
+        allocated = iter(await account_numbers.allocate(account_count) if account_count else [])
+
+        for number, user, password_hash in valid:
+            user_payload = User(
+                first_name=user.first_name,
+                last_name=user.last_name,
+                email=user.email,
+                password=password_hash,
+                phone=user.phone,
+            ).dict()
+            user_id = user_payload["id"]
+            users.append(user_payload)
+            numbers[user_id] = number
+
+            children[Collections.USER_ADDRESSES].extend(
+                Address(user_id=user_id, **address.dict()).dict() for address in user.address
+            )
+            children[Collections.USER_DOCUMENTS].extend(
+                Documents(user_id=user_id, **document.dict()).dict() for document in user.documents
+            )
+            for account in user.accounts:
+                account_number, account_digit = next(allocated)
+                children[Collections.USER_BANK_ACCOUNTS].append(BankAccount(
+                    user_id=user_id,
+                    account_type=account.account_type,
+                    account_number=account_number,
+                    account_digit=account_digit,
+                ).dict())
+
+        children_failed = set()
+        failed_ids = set()
+        try:
+            for collection, documents in children.items():
+                if not documents:
+                    continue
+                try:
+                    await database[collection].insert_many(documents, ordered=False)
+
+                except BulkWriteError as error:
+                    children_failed.update(
+                        documents[write_error["index"]]["user_id"] for write_error in error.details["writeErrors"]
+                    )
+
+            if children_failed:
+                for user_id in children_failed:
+                    self.fail(numbers[user_id], "Could not write the user accounts, address or documents")
+                await self.remove(children, children_failed)
+                users = [user for user in users if user["id"] not in children_failed]
+
+            if users:
+                await database[Collections.USERS].insert_many(users, ordered=False)
+
+        except BulkWriteError as error:
+            for write_error in error.details["writeErrors"]:
+                user_id = users[write_error["index"]]["id"]
+                failed_ids.add(user_id)
+                self.fail(numbers[user_id], "email already exists in database")
+
+            await self.remove(children, failed_ids)
+
+        except PyMongoError as error:
+            logger.error("Chunk write failed, removing its users: %s", error)
+            await self.remove(children, list(numbers), users=True)
+            raise
+
+        self.summary["imported"] += len(users) - len(failed_ids)
+        await user_profiles.refresh_many(user["id"] for user in users if user["id"] not in failed_ids)
+
+
+async def file_lines(path):
+    with open(path, encoding="utf-8") as source:
+        for line in source:
+            yield line
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import argparse
+
+    LogPipeline.start()
+
+    parser = argparse.ArgumentParser(description="Import users from an NDJSON or CSV onboarding file.")
+    parser.add_argument("source", help="the NDJSON or CSV file")
+    parser.add_argument("--format", choices=("ndjson", "csv"), help="defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=settings.IMPORT_CHUNK_SIZE)
+    parser.add_argument("--hash-workers", type=int, default=settings.IMPORT_HASH_WORKERS)
+    parser.add_argument("--pre-hashed", action="store_true", help="rows carry bcrypt hashes in password_hash")
+    parser.add_argument("--checkpoint", help="progress file, defaults to <source>.checkpoint")
+    parser.add_argument("--errors", help="failed rows file, defaults to <source>.errors.ndjson")
+    args = parser.parse_args()
+
+    file_format = args.format or ("csv" if args.source.endswith(".csv") else "ndjson")
+    checkpoint_path = args.checkpoint or f"{args.source}.checkpoint"
+    errors_path = args.errors or f"{args.source}.errors.ndjson"
+
+    start = 0
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path, encoding="utf-8") as checkpoint_file:
+            start = json.load(checkpoint_file)["rows"]
+        logger.info("Resuming %s after row %s", args.source, start)
+
+    importer = UserImporter(args.chunk_size, args.pre_hashed, args.hash_workers, max_errors=None)
+
+    async def save_checkpoint(rows):
+        with open(f"{checkpoint_path}.tmp", "w", encoding="utf-8") as checkpoint_file:
+            json.dump({"source": args.source, "rows": rows}, checkpoint_file)
+        os.replace(f"{checkpoint_path}.tmp", checkpoint_path)
+
+        with open(errors_path, "a", encoding="utf-8") as errors_file:
+            for error in importer.errors:
+                errors_file.write(json.dumps(error, default=str) + "\n")
+        importer.errors.clear()
+
+    summary = asyncio.run(importer.run(read_rows(file_lines(args.source), file_format, start), save_checkpoint))
+    logger.info("Import finished: %s", summary)
+    sys.exit(1 if summary["failed"] else 0)
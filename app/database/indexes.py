@@ -0,0 +1,216 @@
+from datetime import datetime
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import PyMongoError
+
+from utils import MissingUniqueIndexes
+from utils.logger import Logger, LogPipeline
+
+from database.collections import Collections
+
+
+logger = Logger.init(__name__)
+
+
+def unique_id():
+    return IndexModel([("id", ASCENDING)], unique=True, name="id_unique")
+
+
+def user_live_rows():
+    """
+    Page index of the live rows, deleted rows are left out of it.
+    """
+    return IndexModel(
+        [("user_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)],
+        partialFilterExpression={"deleted_at": ""},
+        name="user_id_created_at_id_live"
+    )
+
+
+def deleted_rows():
+    """
+    Index of the deleted rows only, read by the archiver.
+    """
+    return IndexModel(
+        [("deleted_at", ASCENDING)],
+        partialFilterExpression={"deleted_at": {"$type": "date"}},
+        name="deleted_at_deleted"
+    )
+
+
+def address_key():
+    return IndexModel(
+        [("user_id", ASCENDING), ("street", ASCENDING), ("number", ASCENDING), ("zip_code", ASCENDING)],
+        name="user_id_street_number_zip_code"
+    )
+
+
+def document_key():
+    return IndexModel(
+        [("user_id", ASCENDING), ("document_type", ASCENDING), ("document_number", ASCENDING)],
+        name="user_id_document_type_document_number"
+    )
+
+
+INDEXES = {
+    Collections.USERS: [
+        unique_id(),
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+    ],
+    Collections.USER_BANK_ACCOUNTS: [
+        unique_id(),
+        user_live_rows(),
+        deleted_rows(),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        IndexModel([("agency", ASCENDING), ("account_number", ASCENDING)], unique=True, name="agency_account_number_unique"),
+    ],
+    Collections.USER_ADDRESSES: [
+        unique_id(),
+        user_live_rows(),
+        deleted_rows(),
+        address_key(),
+    ],
+    Collections.USER_DOCUMENTS: [
+        unique_id(),
+        user_live_rows(),
+        deleted_rows(),
+        document_key(),
+        IndexModel([("document_type", ASCENDING)], name="document_type"),
+    ],
+    Collections.USER_BANK_ACCOUNTS_ARCHIVE: [
+        unique_id(),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+    ],
+    Collections.USER_ADDRESSES_ARCHIVE: [
+        unique_id(),
+        address_key(),
+    ],
+    Collections.USER_DOCUMENTS_ARCHIVE: [
+        unique_id(),
+        document_key(),
+        IndexModel([("document_type", ASCENDING)], name="document_type"),
+    ],
+    Collections.USER_PROFILES: [
+        unique_id(),
+    ],
+    Collections.TOKEN_DENYLIST: [
+        IndexModel([("jti", ASCENDING)], unique=True, name="jti_unique"),
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+        IndexModel([("created_at", ASCENDING)], name="created_at"),
+    ],
+    Collections.RATE_LIMITS: [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    ],
+}
+
+
+OBSOLETE_INDEXES = {
+    Collections.USER_BANK_ACCOUNTS: ["user_id_deleted_at_created_at_id"],
+    Collections.USER_ADDRESSES: ["user_id_deleted_at_created_at_id"],
+    Collections.USER_DOCUMENTS: ["user_id_deleted_at_created_at_id"],
+}
+
+
+QUERY_SHAPES = [
+    (Collections.USERS, {"id": ""}),
+    (Collections.USERS, {"email": ""}),
+    (Collections.USER_BANK_ACCOUNTS, {"id": ""}),
+    (Collections.USER_BANK_ACCOUNTS, {"user_id": "", "deleted_at": ""}),
+    (Collections.USER_BANK_ACCOUNTS, {"agency": "", "account_number": ""}),
+    (Collections.USER_ADDRESSES, {"id": ""}),
+    (Collections.USER_ADDRESSES, {"user_id": "", "deleted_at": ""}),
+    (Collections.USER_ADDRESSES, {"user_id": "", "street": "", "number": "", "zip_code": ""}),
+    (Collections.USER_DOCUMENTS, {"id": ""}),
+    (Collections.USER_DOCUMENTS, {"user_id": "", "deleted_at": ""}),
+    (Collections.USER_DOCUMENTS, {"user_id": "", "document_type": "", "document_number": ""}),
+    (Collections.USER_DOCUMENTS, {"document_type": ""}),
+    (Collections.USER_BANK_ACCOUNTS, {"deleted_at": {"$type": "date", "$lt": datetime.min}}),
+    (Collections.USER_ADDRESSES, {"deleted_at": {"$type": "date", "$lt": datetime.min}}),
+    (Collections.USER_DOCUMENTS, {"deleted_at": {"$type": "date", "$lt": datetime.min}}),
+    (Collections.USER_ADDRESSES_ARCHIVE, {"user_id": "", "street": "", "number": "", "zip_code": ""}),
+    (Collections.USER_DOCUMENTS_ARCHIVE, {"user_id": "", "document_type": "", "document_number": ""}),
+    (Collections.USER_PROFILES, {"id": ""}),
+]
+
+
+async def create_indexes(database):
+    """
+    Create the declared indexes one at a time, so one failing index does not
+    leave the others of its collection unbuilt. Existing ones with the same
+    spec are kept, and the indexes they replace are dropped.
+    Args:
+        database (Database): The async database.
+    Raises:
+        MissingUniqueIndexes: A unique index could not be created, the
+            constraints the API relies on would not hold.
+    """
+    missing = []
+    for collection, indexes in INDEXES.items():
+        for index in indexes:
+            try:
+                name = await database[collection].create_indexes([index])
+                logger.info("Index ready on %s: %s", collection.value, name)
+
+            except PyMongoError as error:
+                logger.error("Index %s creation failed on %s: %s", index.document["name"], collection.value, error)
+                if index.document.get("unique"):
+                    missing.append(f"{collection.value}.{index.document['name']}")
+
+    for collection, names in OBSOLETE_INDEXES.items():
+        try:
+            existing = await database[collection].index_information()
+            for name in set(names).intersection(existing):
+                await database[collection].drop_index(name)
+                logger.info("Dropped index %s on %s", name, collection.value)
+
+        except PyMongoError as error:
+            logger.error("Index drop failed on %s: %s", collection.value, error)
+
+    if missing:
+        raise MissingUniqueIndexes(f"Unique indexes missing: {', '.join(missing)}")
+
+
+def _stages(plan):
+    yield plan.get("stage")
+    if "inputStage" in plan:
+        yield from _stages(plan["inputStage"])
+    for stage in plan.get("inputStages", []):
+        yield from _stages(stage)
+
+
+async def find_collection_scans(database):
+    """
+    Explain the hot query shapes and list the ones planned as COLLSCAN.
+    Args:
+        database (Database): The async database.
+    Returns:
+        list: (collection, filter) pairs that scan the whole collection.
+    """
+    scans = []
+    for collection, query in QUERY_SHAPES:
+        explain = await database.command(
+            "explain",
+            {"find": collection.value, "filter": query},
+            verbosity="queryPlanner"
+        )
+        plan = explain["queryPlanner"]["winningPlan"]
+        if "COLLSCAN" in _stages(plan.get("queryPlan", plan)):
+            scans.append((collection.value, query))
+    return scans
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    from database import database
+
+    LogPipeline.start()
+
+    async def check():
+        await create_indexes(database)
+        scans = await find_collection_scans(database)
+        for collection, query in scans:
+            logger.error("COLLSCAN on %s: %s", collection, query)
+        return scans
+
+    raise SystemExit(1 if asyncio.run(check()) else 0)
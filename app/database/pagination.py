@@ -0,0 +1,118 @@
+import json
+import base64
+import asyncio
+import binascii
+
+from datetime import datetime
+
+from fastapi import HTTPException, status
+
+from pymongo import ASCENDING
+
+from database import database
+
+
+PAGE_SORT = [("created_at", ASCENDING), ("id", ASCENDING)]
+PAGE_KEYS = ("id", "created_at")
+
+
+def encode_cursor(document):
+    """
+    Build the opaque next token from the last document of a page.
+    Args:
+        document (dict): The last document.
+    """
+    raw = json.dumps([document["created_at"].isoformat(), document["id"]]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Read the keyset position from a next token.
+    Args:
+        token (str): The next token.
+    Returns:
+        tuple: (created_at, id)
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        created_at, document_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(document_id)
+
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": "Invalid next token"}
+        )
+
+
+def build_projection(fields, allowed_fields):
+    """
+    Build the Mongo projection for the fields= parameter.
+    id and created_at are always returned since they make the next token.
+    Args:
+        fields (str): Comma separated field names, None returns every field.
+        allowed_fields (iterable): The fields the model exposes.
+    """
+    if not fields:
+        return {"_id": 0}
+
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(allowed_fields)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": f"Unknown fields: {', '.join(sorted(unknown))}"}
+        )
+
+    projection = {"_id": 0}
+    for field in requested.union(PAGE_KEYS):
+        projection[field] = 1
+    return projection
+
+
+async def find_page(collection, query, limit, cursor=None, projection=None, with_count=False):
+    """
+    Read one keyset page ordered by created_at and id.
+    Args:
+        collection (Collections): The collection.
+        query (dict): The filter.
+        limit (int): Page size.
+        cursor (str): The next token of the previous page.
+        projection (dict): The Mongo projection.
+        with_count (bool): Also count every document matching the filter.
+    Returns:
+        dict: items, next and, with_count, count.
+    """
+    page_query = query
+    if cursor:
+        created_at, document_id = decode_cursor(cursor)
+        page_query = {
+            "$and": [
+                query,
+                {
+                    "$or": [
+                        {"created_at": {"$gt": created_at}},
+                        {"created_at": created_at, "id": {"$gt": document_id}},
+                    ]
+                },
+            ]
+        }
+
+    find = database[collection].find(page_query, projection or {"_id": 0}).sort(PAGE_SORT).limit(limit + 1)
+
+    if with_count:
+        documents, count = await asyncio.gather(
+            find.to_list(limit + 1),
+            database[collection].count_documents(query),
+        )
+    else:
+        documents = await find.to_list(limit + 1)
+
+    page = {
+        "items": documents[:limit],
+        "next": encode_cursor(documents[limit - 1]) if len(documents) > limit else None,
+    }
+    if with_count:
+        page["count"] = count
+    return page
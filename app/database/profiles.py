@@ -0,0 +1,352 @@
+import asyncio
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from settings import settings
+
+from database import database, Collections
+from database.pagination import find_page
+
+from utils.logger import Logger, LogPipeline
+
+
+logger = Logger.init(__name__)
+
+PROFILE_USER_FIELDS = (
+    "id",
+    "first_name",
+    "last_name",
+    "email",
+    "phone",
+    "status",
+    "is_active",
+    "last_login",
+    "created_at",
+    "updated_at",
+    "deleted_at",
+)
+
+PROFILE_LISTS = {
+    "accounts": Collections.USER_BANK_ACCOUNTS,
+    "documents": Collections.USER_DOCUMENTS,
+    "address": Collections.USER_ADDRESSES,
+}
+
+
+PAGE_VERSION_PROJECTION = {"_id": 0, "id": 1, "created_at": 1, "updated_at": 1}
+
+
+async def build_profile(user_id, page_size=settings.USER_VIEW_PAGE_SIZE, user_fields=PROFILE_USER_FIELDS, item_projection=None):
+    """
+    Join the user with the count and first page of its accounts, documents and address.
+    The user and the child collections are read concurrently.
+    Args:
+        user_id (str): The user id.
+        page_size (int): Items embedded per list.
+        user_fields (tuple): The user fields to read.
+        item_projection (dict): The projection of the list items, None reads every field.
+    Returns:
+        dict: The profile, None when the user does not exist.
+    """
+    user, *pages = await asyncio.gather(
+        database[Collections.USERS].find_one({"id": user_id}, {"_id": 0, **{field: 1 for field in user_fields}}),
+        *(
+            find_page(
+                collection,
+                {"user_id": user_id, "deleted_at": ""},
+                page_size,
+                projection=item_projection,
+                with_count=True,
+            )
+            for collection in PROFILE_LISTS.values()
+        ),
+    )
+    if not user:
+        return None
+
+    profile = {field: user[field] for field in user_fields}
+    profile.update(zip(PROFILE_LISTS, pages))
+    return profile
+
+
+class UserProfiles:
+    """
+    Materialized read model of GET /users/{user_id}/, one user_profiles
+    document per user embedding the first page of each list, so a profile read
+    is a single find_one on the unique id index.
+    Write paths refresh the profile of the user right after their own write.
+    Each refresh takes the next value of a per user sequence before reading
+    the source collections, and a profile is only replaced by one built at a
+    higher sequence, so a slow refresh never overwrites a newer profile.
+    A refresh that fails marks the user stale in this worker, whose reads then
+    rebuild the profile from the source collections, until a profile built
+    after the failure is stored by this worker. Drift left by other
+    workers, imports or writes outside the API is found and repaired by
+    check_profiles (python -m database.profiles --repair).
+    Args:
+        enabled (bool): Serve and refresh the read model.
+    """
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.superseded = 0
+        self._stale = {}
+
+    @property
+    def collection(self):
+        return database[Collections.USER_PROFILES]
+
+    @staticmethod
+    def sequence_id(user_id):
+        return f"profile:{user_id}"
+
+    async def next_sequence(self, user_id):
+        """
+        Take the next profile sequence of a user, before reading what it covers.
+        Args:
+            user_id (str): The user id.
+        """
+        counter = await database[Collections.COUNTERS].find_one_and_update(
+            {"_id": self.sequence_id(user_id)},
+            {"$inc": {"value": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return counter["value"]
+
+    async def current_sequence(self, user_id):
+        """
+        Read the profile sequence of a user, a build after it covers every write up to it.
+        Args:
+            user_id (str): The user id.
+        """
+        counter = await database[Collections.COUNTERS].find_one({"_id": self.sequence_id(user_id)})
+        return counter["value"] if counter else 0
+
+    def serves(self, user_id):
+        """
+        Check reads of a user are answered from its stored profile.
+        Args:
+            user_id (str): The user id.
+        """
+        return self.enabled and user_id not in self._stale
+
+    async def get(self, user_id):
+        """
+        Get the profile of a user, building and storing it when missing or stale.
+        Args:
+            user_id (str): The user id.
+        Returns:
+            dict: The profile, None when the user does not exist.
+        """
+        stale = self._stale.get(user_id)
+        if self.enabled and stale is None:
+            profile = await self.collection.find_one({"id": user_id}, {"_id": 0, "version": 0})
+            if profile is not None:
+                self.hits += 1
+                return profile
+
+        self.misses += 1
+        if not self.enabled:
+            return await build_profile(user_id)
+
+        if stale is None:
+            version = await self.current_sequence(user_id)
+        else:
+            version = await self.next_sequence(user_id)
+        profile = await build_profile(user_id)
+        if profile is not None:
+            await self.store(profile, version, stale)
+        return profile
+
+    async def get_version(self, user_id, user_fields):
+        """
+        Read only the user fields and the id and updated_at of the embedded
+        items, from the stored profile or with projections of the source collections.
+        Args:
+            user_id (str): The user id.
+            user_fields (tuple): The user fields to read.
+        Returns:
+            dict: The profile reduced to those fields, None when the user does not exist.
+        """
+        if self.enabled and user_id not in self._stale:
+            projection = {"_id": 0, **{field: 1 for field in user_fields}}
+            for name in PROFILE_LISTS:
+                projection.update({
+                    f"{name}.items.id": 1,
+                    f"{name}.items.updated_at": 1,
+                    f"{name}.next": 1,
+                    f"{name}.count": 1,
+                })
+            version = await self.collection.find_one({"id": user_id}, projection)
+            if version is not None:
+                return version
+
+        return await build_profile(user_id, user_fields=user_fields, item_projection=PAGE_VERSION_PROJECTION)
+
+    async def store(self, profile, version, stale=None):
+        """
+        Replace the stored profile of a user, unless it was built at a higher sequence.
+        The user stops being stale in this worker only when this profile is
+        stored and was built after the failure that marked it stale.
+        Args:
+            profile (dict): The profile built by build_profile.
+            version (int): The sequence taken before the build.
+            stale (object): The stale mark of the user when the build started.
+        """
+        try:
+            await self.collection.replace_one(
+                {"id": profile["id"], "version": {"$lt": version}},
+                {**profile, "version": version},
+                upsert=True,
+            )
+
+        except DuplicateKeyError:
+            self.superseded += 1
+            return
+
+        if stale is not None and self._stale.get(profile["id"]) is stale:
+            del self._stale[profile["id"]]
+
+    async def refresh(self, user_id):
+        """
+        Rebuild the profile of a user after a write.
+        Args:
+            user_id (str): The user id.
+        """
+        if not self.enabled:
+            return
+
+        self.refreshes += 1
+        stale = self._stale.get(user_id)
+        try:
+            version = await self.next_sequence(user_id)
+            profile = await build_profile(user_id)
+            if profile is None:
+                await self.collection.delete_one({"id": user_id})
+                await database[Collections.COUNTERS].delete_one({"_id": self.sequence_id(user_id)})
+            else:
+                await self.store(profile, version, stale)
+
+        except PyMongoError as error:
+            self.refresh_failures += 1
+            self._stale[user_id] = object()
+            logger.error("Profile refresh failed for %s: %s", user_id, error)
+
+    async def refresh_many(self, user_ids):
+        """
+        Rebuild the profiles of the users touched by a batch write.
+        Args:
+            user_ids (iterable): The user ids.
+        """
+        if self.enabled:
+            for user_id in set(user_ids):
+                await self.refresh(user_id)
+
+    async def set_fields(self, user_id, fields):
+        """
+        Refresh the profile after a user update changing one of its fields.
+        Args:
+            user_id (str): The user id.
+            fields (dict): The updated user fields.
+        """
+        if self.enabled and any(field in PROFILE_USER_FIELDS for field in fields):
+            await self.refresh(user_id)
+
+    def stats(self):
+        """
+        Read model counters.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "superseded": self.superseded,
+            "stale": len(self._stale),
+        }
+
+
+user_profiles = UserProfiles(enabled=settings.USER_PROFILES_ENABLED)
+
+
+async def check_profiles(repair=False, batch_size=settings.USER_PROFILES_CHECK_BATCH_SIZE):
+    """
+    Compare every stored profile with the one built from the source collections.
+    Args:
+        repair (bool): Replace the missing and drifted profiles and delete the orphaned ones.
+        batch_size (int): Users read per batch.
+    Returns:
+        dict: Users checked and profiles missing, drifted and orphaned.
+    """
+    summary = {"checked": 0, "missing": 0, "drifted": 0, "orphaned": 0}
+    last_id = ""
+
+    while True:
+        users = await database[Collections.USERS].find(
+            {"id": {"$gt": last_id}}, {"_id": 0, "id": 1}
+        ).sort("id", 1).limit(batch_size).to_list(batch_size)
+        if not users:
+            break
+
+        user_ids = [user["id"] for user in users]
+        last_id = user_ids[-1]
+        stored = {
+            profile["id"]: profile
+            async for profile in database[Collections.USER_PROFILES].find(
+                {"id": {"$in": user_ids}}, {"_id": 0, "version": 0}
+            )
+        }
+
+        for user_id in user_ids:
+            summary["checked"] += 1
+            profile = await build_profile(user_id)
+            if profile is None or stored.get(user_id) == profile:
+                continue
+
+            state = "drifted" if user_id in stored else "missing"
+            summary[state] += 1
+            logger.warning("Profile %s for %s", state, user_id)
+            if repair:
+                version = await user_profiles.next_sequence(user_id)
+                profile = await build_profile(user_id)
+                if profile is not None:
+                    await user_profiles.store(profile, version)
+
+    last_id = ""
+    while True:
+        profiles = await database[Collections.USER_PROFILES].find(
+            {"id": {"$gt": last_id}}, {"_id": 0, "id": 1}
+        ).sort("id", 1).limit(batch_size).to_list(batch_size)
+        if not profiles:
+            break
+
+        profile_ids = [profile["id"] for profile in profiles]
+        last_id = profile_ids[-1]
+        orphaned = set(profile_ids).difference(
+            await database[Collections.USERS].distinct("id", {"id": {"$in": profile_ids}})
+        )
+        summary["orphaned"] += len(orphaned)
+        if repair and orphaned:
+            await database[Collections.USER_PROFILES].delete_many({"id": {"$in": list(orphaned)}})
+
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+
+    LogPipeline.start()
+
+    parser = argparse.ArgumentParser(description="Check the user_profiles read model against the source collections.")
+    parser.add_argument("--repair", action="store_true", help="rebuild the missing and drifted profiles")
+    parser.add_argument("--batch-size", type=int, default=settings.USER_PROFILES_CHECK_BATCH_SIZE)
+    args = parser.parse_args()
+
+    summary = asyncio.run(check_profiles(args.repair, args.batch_size))
+    logger.info("Profile check finished: %s", summary)
+    raise SystemExit(1 if not args.repair and any(summary[key] for key in ("missing", "drifted", "orphaned")) else 0)
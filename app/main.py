@@ -1,10 +1,35 @@
+import asyncio
+
 from http import HTTPStatus
 
-from fastapi import FastAPI, Response
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response, Depends
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from settings import settings
 
+from services.oauth2 import denylist
+from services.admin import require_admin
+from services.password import password_pool
+from services.email_filter import email_filter
+from services.principal_cache import principal_cache
+from services.account_numbers import account_numbers
+from services.metrics import metrics, TimingMiddleware
+from services.rate_limit import rate_limiter, RateLimitMiddleware
+from services.compression import compression, CompressionMiddleware
+from services.token_verifier import token_verifier
+
+from database import database
+from database.base import connect, disconnect
+from database.indexes import create_indexes
+from database.archive import run_archiver
+from database.profiles import user_profiles
+
+from utils.logger import LogPipeline
+from utils.responses import FastJSONResponse
+
 from version import __version__
 
 from routers import (
@@ -13,10 +38,36 @@ from routers import (
     address_router,
     documents_router,
     user_router,
+    bulk_router,
+    admin_router,
 )
 
 
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Open the worker database client and prepare the database before serving
+    requests, release the worker resources on shutdown.
+    """
+    LogPipeline.start()
+    await connect()
+    await create_indexes(database)
+    await email_filter.rebuild(database)
+    denylist.start()
+    archiver = asyncio.create_task(run_archiver()) if settings.ARCHIVE_ENABLED else None
+
+    yield
+
+    if archiver is not None:
+        archiver.cancel()
+    denylist.stop()
+    password_pool.shutdown()
+    disconnect()
+
+
 app = FastAPI(
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
     title=settings.APP_NAME,
     description=settings.APP_DESCRIPTION,
     debug=settings.DEBUG,
@@ -33,19 +84,33 @@ app = FastAPI(
 )
 
 
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(TimingMiddleware)
+
+
 app.include_router(auth_router)
 app.include_router(user_router)
 app.include_router(accounts_router)
 app.include_router(address_router)
 app.include_router(documents_router)
+app.include_router(bulk_router)
+app.include_router(admin_router)
+
 
 @app.get("/health_check")
 def health_check():
@@ -53,3 +118,37 @@ def health_check():
     Check if API is running.
     """
     return Response(status_code=HTTPStatus.NO_CONTENT.value)
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False, dependencies=[Depends(require_admin)])
+def get_metrics():
+    """
+    Request and Mongo command metrics in the Prometheus text format.
+    Scrapers send the ADMIN_API_KEY in X-Admin-Key, like the admin endpoints.
+    """
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=HTTPStatus.NOT_FOUND.value)
+
+    gauges = {}
+    for name, value in principal_cache.stats().items():
+        gauges[f"principal_cache_{name}"] = value
+    for name, value in denylist.stats().items():
+        gauges[f"denylist_{name}"] = value
+    for name, value in email_filter.stats().items():
+        gauges[f"email_filter_{name}"] = value
+    for name, value in token_verifier.stats().items():
+        gauges[f"jwt_{name}"] = value
+    for name, value in rate_limiter.stats().items():
+        gauges[f"rate_limit_{name}"] = value
+    for name, value in account_numbers.stats().items():
+        gauges[f"account_numbers_{name}"] = value
+    for name, value in user_profiles.stats().items():
+        gauges[f"user_profiles_{name}"] = value
+    for name, value in compression.stats().items():
+        gauges[f"compression_{name}"] = value
+    gauges["password_pool_pending"] = password_pool.pending
+    gauges["password_pool_rejected"] = password_pool.rejected
+    gauges["password_pool_restarts"] = password_pool.restarts
+    gauges["log_records_sampled_out"] = LogPipeline.sampler.dropped
+
+    return PlainTextResponse(metrics.render(gauges), media_type="text/plain; version=0.0.4")
@@ -1,2 +1,2 @@
-from .globals_model import TimeStampModel
+from .globals_model import TimeStampModel, BatchRequest, BulkRequest
 from .enums import DocumentTypeEnum, StatusEnum, AccountTypeEnum
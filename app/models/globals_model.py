@@ -1,11 +1,13 @@
-from uuid import uuid4
-
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, conlist, root_validator
 
 from typing import Optional
 
 from datetime import datetime
 
+from settings import settings
+
+from utils.ids import new_id
+
 
 class TimeStampModel(BaseModel):
     """
@@ -13,17 +15,39 @@ class TimeStampModel(BaseModel):
     Args:
         BaseModel (Model): Model for timestamp
     """
-    id: Optional[str]
-    created_at: datetime = datetime.now()
-    updated_at: datetime = datetime.now()
+    id: Optional[str] = Field(default_factory=new_id)
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
     deleted_at: datetime = ""
 
-    def __init__(self, **data):
+    @root_validator(pre=True)
+    def share_clock_read(cls, values):
         """
-        Define id if not exists.
+        Give a new record one clock read, updated_at defaults to created_at.
         Args:
-            data (dict): The data for model.
+            values (dict): The data for model.
         """
-        if "id" not in data:
-            data["id"] = str(uuid4())
-        super().__init__(**data)
+        values = dict(values)
+        if "created_at" not in values:
+            values["created_at"] = datetime.now()
+        values.setdefault("updated_at", values["created_at"])
+        return values
+
+
+class BatchRequest(BaseModel):
+    """
+    Model for the items of one user batch request, validated one by one
+    so a bad item is reported without rejecting the others.
+    Args:
+        BaseModel (Pydantic): The Pydantic base model.
+    """
+    items: conlist(dict, min_items=1, max_items=settings.BATCH_MAX_ITEMS)
+
+
+class BulkRequest(BaseModel):
+    """
+    Model for the items of a cross-user bulk request, each with its user_id.
+    Args:
+        BaseModel (Pydantic): The Pydantic base model.
+    """
+    items: conlist(dict, min_items=1, max_items=settings.BULK_MAX_ITEMS)
@@ -69,4 +69,13 @@ class AddressUpdateRequest(BaseModel):
     city: Optional[str]
     state: Optional[str]
     country: Optional[str]
-    zip_code: Optional[str]
\ No newline at end of file
+    zip_code: Optional[str]
+
+
+class AddressBulkCreateRequest(AddressCreateRequest):
+    """
+    Model for address create from a cross-user bulk request
+    Args:
+        AddressCreateRequest (Model): The address create model.
+    """
+    user_id: str
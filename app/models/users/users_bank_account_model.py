@@ -1,9 +1,7 @@
-from uuid import uuid4
-
-from random import randint
-
 from pydantic import BaseModel
 
+from settings import settings
+
 from models.enums import StatusEnum, AccountTypeEnum
 
 from models.globals_model import TimeStampModel
@@ -17,9 +15,9 @@ class BankAccount(TimeStampModel):
     """
     user_id: str
     account_type: AccountTypeEnum
-    account_number: int = randint(100000, 999999)
-    account_digit: int = randint(0, 9)
-    agency: int = "0001"
+    account_number: int
+    account_digit: int
+    agency: str = settings.ACCOUNT_AGENCY
     agency_digit: int = 0
     status: StatusEnum = StatusEnum.PENDING
 
@@ -31,3 +29,12 @@ class BankAccountCreateRequest(BaseModel):
         BaseModel (Pydantic): The Pydantic base model.
     """
     account_type: AccountTypeEnum
+
+
+class BankAccountBulkCreateRequest(BankAccountCreateRequest):
+    """
+    Model for user bank account create from a cross-user bulk request
+    Args:
+        BankAccountCreateRequest (Model): The account create model.
+    """
+    user_id: str
@@ -25,3 +25,12 @@ class DocumentsCreateRequest(BaseModel):
     """
     document_type: DocumentTypeEnum
     document_number: str
+
+
+class DocumentsBulkCreateRequest(DocumentsCreateRequest):
+    """
+    Model for documents create from a cross-user bulk request
+    Args:
+        DocumentsCreateRequest (Model): The documents create model.
+    """
+    user_id: str
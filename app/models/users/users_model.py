@@ -1,5 +1,3 @@
-from uuid import uuid4
-
 from datetime import datetime
 
 from typing import List, Optional
@@ -14,8 +12,6 @@ from models.users.users_bank_account_model import BankAccountCreateRequest
 
 from models.users.users_documents_model import DocumentsCreateRequest
 
-from database.controllers.user import check_user_by_email
-
 
 class User(TimeStampModel):
     """
@@ -59,20 +55,6 @@ class UserCreateRequest(BaseModel):
     accounts: List[BankAccountCreateRequest]
 
 
-    @validator("email")
-    def email_has_exists(cls, email):
-        """
-        Validator for email exists in database.
-        Args:
-            email (str): The email from request
-        Returns:
-            email (str): The email from request
-        """
-        if check_user_by_email(email):
-            raise ValueError("email already exists in database")
-        return email
-
-
     @validator("confirm_password")
     def passwords_match(cls, confirm_password, values):
         """
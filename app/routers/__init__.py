@@ -2,4 +2,6 @@ from routers.user_router import user_router
 from routers.auth_router import auth_router
 from routers.accounts_router import accounts_router
 from routers.address_router import address_router
-from routers.documents_router import documents_router
\ No newline at end of file
+from routers.documents_router import documents_router
+from routers.bulk_router import bulk_router
+from routers.admin_router import admin_router
\ No newline at end of file
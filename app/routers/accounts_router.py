@@ -1,13 +1,20 @@
-from fastapi import status, APIRouter, Depends
-from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from typing import Optional
+
+from fastapi import status, APIRouter, Depends, Query, Request
 
 from utils.logger import Logger
+from utils.responses import FastJSONResponse, batch_response
+from utils.http_cache import conditional_response, page_etag
+
+from settings import settings
 
 from services.oauth2 import require_user, AuthJWT
 
+from models import BatchRequest
+
 from models.users.users_bank_account_model import BankAccountCreateRequest
 
+from database.controllers.batch import create_accounts_batch
 from database.controllers.account import (
     create_account,
     get_accounts_per_user,
@@ -18,47 +25,59 @@ from database.controllers.account import (
 
 accounts_router = APIRouter(tags=["Account"], dependencies=[Depends(require_user)])
 
-logger = Logger.init("AccountRouteLogger")
+logger = Logger.init(__name__)
 
 
 @accounts_router.get("/users/{user_id}/accounts/", status_code=status.HTTP_200_OK)
-def get_user_accounts(user_id: str):
+async def get_user_accounts(
+    request: Request,
+    user_id: str,
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: Optional[str] = Query(None, alias="next"),
+    fields: Optional[str] = None,
+):
     """
     Get user accounts endpoint:
 
+    - **user_id**: the user id(str)
+    - **limit**: the page size(int)
+    - **next**: the next token from the previous page(str)
+    - **fields**: comma separated fields to return, id and created_at are always returned(str)
+
     Returns:
-    - **AccountResponse** (Account): Account data to database return.
+    - **AccountResponse** (Account): Account page with items and next token, or 304 when If-None-Match holds its ETag.
     """
-    logger.info(f"Get user accounts")
+    logger.info("Get user accounts")
 
-    accounts = get_accounts_per_user(user_id)
+    version = await get_accounts_per_user(user_id, limit, cursor, "updated_at")
 
-    return JSONResponse(
-        status_code=status.HTTP_200_OK,
-        content=jsonable_encoder(accounts)
+    return await conditional_response(
+        request,
+        page_etag(version, fields) if version else None,
+        lambda: get_accounts_per_user(user_id, limit, cursor, fields),
     )
 
 
 @accounts_router.get("/users/{user_id}/accounts/{account_id}/", status_code=status.HTTP_200_OK)
-def get_user_account_detail(user_id: str, account_id: str):
+async def get_user_account_detail(user_id: str, account_id: str):
     """
     Get user account detail endpoint:
 
     Returns:
     - **AccountResponse** (Account): Account data to database return.
     """
-    logger.info(f"Get user account detail")
+    logger.info("Get user account detail")
 
-    account = get_account_by_id(user_id, account_id)
+    account = await get_account_by_id(user_id, account_id)
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status.HTTP_200_OK,
-        content=jsonable_encoder(account)
+        content=account
     )
 
 
 @accounts_router.post("/users/{user_id}/accounts/", status_code=status.HTTP_201_CREATED)
-def create_user_account(user_id: str, payload: BankAccountCreateRequest):
+async def create_user_account(user_id: str, payload: BankAccountCreateRequest):
     """
     Create user account endpoint:
 
@@ -68,21 +87,42 @@ def create_user_account(user_id: str, payload: BankAccountCreateRequest):
     Returns:
     - **AccountResponse** (Account): Account data to database return.
     """
-    logger.info(f"Create user account")
+    logger.info("Create user account")
 
-    new_account = create_account(user_id, payload)
+    new_account = await create_account(user_id, payload)
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status.HTTP_201_CREATED,
         content={
             "message": "User account created successfully.",
-            "payload": jsonable_encoder(new_account),
+            "payload": new_account,
         }
     )
 
 
+@accounts_router.post("/users/{user_id}/accounts:batch", status_code=status.HTTP_201_CREATED)
+async def create_user_accounts_batch(user_id: str, payload: BatchRequest):
+    """
+    Create many user accounts endpoint:
+
+    - **user_id**: the user id(str)
+    - **items**: the BankAccountCreateRequest items, up to BATCH_MAX_ITEMS(list)
+
+    Every item is validated, the valid ones are written with one unordered bulk write.
+
+    Returns:
+    - **results**: one result per item with its index, status and id, 201 when
+    every item was created, 207 otherwise.
+    """
+    logger.info("Create user accounts batch")
+
+    results = await create_accounts_batch(payload.items, user_id)
+
+    return batch_response("User accounts batch processed.", results)
+
+
 @accounts_router.patch("/users/{user_id}/accounts/{account_id}/", status_code=status.HTTP_200_OK)
-def update_user_account(user_id: str, account_id: str, payload: BankAccountCreateRequest):
+async def update_user_account(user_id: str, account_id: str, payload: BankAccountCreateRequest):
     """
     Update user account endpoint:
 
@@ -92,21 +132,21 @@ def update_user_account(user_id: str, account_id: str, payload: BankAccountCreat
     Returns:
     - **AccountResponse** (Account): Account data to database return.
     """
-    logger.info(f"Update user account")
+    logger.info("Update user account")
 
-    updated_account = update_account_type(user_id, account_id, payload)
+    updated_account = await update_account_type(user_id, account_id, payload)
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status.HTTP_200_OK,
         content={
             "message": "User account updated successfully.",
-            "payload": jsonable_encoder(updated_account),
+            "payload": updated_account,
         }
     )
 
 
 @accounts_router.delete("/users/{user_id}/accounts/{account_id}/", status_code=status.HTTP_200_OK)
-def delete_user_account(user_id: str, account_id: str):
+async def delete_user_account(user_id: str, account_id: str):
     """
     Delete user account endpoint:
 
@@ -115,11 +155,11 @@ def delete_user_account(user_id: str, account_id: str):
     Returns:
     - Message to user account deleted successfully.
     """
-    logger.info(f"Delete user account")
+    logger.info("Delete user account")
 
-    delete_account(account_id, user_id)
+    await delete_account(account_id, user_id)
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status.HTTP_200_OK,
         content={"message": "User account deleted successfully.",}
     )
@@ -1,13 +1,20 @@
-from fastapi import status, APIRouter, Depends
-from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from typing import Optional
+
+from fastapi import status, APIRouter, Depends, Query, Request
 
 from utils.logger import Logger
+from utils.responses import FastJSONResponse, batch_response
+from utils.http_cache import conditional_response, page_etag
+
+from settings import settings
 
 from services.oauth2 import require_user, AuthJWT
 
+from models import BatchRequest
+
 from models.users.users_address_model import AddressCreateRequest, AddressUpdateRequest
 
+from database.controllers.batch import create_addresses_batch
 from database.controllers.address import (
     create_address,
     get_address_per_user,
@@ -17,49 +24,61 @@ from database.controllers.address import (
 )
 
 
-logger = Logger.init("AddressRouteLogger")
+logger = Logger.init(__name__)
 
 address_router = APIRouter(tags=["Address"], dependencies=[Depends(require_user)])
 
 
 @address_router.get("/users/{user_id}/address/", status_code=status.HTTP_200_OK)
-def get_user_address(user_id: str):
+async def get_user_address(
+    request: Request,
+    user_id: str,
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: Optional[str] = Query(None, alias="next"),
+    fields: Optional[str] = None,
+):
     """
     Get user address endpoint:
 
+    - **user_id**: the user id(str)
+    - **limit**: the page size(int)
+    - **next**: the next token from the previous page(str)
+    - **fields**: comma separated fields to return, id and created_at are always returned(str)
+
     Returns:
-    - **UserResponse** (User): User data to database return.
+    - **AddressResponse** (Address): Address page with items and next token, or 304 when If-None-Match holds its ETag.
     """
-    logger.info(f"Get user address")
+    logger.info("Get user address")
 
-    address = get_address_per_user(user_id)
+    version = await get_address_per_user(user_id, limit, cursor, "updated_at")
 
-    return JSONResponse(
-        status_code=status.HTTP_200_OK,
-        content=jsonable_encoder(address)
+    return await conditional_response(
+        request,
+        page_etag(version, fields) if version else None,
+        lambda: get_address_per_user(user_id, limit, cursor, fields),
     )
 
 
 @address_router.get("/users/{user_id}/address/{address_id}/", status_code=status.HTTP_200_OK)
-def get_user_address_detail(user_id: str, address_id: str):
+async def get_user_address_detail(user_id: str, address_id: str):
     """
     Get user address detail endpoint:
 
     Returns:
     - **AddressResponse** (Address): Address data to database return.
     """
-    logger.info(f"Get user address detail")
+    logger.info("Get user address detail")
 
-    address = get_address_by_id(user_id, address_id)
+    address = await get_address_by_id(user_id, address_id)
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status.HTTP_200_OK,
-        content=jsonable_encoder(address)
+        content=address
     )
 
 
 @address_router.post("/users/{user_id}/address/", status_code=status.HTTP_201_CREATED)
-def create_user_address(user_id: str, payload: AddressCreateRequest):
+async def create_user_address(user_id: str, payload: AddressCreateRequest):
     """
     Create user address endpoint:
 
@@ -69,21 +88,42 @@ def create_user_address(user_id: str, payload: AddressCreateRequest):
     Returns:
     - **AddresResponse** (Address): Address data to database return.
     """
-    logger.info(f"Create user address")
+    logger.info("Create user address")
 
-    new_address = create_address(user_id, payload)
+    new_address = await create_address(user_id, payload)
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status.HTTP_201_CREATED,
         content={
             "message": "User address created successfully.",
-            "payload": jsonable_encoder(new_address),
+            "payload": new_address,
         }
     )
 
 
+@address_router.post("/users/{user_id}/address:batch", status_code=status.HTTP_201_CREATED)
+async def create_user_address_batch(user_id: str, payload: BatchRequest):
+    """
+    Create many user address endpoint:
+
+    - **user_id**: the user id(str)
+    - **items**: the AddressCreateRequest items, up to BATCH_MAX_ITEMS(list)
+
+    Every item is validated, the valid ones are written with one unordered bulk write.
+
+    Returns:
+    - **results**: one result per item with its index, status and id, 201 when
+    every item was created, 207 otherwise.
+    """
+    logger.info("Create user address batch")
+
+    results = await create_addresses_batch(payload.items, user_id)
+
+    return batch_response("User address batch processed.", results)
+
+
 @address_router.patch("/users/{user_id}/address/{address_id}/", status_code=status.HTTP_200_OK)
-def update_user_address(user_id: str, address_id: str, payload: AddressUpdateRequest):
+async def update_user_address(user_id: str, address_id: str, payload: AddressUpdateRequest):
     """
     Update user address endpoint:
 
@@ -93,21 +133,21 @@ def update_user_address(user_id: str, address_id: str, payload: AddressUpdateReq
     Returns:
     - **AddresResponse** (Address): Address data to database return.
     """
-    logger.info(f"Update user address")
+    logger.info("Update user address")
 
-    updated_address = update_address(user_id, address_id, payload)
+    updated_address = await update_address(user_id, address_id, payload)
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status.HTTP_200_OK,
         content={
             "message": "User address updated successfully.",
-            "payload": jsonable_encoder(updated_address),
+            "payload": updated_address,
         }
     )
 
 
 @address_router.delete("/users/{user_id}/address/{address_id}/", status_code=status.HTTP_200_OK)
-def delete_user_address(user_id: str, address_id: str):
+async def delete_user_address(user_id: str, address_id: str):
     """
     Delete user address endpoint:
 
@@ -116,11 +156,11 @@ def delete_user_address(user_id: str, address_id: str):
     Returns:
     - Message to user address deleted successfully.
     """
-    logger.info(f"Delete user address")
+    logger.info("Delete user address")
 
-    delete_address(address_id, user_id)
+    await delete_address(address_id, user_id)
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status.HTTP_200_OK,
         content={"message": "User address deleted successfully.",}
     )
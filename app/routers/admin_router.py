@@ -0,0 +1,98 @@
+from fastapi import status, APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+
+from utils.logger import Logger
+from utils.responses import FastJSONResponse
+
+from settings import settings
+
+from services.admin import require_admin
+
+from database.export import export_ndjson
+from database.importer import UserImporter, read_rows
+
+logger = Logger.init(__name__)
+
+
+admin_router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+
+@admin_router.get("/users/export", status_code=status.HTTP_200_OK)
+async def export_users(
+    batch_size: int = Query(settings.EXPORT_BATCH_SIZE, ge=1, le=settings.EXPORT_BATCH_SIZE_MAX),
+    include_deleted: bool = False,
+    gzip: bool = False,
+):
+    """
+    Export users endpoint:
+
+    - **batch_size**: users read per batch(int)
+    - **include_deleted**: also export deleted users and children(bool)
+    - **gzip**: gzip the stream(bool)
+
+    Returns:
+    - NDJSON stream, one user per line with its accounts, address and documents.
+    """
+    logger.info("Export users")
+
+    headers = {"Content-Disposition": "attachment; filename=users.ndjson"}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        export_ndjson(batch_size, include_deleted, gzip),
+        media_type="application/x-ndjson",
+        headers=headers,
+    )
+
+
+async def request_lines(request):
+    """
+    Split the streamed request body into text lines.
+    Args:
+        request (Request): The request.
+    """
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8")
+    if pending:
+        yield pending.decode("utf-8")
+
+
+@admin_router.post("/users/import", status_code=status.HTTP_200_OK)
+async def import_users(
+    request: Request,
+    file_format: str = Query("ndjson", alias="format", regex="^(ndjson|csv)$"),
+    pre_hashed: bool = False,
+    resume_from: int = Query(0, ge=0),
+    chunk_size: int = Query(settings.IMPORT_CHUNK_SIZE, ge=1, le=settings.BULK_MAX_ITEMS),
+):
+    """
+    Import users endpoint, the body is streamed as it is read:
+
+    - **format**: ndjson, or csv with documents, address and accounts as JSON arrays(str)
+    - **pre_hashed**: rows carry a bcrypt password_hash instead of a password(bool)
+    - **resume_from**: rows already imported by an interrupted call, its last_row(int)
+    - **chunk_size**: rows validated and written together(int)
+
+    Returns:
+    - **summary**: rows, imported, skipped (already registered) and failed counters,
+    last_row to resume from and the first failed rows.
+    """
+    logger.info("Import users")
+
+    importer = UserImporter(chunk_size, pre_hashed)
+    summary = await importer.run(read_rows(request_lines(request), file_format, resume_from))
+    summary["last_row"] = max(summary["last_row"], resume_from)
+
+    return FastJSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={
+            "message": "Users import finished.",
+            "summary": summary,
+            "errors": importer.errors,
+        }
+    )
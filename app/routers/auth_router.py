@@ -1,14 +1,15 @@
 from datetime import timedelta
 
+from starlette.concurrency import run_in_threadpool
+
 from utils.logger import Logger
+from utils.responses import FastJSONResponse
 
 from fastapi import APIRouter, status, Depends, HTTPException
-from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
 
 from services import oauth2
 from services.oauth2 import AuthJWT
-from services.password import Password
+from services.password import password_pool
 
 from settings import settings
 
@@ -18,13 +19,14 @@ from models.users.users_model import UserCreateRequest
 
 from database.controllers.user import (
     create_user_model,
-    check_user_by_email,
-    get_user_by_id,
+    get_user_auth_status,
+    get_user_login,
     set_last_login,
+    update_user_password,
 )
 
 
-logger = Logger.init("AuthRouterLogger")
+logger = Logger.init(__name__)
 
 
 auth_router = APIRouter(tags=["Auth"])
@@ -33,7 +35,7 @@ REFRESH_TOKEN = settings.REFRESH_TOKEN_EXPIRES_IN
 
 
 @auth_router.post("/register/", status_code=status.HTTP_201_CREATED)
-def create_user(user: UserCreateRequest):
+async def create_user(user: UserCreateRequest):
     """
     Create user endpoint:
 
@@ -51,18 +53,18 @@ def create_user(user: UserCreateRequest):
     - **UserResponse** (User): User data to be created.
     - **AccountResponse** (UserBankAccount): User bank account data to be created.
     """
-    logger.info(f"Create user {user.email}")
+    logger.info("Create user %s", user.email)
 
-    create_user_model(user)
+    await create_user_model(user)
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status.HTTP_201_CREATED,
         content="Please check your email to confirm your account."
     )
 
 
 @auth_router.post("/login/", status_code=status.HTTP_200_OK)
-def login(payload: LoginUserRequest, Authorize: AuthJWT = Depends()):
+async def login(payload: LoginUserRequest, Authorize: AuthJWT = Depends()):
     """
     Login user route.
 
@@ -73,13 +75,24 @@ def login(payload: LoginUserRequest, Authorize: AuthJWT = Depends()):
     - **Access Token**: the access token (str)
     - **Refresh Token**: the refresh token (str)
     """
-    user = check_user_by_email(payload.email)
+    user = await get_user_login(payload.email)
+
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password"
+        )
 
-    if not Password.verify_password(payload.password, user["password"]):
+    valid, new_hash = await password_pool.verify_and_update(payload.password, user["password"])
+
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
+
+    if new_hash:
+        await update_user_password(user["id"], new_hash)
     
     access_token = Authorize.create_access_token(
         subject=user["id"],
@@ -91,23 +104,23 @@ def login(payload: LoginUserRequest, Authorize: AuthJWT = Depends()):
         expires_time=timedelta(minutes=REFRESH_TOKEN),
     )
 
-    set_last_login(user["id"])
+    await set_last_login(user["id"])
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status.HTTP_200_OK,
-        content=jsonable_encoder({
+        content={
             "message": "User logged in successfully",
             "access_token": access_token,
             "refresh_token": refresh_token,
             "token_type": "bearer",
-        })
+        }
     )
 
 
 @auth_router.post("/refresh/", status_code=status.HTTP_200_OK)
-def refresh_token(Authorize: AuthJWT = Depends()):
+async def refresh_token(Authorize: AuthJWT = Depends()):
     try:
-        Authorize.jwt_refresh_token_required()
+        await Authorize.verify(refresh=True)
 
         user_id = Authorize.get_jwt_subject()
 
@@ -117,7 +130,7 @@ def refresh_token(Authorize: AuthJWT = Depends()):
                 detail="Could not refresh access token."
             )
 
-        user = get_user_by_id(user_id)
+        user = await get_user_auth_status(user_id)
 
         access_token = Authorize.create_access_token(
             subject=user["id"],
@@ -125,23 +138,23 @@ def refresh_token(Authorize: AuthJWT = Depends()):
         )
 
     except HTTPException as error:
-        logger.error(f"Error refreshing token: {error}")
+        logger.error("Error refreshing token: %s", error)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not refresh access token."
         )
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status.HTTP_200_OK,
-        content=jsonable_encoder({
+        content={
             "access_token": access_token,
             "token_type": "bearer",
-        })
+        }
     )
 
 
 @auth_router.post("/logout/", status_code=status.HTTP_200_OK)
-def logout(Authorize: AuthJWT = Depends()):
+async def logout(Authorize: AuthJWT = Depends()):
     """
     Logout user route.
 
@@ -151,22 +164,22 @@ def logout(Authorize: AuthJWT = Depends()):
     - **Message**: the logout message (str)
     """
     try:
-        Authorize.jwt_refresh_token_required()
+        await Authorize.verify(refresh=True)
 
-        jti = Authorize.get_raw_jwt()["jti"]
+        raw_jwt = Authorize.get_raw_jwt()
 
-        oauth2.denylist.add(jti)
+        await run_in_threadpool(oauth2.denylist.add, raw_jwt["jti"], raw_jwt["exp"])
 
     except HTTPException as error:
-        logger.error(f"Error logging out user: {error}")
+        logger.error("Error logging out user: %s", error)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not logout user."
         )
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status.HTTP_200_OK,
-        content=jsonable_encoder({
+        content={
             "message": "User logged out successfully",
-        })
+        }
     )
@@ -0,0 +1,73 @@
+from fastapi import status, APIRouter, Depends
+
+from utils.logger import Logger
+from utils.responses import batch_response
+
+from services.admin import require_admin
+
+from models import BulkRequest
+
+from database.controllers.batch import (
+    create_accounts_batch,
+    create_addresses_batch,
+    create_documents_batch,
+)
+
+logger = Logger.init(__name__)
+
+
+bulk_router = APIRouter(prefix="/bulk", tags=["Bulk"], dependencies=[Depends(require_admin)])
+
+
+@bulk_router.post("/accounts", status_code=status.HTTP_201_CREATED)
+async def create_bulk_accounts(payload: BulkRequest):
+    """
+    Create accounts of many users endpoint:
+
+    - **items**: the BankAccountCreateRequest items with their user_id, up to BULK_MAX_ITEMS(list)
+
+    Returns:
+    - **results**: one result per item with its index, status and id, 201 when
+    every item was created, 207 otherwise.
+    """
+    logger.info("Create bulk accounts")
+
+    results = await create_accounts_batch(payload.items)
+
+    return batch_response("Accounts bulk processed.", results)
+
+
+@bulk_router.post("/addresses", status_code=status.HTTP_201_CREATED)
+async def create_bulk_addresses(payload: BulkRequest):
+    """
+    Create addresses of many users endpoint:
+
+    - **items**: the AddressCreateRequest items with their user_id, up to BULK_MAX_ITEMS(list)
+
+    Returns:
+    - **results**: one result per item with its index, status and id, 201 when
+    every item was created, 207 otherwise.
+    """
+    logger.info("Create bulk addresses")
+
+    results = await create_addresses_batch(payload.items)
+
+    return batch_response("Addresses bulk processed.", results)
+
+
+@bulk_router.post("/documents", status_code=status.HTTP_201_CREATED)
+async def create_bulk_documents(payload: BulkRequest):
+    """
+    Create documents of many users endpoint:
+
+    - **items**: the DocumentsCreateRequest items with their user_id, up to BULK_MAX_ITEMS(list)
+
+    Returns:
+    - **results**: one result per item with its index, status and id, 201 when
+    every item was created, 207 otherwise.
+    """
+    logger.info("Create bulk documents")
+
+    results = await create_documents_batch(payload.items)
+
+    return batch_response("Documents bulk processed.", results)
@@ -1,13 +1,20 @@
-from fastapi import status, APIRouter, Depends
-from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from typing import Optional
+
+from fastapi import status, APIRouter, Depends, Query, Request
 
 from utils.logger import Logger
+from utils.responses import FastJSONResponse, batch_response
+from utils.http_cache import conditional_response, page_etag
+
+from settings import settings
 
 from services.oauth2 import require_user, AuthJWT
 
+from models import BatchRequest
+
 from models.users.users_documents_model import DocumentsCreateRequest
 
+from database.controllers.batch import create_documents_batch
 from database.controllers.document import (
     create_document,
     get_documents_per_user,
@@ -15,82 +22,115 @@ from database.controllers.document import (
     delete_document,
 )
 
-logger = Logger.init("DocumentRouteLogger")
+logger = Logger.init(__name__)
 
 
 documents_router = APIRouter(tags=["Document"], dependencies=[Depends(require_user)])
 
 
 @documents_router.get("/users/{user_id}/documents/", status_code=status.HTTP_200_OK)
-def get_user_documents(user_id: str):
+async def get_user_documents(
+    request: Request,
+    user_id: str,
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: Optional[str] = Query(None, alias="next"),
+    fields: Optional[str] = None,
+):
     """
     Get user documents endpoint:
 
+    - **user_id**: the user id(str)
+    - **limit**: the page size(int)
+    - **next**: the next token from the previous page(str)
+    - **fields**: comma separated fields to return, id and created_at are always returned(str)
+
     Returns:
-    - **UserResponse** (Documents): Documents data to database return.
+    - **DocumentResponse** (Documents): Documents page with items and next token, or 304 when If-None-Match holds its ETag.
     """
-    logger.info(f"Get user documents")
+    logger.info("Get user documents")
 
-    documents = get_documents_per_user(user_id)
+    version = await get_documents_per_user(user_id, limit, cursor, "updated_at")
 
-    return JSONResponse(
-        status_code=status.HTTP_200_OK,
-        content=jsonable_encoder(documents)
+    return await conditional_response(
+        request,
+        page_etag(version, fields) if version else None,
+        lambda: get_documents_per_user(user_id, limit, cursor, fields),
     )
 
 
 @documents_router.post("/users/{user_id}/documents/", status_code=status.HTTP_201_CREATED)
-def create_user_document(user_id: str, payload: DocumentsCreateRequest):
+async def create_user_document(user_id: str, payload: DocumentsCreateRequest):
     """
     Create user document endpoint:
 
     Returns:
     - **UserResponse** (Documents): Documents data to database return.
     """
-    logger.info(f"Create user document")
+    logger.info("Create user document")
 
-    new_document = create_document(user_id, payload)
+    new_document = await create_document(user_id, payload)
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status.HTTP_201_CREATED,
         content={
             "message": "User document created successfully",
-            "data": jsonable_encoder(new_document)
+            "data": new_document
         }
     )
 
 
+@documents_router.post("/users/{user_id}/documents:batch", status_code=status.HTTP_201_CREATED)
+async def create_user_documents_batch(user_id: str, payload: BatchRequest):
+    """
+    Create many user documents endpoint:
+
+    - **user_id**: the user id(str)
+    - **items**: the DocumentsCreateRequest items, up to BATCH_MAX_ITEMS(list)
+
+    Every item is validated, the valid ones are written with one unordered bulk write.
+
+    Returns:
+    - **results**: one result per item with its index, status and id, 201 when
+    every item was created, 207 otherwise.
+    """
+    logger.info("Create user documents batch")
+
+    results = await create_documents_batch(payload.items, user_id)
+
+    return batch_response("User documents batch processed.", results)
+
+
 @documents_router.get("/users/{user_id}/documents/{document_id}/", status_code=status.HTTP_200_OK)
-def get_user_document_detail(user_id: str, document_id: str):
+async def get_user_document_detail(user_id: str, document_id: str):
     """
     Get user document detail endpoint:
 
     Returns:
     - **DocumentResponse** (Document): Document data to database return.
     """
-    logger.info(f"Get user document detail")
+    logger.info("Get user document detail")
 
-    document = get_document_by_id(user_id, document_id)
+    document = await get_document_by_id(user_id, document_id)
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status.HTTP_200_OK,
-        content=jsonable_encoder(document)
+        content=document
     )
 
 
 @documents_router.delete("/users/{user_id}/documents/{document_id}/", status_code=status.HTTP_200_OK)
-def delete_user_document(user_id: str, document_id: str):
+async def delete_user_document(user_id: str, document_id: str):
     """
     Delete user document endpoint:
 
     Returns:
     - **DocumentResponse** (Document): Document data to database return.
     """
-    logger.info(f"Delete user document")
+    logger.info("Delete user document")
 
-    delete_document(document_id, user_id)
+    await delete_document(document_id, user_id)
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status.HTTP_200_OK,
         content={"message": "User document deleted successfully.",}
     )
\ No newline at end of file
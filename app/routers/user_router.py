@@ -1,49 +1,71 @@
 from utils.logger import Logger
+from utils.responses import FastJSONResponse
+from utils.http_cache import conditional_response, make_etag, page_etag
 
-from fastapi import APIRouter, status, Depends
-from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, status, Depends, Request
 
 from models.users.users_model import UserUpdateRequest
 from models.users.users_address_model import AddressCreateRequest, AddressUpdateRequest
 
 from services.oauth2 import require_user, AuthJWT
 
+from database.profiles import user_profiles
 from database.controllers.user import (
+    USER_VERSION_FIELDS,
     get_user_by_id,
+    get_user_version,
     user_detail,
     update_user_model,
     delete_user_by_id,
 )
 
 
-logger = Logger.init("UserRouteLogger")
+logger = Logger.init(__name__)
 
 user_router = APIRouter(tags=["User"], dependencies=[Depends(require_user)])
 
 
+def user_etag(profile):
+    """
+    Build the ETag of a user profile, from the full profile or its version fields.
+    Args:
+        profile (dict): The profile, or the version read by get_user_version.
+    """
+    return make_etag(
+        [profile[field] for field in USER_VERSION_FIELDS],
+        *(page_etag(profile[name]) for name in ("accounts", "documents", "address")),
+    )
+
+
 @user_router.get("/users/{user_id}/", status_code=status.HTTP_200_OK)
-def get_user(user_id: str):
+async def get_user(request: Request, user_id: str):
     """
     Get user endpoint:
 
     - **user_id**: the user id(str)
 
     Returns:
-    - **UserResponse** (User): User data to database return.
+    - **UserResponse** (User): User data to database return, or 304 when If-None-Match holds its ETag.
+    The ETag is checked against the version fields of a stored profile, or
+    built from the profile itself when it is read from the source collections.
     """
-    logger.info(f"Get user {user_id}")
+    logger.info("Get user %s", user_id)
 
-    user = get_user_by_id(user_id)
+    if user_profiles.serves(user_id):
+        version = await get_user_version(user_id)
+        etag = user_etag(version) if version else None
+        return await conditional_response(request, etag, lambda: get_user_by_id(user_id))
 
-    return JSONResponse(
-        status_code=status.HTTP_200_OK,
-        content=jsonable_encoder(user)
-    )
+    user = await get_user_by_id(user_id)
+
+    async def loaded():
+        return user
+
+    return await conditional_response(request, user_etag(user) if user else None, loaded)
 
 
 @user_router.patch("/users/{user_id}/", status_code=status.HTTP_200_OK)
-def update_user(user_id: str, payload: UserUpdateRequest):
+async def update_user(user_id: str, payload: UserUpdateRequest):
     """
     Update user endpoint:
 
@@ -53,21 +75,21 @@ def update_user(user_id: str, payload: UserUpdateRequest):
     Returns:
     - **UserResponse** (User): User data to database return.
     """
-    logger.info(f"Update user {user_id}")
+    logger.info("Update user %s", user_id)
 
-    updated_user = update_user_model(user_id, payload)
+    updated_user = await update_user_model(user_id, payload)
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status.HTTP_200_OK,
         content={
             "message": "User updated successfully.",
-            "payload": jsonable_encoder(updated_user),
+            "payload": updated_user,
         }
     )
 
 
 @user_router.delete("/users/{user_id}/", status_code=status.HTTP_200_OK)
-def delete_user(user_id: str):
+async def delete_user(user_id: str):
     """
     Delete user endpoint:
 
@@ -76,31 +98,31 @@ def delete_user(user_id: str):
     Returns:
     - Message to user deleted successfully.
     """
-    logger.info(f"Delete user {user_id}")
+    logger.info("Delete user %s", user_id)
 
-    delete_user_by_id(user_id)
+    await delete_user_by_id(user_id)
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status.HTTP_200_OK,
         content={"message": "User deleted successfully.",}
     )
 
 
 @user_router.get("/user_details/", status_code=status.HTTP_200_OK)
-def get_user_details(Authorize: AuthJWT = Depends()):
+async def get_user_details(Authorize: AuthJWT = Depends()):
     """
     Get user details endpoint:
 
     Returns:
     - **UserResponse** (User): User data to database return.
     """
-    logger.info(f"Get user details")
+    logger.info("Get user details")
 
     user_id = Authorize.get_jwt_subject()
 
-    user = user_detail(user_id)
+    user = await user_detail(user_id)
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status.HTTP_200_OK,
-        content=jsonable_encoder(user)
+        content=user
     )
@@ -0,0 +1,154 @@
+import os
+import asyncio
+
+from pymongo import ReturnDocument
+
+from settings import settings
+
+from database import database, Collections
+
+from utils.logger import Logger, LogPipeline
+
+
+logger = Logger.init(__name__)
+
+CHECK_DIGIT_WEIGHTS = (2, 3, 4, 5, 6, 7, 8, 9)
+
+
+def check_digit(number):
+    """
+    Modulo 11 check digit, weights 2 to 9 from the rightmost digit.
+    Args:
+        number (int): The account number.
+    Returns:
+        int: The digit, 0 when the remainder leaves 10 or 11.
+    """
+    total = sum(
+        int(digit) * CHECK_DIGIT_WEIGHTS[position % len(CHECK_DIGIT_WEIGHTS)]
+        for position, digit in enumerate(reversed(str(number)))
+    )
+    digit = 11 - total % 11
+    return 0 if digit >= 10 else digit
+
+
+class AccountNumberAllocator:
+    """
+    Hands out account numbers from blocks reserved on a counter document.
+    One $inc reserves block_size numbers for this worker, so numbers are unique
+    across workers and only one round trip is paid per block. Numbers left in a
+    block when the worker stops are never used, the sequence has gaps but no repeats.
+    Args:
+        agency (str): The agency the numbers belong to.
+        block_size (int): Numbers reserved per round trip.
+        start (int): First account number of the agency.
+    """
+    def __init__(self, agency, block_size, start):
+        self.agency = agency
+        self.block_size = block_size
+        self.start = start
+        self.blocks = 0
+        self._next = 0
+        self._end = 0
+        self._lock = None
+        self._pid = None
+
+    @property
+    def counter_id(self):
+        return f"account_number:{self.agency}"
+
+    def _reset(self):
+        """
+        Drop the block inherited through fork, the parent process may still use it.
+        """
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._lock = asyncio.Lock()
+            self._next = self._end = 0
+
+    async def _reserve(self, size):
+        counter = await database[Collections.COUNTERS].find_one_and_update(
+            {"_id": self.counter_id},
+            {"$inc": {"value": size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        self.blocks += 1
+        self._end = self.start + counter["value"]
+        self._next = self._end - size
+
+    async def allocate(self, count=1):
+        """
+        Take the next account numbers with their check digit.
+        Args:
+            count (int): Numbers to take.
+        Returns:
+            list: (account_number, account_digit) pairs.
+        """
+        self._reset()
+        numbers = []
+        async with self._lock:
+            while len(numbers) < count:
+                if self._next >= self._end:
+                    await self._reserve(max(self.block_size, count - len(numbers)))
+
+                numbers.append((self._next, check_digit(self._next)))
+                self._next += 1
+
+        return numbers
+
+    def stats(self):
+        """
+        Allocator counters.
+        """
+        return {
+            "blocks": self.blocks,
+            "remaining": self._end - self._next,
+        }
+
+
+account_numbers = AccountNumberAllocator(
+    agency=settings.ACCOUNT_AGENCY,
+    block_size=settings.ACCOUNT_NUMBER_BLOCK_SIZE,
+    start=settings.ACCOUNT_NUMBER_START,
+)
+
+
+async def renumber_duplicates():
+    """
+    Give a new number to every account of the agency sharing its number with an
+    older one, so the unique index can be built over accounts created with the
+    old random default. New numbers start above the random range.
+    Returns:
+        int: Accounts renumbered.
+    """
+    duplicates = database[Collections.USER_BANK_ACCOUNTS].aggregate([
+        {"$match": {"agency": account_numbers.agency}},
+        {"$sort": {"created_at": 1}},
+        {"$group": {"_id": "$account_number", "ids": {"$push": "$id"}}},
+        {"$match": {"ids.1": {"$exists": True}}},
+    ], allowDiskUse=True)
+
+    renumbered = 0
+    async for group in duplicates:
+        for account_id in group["ids"][1:]:
+            (number, digit), = await account_numbers.allocate()
+            await database[Collections.USER_BANK_ACCOUNTS].update_one(
+                {"id": account_id},
+                {"$set": {"account_number": number, "account_digit": digit}}
+            )
+            renumbered += 1
+
+    return renumbered
+
+
+if __name__ == "__main__":
+    from database.indexes import create_indexes
+
+    LogPipeline.start()
+
+    async def renumber():
+        renumbered = await renumber_duplicates()
+        logger.info("Renumbered %s accounts", renumbered)
+        await create_indexes(database)
+
+    asyncio.run(renumber())
@@ -0,0 +1,19 @@
+import secrets
+
+from typing import Optional
+
+from fastapi import Header, HTTPException, status
+
+from settings import settings
+
+
+async def require_admin(x_admin_key: Optional[str] = Header(None)):
+    """
+    Allow the backoffice requests carrying the ADMIN_API_KEY in X-Admin-Key.
+    Admin endpoints are disabled while ADMIN_API_KEY is not set.
+    """
+    if not settings.ADMIN_API_KEY:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+    if not x_admin_key or not secrets.compare_digest(x_admin_key, settings.ADMIN_API_KEY):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin key")
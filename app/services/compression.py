@@ -0,0 +1,330 @@
+import zlib
+
+from time import perf_counter
+from collections import OrderedDict
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from settings import settings
+
+from utils.logger import Logger
+
+
+logger = Logger.init(__name__)
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+SKIPPED_STATUSES = (204, 206, 304)
+
+
+class GzipCompressor:
+    """
+    Streaming gzip, every chunk is flushed so the client can decode it at once.
+    """
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data, final):
+        chunk = self._compressor.compress(data)
+        return chunk + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class BrotliCompressor:
+    def __init__(self, quality):
+        import brotli
+
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data, final):
+        chunk = self._compressor.process(data)
+        return chunk + (self._compressor.finish() if final else self._compressor.flush())
+
+
+class ZstdCompressor:
+    def __init__(self, level):
+        import zstandard
+
+        self._flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data, final):
+        chunk = self._compressor.compress(data)
+        return chunk + (self._compressor.flush() if final else self._compressor.flush(self._flush_block))
+
+
+def load_encoders(encodings):
+    """
+    Get the compressor factories of the configured encodings, in preference order.
+    br and zstd need the brotli and zstandard packages and are left out without them.
+    Args:
+        encodings (list): Encoding names, the preferred first.
+    Returns:
+        dict: encoding to a factory of compressors.
+    """
+    factories = {
+        "gzip": lambda: GzipCompressor(settings.COMPRESSION_GZIP_LEVEL),
+        "br": lambda: BrotliCompressor(settings.COMPRESSION_BROTLI_QUALITY),
+        "zstd": lambda: ZstdCompressor(settings.COMPRESSION_ZSTD_LEVEL),
+    }
+    encoders = {}
+    for encoding in encodings:
+        try:
+            factories[encoding]()
+
+        except KeyError:
+            logger.warning("Unknown compression encoding %s", encoding)
+            continue
+
+        except ImportError:
+            logger.warning("Compression encoding %s needs a package that is not installed", encoding)
+            continue
+
+        encoders[encoding] = factories[encoding]
+    return encoders
+
+
+def negotiate(accept_encoding, encoders):
+    """
+    Pick the encoding of the response from Accept-Encoding.
+    The highest q value wins, ties go to the server preference order.
+    Args:
+        accept_encoding (str): The request header.
+        encoders (dict): The available encodings, in preference order.
+    Returns:
+        str: The encoding, None to answer uncompressed.
+    """
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+
+                except ValueError:
+                    quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in encoders:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def weak_etag(etag):
+    """
+    Mark an ETag weak, a compressed body is no longer byte identical to the one it was made for.
+    Args:
+        etag (str): The ETag.
+    """
+    return etag if etag.startswith("W/") else f"W/{etag}"
+
+
+class CompressionCache:
+    """
+    Compressed bodies of the responses with an ETag, keyed by path, ETag and
+    encoding, so an unchanged response is compressed once. Least recently used
+    bodies are evicted past max_bytes.
+    Args:
+        max_bytes (int): Compressed bytes kept, 0 disables the cache.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self._bodies = OrderedDict()
+
+    def get(self, key):
+        body = self._bodies.get(key)
+        if body is not None:
+            self._bodies.move_to_end(key)
+            self.hits += 1
+        return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+
+        previous = self._bodies.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+
+        self._bodies[key] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self._bodies.popitem(last=False)
+            self.size -= len(evicted)
+
+
+class Compression:
+    """
+    Response compression settings and counters shared by the middleware instances.
+    Args:
+        encodings (list): Encoding names, the preferred first.
+        minimum_size (int): Smallest complete body compressed, in bytes.
+        cache_bytes (int): Size of the precompressed cache, 0 disables it.
+    """
+    def __init__(self, encodings, minimum_size, cache_bytes):
+        self.encoders = load_encoders(encodings)
+        self.minimum_size = minimum_size
+        self.cache = CompressionCache(cache_bytes)
+        self.responses = 0
+        self.streams = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    def compressor(self, encoding):
+        return self.encoders[encoding]()
+
+    def compress(self, encoding, body, cache_key=None):
+        """
+        Compress a complete body, from the cache when it was compressed before.
+        Args:
+            encoding (str): The negotiated encoding.
+            body (bytes): The body.
+            cache_key (tuple): Path and ETag of a cacheable response.
+        """
+        self.responses += 1
+        self.bytes_in += len(body)
+
+        key = cache_key and (*cache_key, encoding)
+        compressed = self.cache.get(key) if key and self.cache.max_bytes else None
+        if compressed is None:
+            started = perf_counter()
+            compressed = self.compressor(encoding).compress(body, final=True)
+            self.seconds += perf_counter() - started
+            if key and self.cache.max_bytes:
+                self.cache.put(key, compressed)
+
+        self.bytes_out += len(compressed)
+        return compressed
+
+    def stats(self):
+        """
+        Compression counters.
+        """
+        return {
+            "responses": self.responses,
+            "streams": self.streams,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "seconds_total": round(self.seconds, 6),
+            "cache_hits": self.cache.hits,
+            "cache_bytes": self.cache.size,
+        }
+
+
+compression = Compression(
+    encodings=settings.COMPRESSION_ENCODINGS,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    cache_bytes=settings.COMPRESSION_CACHE_BYTES,
+)
+
+
+def compressible(headers):
+    """
+    Check a response can be compressed: a text or JSON body not encoded yet
+    and not marked no-transform.
+    Args:
+        headers (Headers): The response headers.
+    """
+    if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+        return False
+    return headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware compressing responses with the encoding negotiated
+    from Accept-Encoding. Complete bodies under minimum_size are sent as they
+    are. Streamed bodies are compressed chunk by chunk and flushed after each
+    one, so an export reaches the client as it is produced. Responses already
+    encoded, like the gzip export, are left untouched. The ETag of a
+    compressed response is made weak, and cacheable bodies (with an ETag) can
+    be kept precompressed with COMPRESSION_CACHE_BYTES.
+    Args:
+        app (ASGIApp): The wrapped app.
+        compression (Compression): Encoders, thresholds and counters.
+    """
+    def __init__(self, app, compression=compression):
+        self.app = app
+        self.compression = compression
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.compression.encoders)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.setdefault("headers", []))
+                if message["status"] in SKIPPED_STATUSES or not compressible(headers):
+                    passthrough = True
+                    if message["status"] == 304 and "etag" in headers:
+                        MutableHeaders(scope=message)["etag"] = weak_etag(headers["etag"])
+                    await send(message)
+                else:
+                    start = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            headers = MutableHeaders(scope=start)
+
+            if compressor is None and not more_body:
+                if len(body) < self.compression.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+
+                cache_key = (scope["path"], scope["query_string"], headers["etag"]) if "etag" in headers else None
+                body = self.compression.compress(encoding, body, cache_key)
+                self.set_headers(headers, encoding)
+                headers["content-length"] = str(len(body))
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            if compressor is None:
+                compressor = self.compression.compressor(encoding)
+                self.compression.streams += 1
+                self.set_headers(headers, encoding)
+                del headers["content-length"]
+                await send(start)
+
+            self.compression.bytes_in += len(body)
+            started = perf_counter()
+            chunk = compressor.compress(body, final=not more_body)
+            self.compression.seconds += perf_counter() - started
+            self.compression.bytes_out += len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def set_headers(headers, encoding):
+        headers["content-encoding"] = encoding
+        headers.add_vary_header("Accept-Encoding")
+        if "etag" in headers:
+            headers["etag"] = weak_etag(headers["etag"])
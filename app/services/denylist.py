@@ -0,0 +1,381 @@
+import sqlite3
+import threading
+
+from datetime import datetime, timezone
+from collections import OrderedDict
+
+from time import monotonic, time
+
+from starlette.concurrency import run_in_threadpool
+
+from settings import settings
+
+from database import Collections
+
+from utils.bloom import BloomFilter
+from utils.logger import Logger
+
+
+logger = Logger.init(__name__)
+
+CONFIRMED_CACHE_SIZE = 10000
+
+
+class DenylistLookupNeeded(Exception):
+    """
+    The bloom filter matched a token that was not confirmed yet, the caller
+    has to await DenylistStore.confirm before checking it again.
+    """
+    def __init__(self, jti):
+        super().__init__(jti)
+        self.jti = jti
+
+
+def to_datetime(timestamp):
+    """
+    Convert unix timestamp to naive UTC datetime as stored by MongoDB.
+    Args:
+        timestamp (float): The unix timestamp.
+    """
+    return datetime.utcfromtimestamp(timestamp)
+
+
+def to_timestamp(value):
+    """
+    Convert naive UTC datetime as stored by MongoDB to unix timestamp.
+    Args:
+        value (datetime): The datetime.
+    """
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class DenylistStore:
+    """
+    Revoked token store with a local bloom filter fast path.
+    Tokens the filter has never seen are accepted without reaching the backend.
+    A sync thread pulls the revocations made by other workers into the filter
+    every sync interval and rebuilds it without expired tokens every rebuild
+    interval, so contains never waits on the backend. Filter hits are
+    confirmed with confirm, in the threadpool, and the answer is kept.
+    Incremental syncs resume from the newest created_at pulled, a time set by
+    the store itself (the MongoDB server, or the host sharing the sqlite
+    file), so clock skew between workers does not hide revocations.
+    Args:
+        sync_interval (int): Seconds between incremental filter syncs.
+        sync_overlap (float): Seconds pulled again before the last created_at,
+            for revocations committed out of created_at order.
+        rebuild_interval (int): Seconds between full filter rebuilds.
+        bloom_capacity (int): Expected revoked tokens alive at once.
+        bloom_error_rate (float): Filter false positive rate.
+    """
+    def __init__(self, sync_interval, sync_overlap, rebuild_interval, bloom_capacity, bloom_error_rate):
+        self.sync_interval = sync_interval
+        self.sync_overlap = sync_overlap
+        self.rebuild_interval = rebuild_interval
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self.bloom_skips = 0
+        self.lookups = 0
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(bloom_capacity, bloom_error_rate)
+        self._confirmed = OrderedDict()
+        self._synced_at = 0
+        self._next_rebuild = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Start the sync thread, the first sync runs at once.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="denylist-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the sync thread.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def add(self, jti, expires_at):
+        """
+        Revoke a token until it expires.
+        Args:
+            jti (str): The token id.
+            expires_at (float): The token exp claim.
+        """
+        now = time()
+        if expires_at <= now:
+            return
+
+        self._add(jti, expires_at, now)
+
+        with self._lock:
+            self._bloom.add(jti)
+            self._remember(jti, True)
+
+    def contains(self, jti):
+        """
+        Check if token was revoked, from memory only.
+        Args:
+            jti (str): The token id.
+        Raises:
+            DenylistLookupNeeded: The filter matched and the token was not confirmed yet.
+        """
+        if jti not in self._bloom:
+            self.bloom_skips += 1
+            return False
+
+        revoked = self._confirmed.get(jti)
+        if revoked is None:
+            raise DenylistLookupNeeded(jti)
+        return revoked
+
+    async def confirm(self, jti):
+        """
+        Look up a token matched by the filter in the backend, in the threadpool.
+        Args:
+            jti (str): The token id.
+        Returns:
+            bool: The token was revoked, True when the lookup fails.
+        """
+        self.lookups += 1
+        try:
+            revoked = await run_in_threadpool(self._contains, jti, time())
+
+        except Exception as error:
+            logger.error("Denylist lookup failed, rejecting token: %s", error)
+            return True
+
+        with self._lock:
+            self._remember(jti, revoked)
+        return revoked
+
+    def sync(self):
+        """
+        Pull the revocations since the last sync into the filter, or rebuild it when due.
+        """
+        now = monotonic()
+        started = time()
+        try:
+            if now >= self._next_rebuild:
+                self._prune(started)
+                pulled = self._revoked_since(None, started)
+                revoked = [jti for jti, _ in pulled]
+                bloom = BloomFilter(max(self.bloom_capacity, len(revoked) * 2), self.bloom_error_rate)
+                for jti in revoked:
+                    bloom.add(jti)
+                with self._lock:
+                    self._bloom = bloom
+                    self._confirmed.clear()
+                    for jti in revoked:
+                        self._remember(jti, True)
+                self._next_rebuild = now + self.rebuild_interval
+            else:
+                pulled = self._revoked_since(self._synced_at - self.sync_overlap, started)
+                with self._lock:
+                    for jti, _ in pulled:
+                        self._bloom.add(jti)
+                        self._remember(jti, True)
+
+            self._synced_at = max((created_at for _, created_at in pulled), default=self._synced_at)
+
+        except Exception as error:
+            logger.error("Denylist sync failed: %s", error)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self.sync()
+            self._stopped.wait(self.sync_interval)
+
+    def _remember(self, jti, revoked):
+        self._confirmed[jti] = revoked
+        self._confirmed.move_to_end(jti)
+        while len(self._confirmed) > CONFIRMED_CACHE_SIZE:
+            self._confirmed.popitem(last=False)
+
+    def stats(self):
+        """
+        Denylist counters.
+        """
+        return {
+            "bloom_items": self._bloom.count,
+            "bloom_skips": self.bloom_skips,
+            "lookups": self.lookups,
+            "confirmed": len(self._confirmed),
+        }
+
+    def _add(self, jti, expires_at, created_at):
+        raise NotImplementedError
+
+    def _contains(self, jti, now):
+        raise NotImplementedError
+
+    def _revoked_since(self, since, now):
+        raise NotImplementedError
+
+    def _prune(self, now):
+        raise NotImplementedError
+
+
+class MemoryDenylist(DenylistStore):
+    """
+    Process local denylist, revocations are not shared between workers.
+    """
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._entries = {}
+
+    def _add(self, jti, expires_at, created_at):
+        self._entries[jti] = (expires_at, created_at)
+
+    def _contains(self, jti, now):
+        entry = self._entries.get(jti)
+        return entry is not None and entry[0] > now
+
+    def _revoked_since(self, since, now):
+        if since is not None:
+            return []
+
+        return [
+            (jti, created_at) for jti, (expires_at, created_at) in list(self._entries.items()) if expires_at > now
+        ]
+
+    def _prune(self, now):
+        for jti, (expires_at, _) in list(self._entries.items()):
+            if expires_at <= now:
+                self._entries.pop(jti, None)
+
+
+class MongoDenylist(DenylistStore):
+    """
+    Denylist shared by all workers on a MongoDB TTL collection.
+    MongoDB removes entries once expires_at passes, see database.indexes.
+    created_at is the server time of the revocation.
+    """
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._collection = None
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            from database.base import get_sync_database
+
+            self._collection = get_sync_database()[Collections.TOKEN_DENYLIST]
+        return self._collection
+
+    def _add(self, jti, expires_at, created_at):
+        self.collection.update_one(
+            {"jti": jti},
+            {
+                "$setOnInsert": {
+                    "jti": jti,
+                    "expires_at": to_datetime(expires_at),
+                },
+                "$currentDate": {"created_at": True},
+            },
+            upsert=True
+        )
+
+    def _contains(self, jti, now):
+        token = self.collection.find_one(
+            {"jti": jti, "expires_at": {"$gt": to_datetime(now)}},
+            {"_id": 1}
+        )
+        return token is not None
+
+    def _revoked_since(self, since, now):
+        query = {"expires_at": {"$gt": to_datetime(now)}}
+        if since is not None:
+            query["created_at"] = {"$gte": to_datetime(since)}
+
+        return [
+            (token["jti"], to_timestamp(token["created_at"]))
+            for token in self.collection.find(query, {"_id": 0, "jti": 1, "created_at": 1})
+        ]
+
+    def _prune(self, now):
+        pass
+
+
+class SqliteDenylist(DenylistStore):
+    """
+    Denylist shared by the workers of a host through a sqlite file.
+    Args:
+        path (str): The sqlite database file.
+    """
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._connection = None
+        self._db_lock = threading.Lock()
+
+    def _execute(self, query, params=()):
+        with self._db_lock:
+            if self._connection is None:
+                connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS denylist "
+                    "(jti TEXT PRIMARY KEY, expires_at REAL NOT NULL, created_at REAL NOT NULL)"
+                )
+                connection.execute("CREATE INDEX IF NOT EXISTS denylist_created_at ON denylist (created_at)")
+                self._connection = connection
+            return self._connection.execute(query, params).fetchall()
+
+    def _add(self, jti, expires_at, created_at):
+        self._execute(
+            "INSERT OR IGNORE INTO denylist (jti, expires_at, created_at) VALUES (?, ?, ?)",
+            (jti, expires_at, created_at)
+        )
+
+    def _contains(self, jti, now):
+        return bool(self._execute("SELECT 1 FROM denylist WHERE jti = ? AND expires_at > ?", (jti, now)))
+
+    def _revoked_since(self, since, now):
+        if since is None:
+            rows = self._execute("SELECT jti, created_at FROM denylist WHERE expires_at > ?", (now,))
+        else:
+            rows = self._execute(
+                "SELECT jti, created_at FROM denylist WHERE created_at >= ? AND expires_at > ?",
+                (since, now)
+            )
+        return [(jti, created_at) for jti, created_at in rows]
+
+    def _prune(self, now):
+        self._execute("DELETE FROM denylist WHERE expires_at <= ?", (now,))
+
+
+def create_denylist():
+    """
+    Create the denylist store for the configured backend.
+    - **memory**: process local.
+    - **mongo**: MongoDB TTL collection shared by every worker.
+    - **sqlite**: sqlite file shared by the workers of a host.
+    """
+    options = {
+        "sync_interval": settings.DENYLIST_SYNC_INTERVAL,
+        "sync_overlap": settings.DENYLIST_SYNC_OVERLAP,
+        "rebuild_interval": settings.DENYLIST_REBUILD_INTERVAL,
+        "bloom_capacity": settings.DENYLIST_BLOOM_CAPACITY,
+        "bloom_error_rate": settings.DENYLIST_BLOOM_ERROR_RATE,
+    }
+
+    if settings.DENYLIST_BACKEND == "mongo":
+        return MongoDenylist(**options)
+
+    if settings.DENYLIST_BACKEND == "sqlite":
+        return SqliteDenylist(settings.DENYLIST_SQLITE_PATH, **options)
+
+    return MemoryDenylist(**options)
+
+
+denylist = create_denylist()
@@ -0,0 +1,99 @@
+from pymongo.errors import PyMongoError
+
+from settings import settings
+
+from database import Collections
+
+from utils.bloom import BloomFilter
+from utils.logger import Logger
+
+
+logger = Logger.init(__name__)
+
+
+class EmailFilter:
+    """
+    Negative lookup filter of the registered emails.
+    Registration relies on the unique email index, so without the filter no
+    existence query is made. With it, emails the filter may have seen are looked
+    up before paying for bcrypt, and emails it has never seen are certainly new
+    and skip the query. The index still rejects the duplicates registered by
+    other workers since the last rebuild.
+    Args:
+        enabled (bool): Use the filter.
+        capacity (int): Expected number of users.
+        error_rate (float): Filter false positive rate.
+    """
+    def __init__(self, enabled, capacity, error_rate):
+        self.enabled = enabled
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.ready = False
+        self.skips = 0
+        self.lookups = 0
+        self._bloom = BloomFilter(capacity, error_rate)
+
+    async def rebuild(self, database):
+        """
+        Load every registered email into a new filter.
+        Args:
+            database (Database): The async database.
+        """
+        if not self.enabled:
+            return
+
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        try:
+            cursor = database[Collections.USERS].find({}, {"_id": 0, "email": 1}).batch_size(10000)
+            async for user in cursor:
+                bloom.add(user["email"])
+
+        except PyMongoError as error:
+            logger.error("Email filter rebuild failed, looking up every email: %s", error)
+            return
+
+        self._bloom = bloom
+        self.ready = True
+        logger.info("Email filter rebuilt with %s emails", bloom.count)
+
+    def add(self, email):
+        """
+        Add a registered email.
+        Args:
+            email (str): The user email.
+        """
+        if self.ready:
+            self._bloom.add(email)
+
+    def needs_lookup(self, email):
+        """
+        Check if the email may be registered and must be looked up.
+        Args:
+            email (str): The user email.
+        """
+        if not self.enabled:
+            return False
+
+        if not self.ready or email in self._bloom:
+            self.lookups += 1
+            return True
+
+        self.skips += 1
+        return False
+
+    def stats(self):
+        """
+        Email filter counters.
+        """
+        return {
+            "bloom_items": self._bloom.count,
+            "skips": self.skips,
+            "lookups": self.lookups,
+        }
+
+
+email_filter = EmailFilter(
+    enabled=settings.EMAIL_FILTER_ENABLED,
+    capacity=settings.EMAIL_FILTER_CAPACITY,
+    error_rate=settings.EMAIL_FILTER_ERROR_RATE,
+)
@@ -0,0 +1,246 @@
+import bson
+import threading
+
+from time import perf_counter
+from bisect import bisect_left
+from contextvars import ContextVar
+from collections import defaultdict
+
+from pymongo import monitoring
+
+from settings import settings
+
+
+EXCLUDED_PATHS = {"/health_check", "/metrics"}
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestTiming:
+    """
+    Mongo work done while serving one request.
+    Shared by reference with the driver threads through the request_timing contextvar.
+    """
+    __slots__ = ("commands", "duration", "bytes_sent", "bytes_received")
+
+    def __init__(self):
+        self.commands = 0
+        self.duration = 0.0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+request_timing = ContextVar("request_timing", default=None)
+
+
+class Metrics:
+    """
+    In process counters rendered in the Prometheus text format.
+    Updated from the event loop and from the driver threads, so every write holds the lock.
+    """
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.request_buckets = defaultdict(lambda: [0] * (len(buckets) + 1))
+        self.request_duration = defaultdict(float)
+        self.request_mongo_duration = defaultdict(float)
+        self.request_mongo_commands = defaultdict(int)
+        self.commands = defaultdict(int)
+        self.command_failures = defaultdict(int)
+        self.command_duration = defaultdict(float)
+        self.command_bytes_sent = defaultdict(int)
+        self.command_bytes_received = defaultdict(int)
+
+    def observe_request(self, method, route, status_code, duration, timing):
+        """
+        Record one served request.
+        Args:
+            method (str): The HTTP method.
+            route (str): The route path template.
+            status_code (int): The response status.
+            duration (float): Handler wall time in seconds.
+            timing (RequestTiming): The Mongo work of the request.
+        """
+        key = (method, route)
+        with self._lock:
+            self.requests[(method, route, status_code)] += 1
+            self.request_buckets[key][bisect_left(self.buckets, duration)] += 1
+            self.request_duration[key] += duration
+            self.request_mongo_duration[key] += timing.duration
+            self.request_mongo_commands[key] += timing.commands
+
+    def observe_command(self, command, duration, bytes_sent, bytes_received, failed=False):
+        """
+        Record one Mongo command.
+        Args:
+            command (str): The command name.
+            duration (float): Server round trip in seconds.
+            bytes_sent (int): Size of the command document.
+            bytes_received (int): Size of the reply document.
+            failed (bool): The command failed.
+        """
+        with self._lock:
+            self.commands[command] += 1
+            self.command_duration[command] += duration
+            self.command_bytes_sent[command] += bytes_sent
+            self.command_bytes_received[command] += bytes_received
+            if failed:
+                self.command_failures[command] += 1
+
+    def render(self, gauges=None):
+        """
+        Render every metric in the Prometheus text exposition format.
+        Args:
+            gauges (dict): Extra name to value gauges, like cache sizes.
+        Returns:
+            str: The exposition text.
+        """
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            family("http_requests_total", "counter", "Requests served.")
+            for (method, route, status_code), value in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status_code}"}} {value}')
+
+            family("http_request_duration_seconds", "histogram", "Handler wall time.")
+            for (method, route), counts in sorted(self.request_buckets.items()):
+                labels = f'method="{method}",route="{route}"'
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {self.request_duration[(method, route)]:.6f}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {cumulative}")
+
+            family("http_request_mongo_seconds_total", "counter", "Mongo time spent by requests.")
+            for (method, route), value in sorted(self.request_mongo_duration.items()):
+                lines.append(f'http_request_mongo_seconds_total{{method="{method}",route="{route}"}} {value:.6f}')
+
+            family("http_request_mongo_commands_total", "counter", "Mongo commands sent by requests.")
+            for (method, route), value in sorted(self.request_mongo_commands.items()):
+                lines.append(f'http_request_mongo_commands_total{{method="{method}",route="{route}"}} {value}')
+
+            for name, kind, help_text, values in (
+                ("mongo_commands_total", "counter", "Mongo commands sent.", self.commands),
+                ("mongo_command_failures_total", "counter", "Mongo commands failed.", self.command_failures),
+                ("mongo_command_seconds_total", "counter", "Mongo command round trip time.", self.command_duration),
+                ("mongo_command_sent_bytes_total", "counter", "Mongo command bytes sent.", self.command_bytes_sent),
+                ("mongo_command_received_bytes_total", "counter", "Mongo reply bytes received.", self.command_bytes_received),
+            ):
+                family(name, kind, help_text)
+                for command, value in sorted(values.items()):
+                    lines.append(f'{name}{{command="{command}"}} {value}')
+
+        for name, value in (gauges or {}).items():
+            family(name, "gauge", name.replace("_", " ").capitalize() + ".")
+            lines.append(f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class CommandListener(monitoring.CommandListener):
+    """
+    Attributes every Mongo command to the request being served.
+    Motor and the threadpool adapter copy the request context into the driver
+    thread, so request_timing points to the request RequestTiming there too.
+    Sizes are measured by encoding the documents again, MONGO_METRICS_BYTES=false skips it.
+    """
+    def __init__(self, measure_bytes=True):
+        self.measure_bytes = measure_bytes
+        self._sent = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if self.measure_bytes:
+            self._sent[(event.request_id, event.connection_id)] = len(bson.encode(event.command))
+
+    def succeeded(self, event):
+        self._finish(event, len(bson.encode(event.reply)) if self.measure_bytes else 0)
+
+    def failed(self, event):
+        self._finish(event, 0, failed=True)
+
+    def _finish(self, event, bytes_received, failed=False):
+        duration = event.duration_micros / 1e6
+        bytes_sent = self._sent.pop((event.request_id, event.connection_id), 0)
+        metrics.observe_command(event.command_name, duration, bytes_sent, bytes_received, failed)
+
+        timing = request_timing.get()
+        if timing is not None:
+            with self._lock:
+                timing.commands += 1
+                timing.duration += duration
+                timing.bytes_sent += bytes_sent
+                timing.bytes_received += bytes_received
+
+
+command_listener = CommandListener(measure_bytes=settings.MONGO_METRICS_BYTES)
+
+
+def server_timing(duration, timing):
+    """
+    Build the Server-Timing header value.
+    Args:
+        duration (float): Handler wall time in seconds.
+        timing (RequestTiming): The Mongo work of the request.
+    """
+    return (
+        f"app;dur={duration * 1000:.1f}, "
+        f"mongo;dur={timing.duration * 1000:.1f};"
+        f'desc="{timing.commands} commands, {timing.bytes_sent + timing.bytes_received} bytes"'
+    )
+
+
+class TimingMiddleware:
+    """
+    Pure ASGI middleware timing every request.
+    The Server-Timing header covers the handler up to the response start, the
+    metrics cover the whole response and are labelled by route template so path
+    parameters do not blow up the series.
+    Args:
+        app (ASGIApp): The wrapped app.
+        excluded_paths (set): Paths served without timing, like the health check.
+    """
+    def __init__(self, app, excluded_paths=EXCLUDED_PATHS):
+        self.app = app
+        self.excluded_paths = excluded_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = request_timing.set(timing)
+        started = perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                header = server_timing(perf_counter() - started, timing).encode("latin-1")
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+
+        finally:
+            route = scope.get("route")
+            metrics.observe_request(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                status_code,
+                perf_counter() - started,
+                timing,
+            )
+            request_timing.reset(token)
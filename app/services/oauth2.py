@@ -1,8 +1,7 @@
-import base64
-
 from typing import List
 
-from fastapi_jwt_auth import AuthJWT
+from fastapi_jwt_auth import AuthJWT as BaseAuthJWT
+from fastapi_jwt_auth.exceptions import InvalidHeaderError, JWTDecodeError, RevokedTokenError
 
 from pydantic import BaseModel
 
@@ -10,14 +9,18 @@ from fastapi import Depends, HTTPException, status
 
 from settings import settings
 
-from database.controllers.user import get_user_by_id
+from database.controllers.user import get_user_auth_status
+
+from services.denylist import denylist, DenylistLookupNeeded
+from services.principal_cache import principal_cache
+from services.token_verifier import token_verifier, decode_pem
 
 from utils import UserNotFound, NotVerified, UserDeleted
 
 from utils.logger import Logger
 
 
-logger = Logger.init('JWTLogger')
+logger = Logger.init(__name__)
 
 
 class JWTSettings(BaseModel):
@@ -43,9 +46,63 @@ class JWTSettings(BaseModel):
 
     authjwt_denylist_token_checks: set = {'access', 'refresh'}
 
-    authjwt_public_key: str = base64.b64decode(settings.JWT_PUBLIC_KEY).decode('utf-8')
+    authjwt_public_key: str = decode_pem(settings.JWT_PUBLIC_KEY)
 
-    authjwt_private_key: str = base64.b64decode(settings.JWT_PRIVATE_KEY).decode('utf-8')
+    authjwt_private_key: str = decode_pem(settings.JWT_PRIVATE_KEY)
+
+
+class AuthJWT(BaseAuthJWT):
+    """
+    AuthJWT signing and verifying through token_verifier.
+    The base class parses the PEM keys and verifies the signature on each of
+    jwt_required, get_raw_jwt and get_jwt_subject, here the key objects are
+    parsed once and a token is verified once while it is in the memo.
+    Async routes check tokens with verify, which confirms denylist filter
+    hits in the threadpool instead of blocking the event loop.
+    """
+    async def verify(self, refresh=False):
+        """
+        jwt_required, or jwt_refresh_token_required, with the denylist lookup awaited.
+        Args:
+            refresh (bool): Require a refresh token.
+        """
+        required = self.jwt_refresh_token_required if refresh else self.jwt_required
+        try:
+            required()
+
+        except DenylistLookupNeeded as pending:
+            if await denylist.confirm(pending.jti):
+                raise RevokedTokenError(status_code=401, message="Token has been revoked")
+            required()
+
+    def _create_token(self, *args, headers=None, **kwargs):
+        return super()._create_token(*args, headers=token_verifier.headers(headers), **kwargs)
+
+    def _get_secret_key(self, algorithm, process):
+        if algorithm == token_verifier.algorithm and process == "encode":
+            return token_verifier.signing_key
+        return super()._get_secret_key(algorithm, process)
+
+    def _verified_token(self, encoded_token, issuer=None):
+        try:
+            algorithm = self.get_unverified_jwt_headers(encoded_token)["alg"]
+
+        except Exception as error:
+            raise InvalidHeaderError(status_code=422, message=str(error))
+
+        if algorithm != token_verifier.algorithm:
+            raise JWTDecodeError(status_code=422, message="The specified alg value is not allowed")
+
+        try:
+            return token_verifier.verify(
+                encoded_token,
+                issuer=issuer,
+                audience=self._decode_audience,
+                leeway=self._decode_leeway,
+            )
+
+        except Exception as error:
+            raise JWTDecodeError(status_code=422, message=str(error))
 
 
 @AuthJWT.load_config
@@ -53,34 +110,36 @@ def get_config():
     return JWTSettings()
 
 
-denylist = set()
-
-
 @AuthJWT.token_in_denylist_loader
 def check_if_token_in_denylist(decrypted_token):
     jti = decrypted_token['jti']
-    return jti in denylist
+    return denylist.contains(jti)
 
 
-def require_user(Authorize: AuthJWT = Depends()):
+async def require_user(Authorize: AuthJWT = Depends()):
     try:
-        Authorize.jwt_required()
+        await Authorize.verify()
         user_id = Authorize.get_jwt_subject()
 
-        user = get_user_by_id(user_id)
+        user = principal_cache.get(user_id)
 
-        if user["deleted_at"]:
-            raise UserDeleted('User deleted')
+        if user is None:
+            user = await get_user_auth_status(user_id)
+            if user:
+                principal_cache.set(user_id, user)
 
         if not user:
             raise UserNotFound('User no longer exist')
 
+        if user["deleted_at"]:
+            raise UserDeleted('User deleted')
+
         if not user["is_active"]:
             raise NotVerified('You are not verified')
 
     except Exception as erro:
         error = erro.__class__.__name__
-        logger.info(f'Error: {error}')
+        logger.info("Error: %s", error)
 
         if error == 'MissingTokenError':
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='You are not logged in')
@@ -1,5 +1,22 @@
+import asyncio
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import HTTPException, status
+
 from passlib.context import CryptContext
 
+from starlette.concurrency import run_in_threadpool
+
+from settings import settings
+
+from utils.logger import Logger
+
+
+logger = Logger.init(__name__)
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
@@ -13,6 +30,15 @@ class Password():
         """
         return pwd_context.hash(password)
 
+    @staticmethod
+    def get_password_hashes(passwords):
+        """
+        Get the hashes of many passwords in one pool task
+        Args:
+            passwords (list): Passwords
+        """
+        return [pwd_context.hash(password) for password in passwords]
+
     @staticmethod
     def verify_password(plain_password, hashed_password):
         """
@@ -22,3 +48,101 @@ class Password():
             hashed_password (str): Hashed password
         """
         return pwd_context.verify(plain_password, hashed_password)
+
+    @staticmethod
+    def verify_and_update(plain_password, hashed_password):
+        """
+        Verify password and rehash it when the hash is deprecated
+        Args:
+            plain_password (str): Plain password
+            hashed_password (str): Hashed password
+        Returns:
+            tuple: (valid, new hash or None)
+        """
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class PasswordPool():
+    """
+    Runs bcrypt in a dedicated process pool so it does not pin the event loop
+    or the threadpool shared with the other endpoints. Pool processes are
+    spawned, not forked from a worker holding client sockets and threads, and
+    a pool broken by a dead process is replaced on the next call.
+    Args:
+        max_workers (int): Pool processes, 0 runs bcrypt in the threadpool.
+        max_pending (int): Max hashes queued or running before answering 503.
+    """
+    def __init__(self, max_workers, max_pending):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self.restarts = 0
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _replace_broken(self, executor):
+        if self._executor is executor:
+            self._executor = None
+            self.restarts += 1
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, func, *args):
+        """
+        Run a password function in the pool.
+        Args:
+            func (callable): The Password function.
+            args: The function arguments.
+        """
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server busy, please try again.",
+                headers={"Retry-After": "1"},
+            )
+
+        self.pending += 1
+        try:
+            if self.max_workers <= 0:
+                return await run_in_threadpool(func, *args)
+
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            try:
+                return await loop.run_in_executor(executor, func, *args)
+
+            except BrokenProcessPool as error:
+                logger.error("Password pool broken, restarting it: %s", error)
+                self._replace_broken(executor)
+                return await loop.run_in_executor(self._get_executor(), func, *args)
+
+        finally:
+            self.pending -= 1
+
+    async def get_password_hash(self, password):
+        return await self.run(Password.get_password_hash, password)
+
+    async def verify_password(self, plain_password, hashed_password):
+        return await self.run(Password.verify_password, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password, hashed_password):
+        return await self.run(Password.verify_and_update, plain_password, hashed_password)
+
+    def shutdown(self, wait=False):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+password_pool = PasswordPool(
+    max_workers=settings.PASSWORD_POOL_SIZE,
+    max_pending=settings.PASSWORD_POOL_QUEUE_SIZE,
+)
@@ -0,0 +1,94 @@
+from time import monotonic
+
+from collections import OrderedDict
+
+from settings import settings
+
+
+PRINCIPAL_FIELDS = ("is_active", "deleted_at", "status")
+
+
+class PrincipalCache:
+    """
+    Bounded LRU cache with TTL for the authenticated principal status.
+    Entries are keyed by the JWT subject and invalidated on user writes.
+    Invalidation is local to the worker, the TTL bounds staleness across workers.
+    Args:
+        max_size (int): Max entries kept before evicting the least recently used.
+        ttl (int): Seconds an entry stays valid.
+    """
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def get(self, user_id):
+        """
+        Get the cached principal.
+        Args:
+            user_id (str): The JWT subject.
+        Returns:
+            dict: The principal status or None on miss.
+        """
+        entry = self._entries.get(user_id)
+
+        if entry is None or entry[0] < monotonic():
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, user_id, user):
+        """
+        Cache the principal status fields of a user.
+        Args:
+            user_id (str): The JWT subject.
+            user (dict): The user data.
+        """
+        if self.max_size <= 0:
+            return
+
+        principal = {field: user.get(field) for field in PRINCIPAL_FIELDS}
+        self._entries[user_id] = (monotonic() + self.ttl, principal)
+        self._entries.move_to_end(user_id)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_id):
+        """
+        Drop a principal from cache.
+        Args:
+            user_id (str): The JWT subject.
+        """
+        self._entries.pop(user_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        """
+        Cache counters used to size the cache.
+        """
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+principal_cache = PrincipalCache(
+    max_size=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL,
+)
@@ -0,0 +1,420 @@
+import math
+
+from time import time
+from collections import OrderedDict, deque
+
+import orjson
+
+from pymongo import ReturnDocument
+
+from settings import settings
+
+from database import Collections
+
+from services.denylist import to_datetime
+
+from utils.logger import Logger
+from utils.responses import FastJSONResponse
+
+
+logger = Logger.init(__name__)
+
+MAX_BODY_SIZE = 64 * 1024
+
+
+class RateLimitStore:
+    """
+    Token buckets and failed login windows.
+    Buckets start full with burst tokens and refill rate tokens per second.
+    Failures are counted over a sliding window, and a key can be locked until a time.
+    """
+    async def take(self, key, burst, rate, now):
+        """
+        Take one token of the key bucket.
+        Args:
+            key (str): The bucket key.
+            burst (int): Bucket size.
+            rate (float): Tokens refilled per second.
+            now (float): The unix time.
+        Returns:
+            float: 0 when allowed, else seconds until the next token.
+        """
+        raise NotImplementedError
+
+    async def add_failure(self, key, window, now):
+        """
+        Record a failed login.
+        Returns:
+            int: Failures of the key within the window, this one included.
+        """
+        raise NotImplementedError
+
+    async def lock(self, key, until):
+        raise NotImplementedError
+
+    async def locked_until(self, key, now):
+        """
+        Returns:
+            float: Unix time the key is locked until, 0 when it is not locked.
+        """
+        raise NotImplementedError
+
+    async def clear(self, key):
+        raise NotImplementedError
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """
+    Process local store, each worker enforces its own limits.
+    Keys are evicted least recently used first once max_keys is reached.
+    Args:
+        max_keys (int): Max buckets and failure windows kept.
+    """
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._failures = OrderedDict()
+
+    def _touch(self, entries, key, entry):
+        entries[key] = entry
+        entries.move_to_end(key)
+        if len(entries) > self.max_keys:
+            entries.popitem(last=False)
+
+    async def take(self, key, burst, rate, now):
+        tokens, updated = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+
+        if tokens < 1:
+            self._touch(self._buckets, key, (tokens, now))
+            return (1 - tokens) / rate
+
+        self._touch(self._buckets, key, (tokens - 1, now))
+        return 0
+
+    async def add_failure(self, key, window, now):
+        failures, locked_until = self._failures.get(key, (deque(), 0))
+        while failures and failures[0] <= now - window:
+            failures.popleft()
+        failures.append(now)
+        self._touch(self._failures, key, (failures, locked_until))
+        return len(failures)
+
+    async def lock(self, key, until):
+        failures, _ = self._failures.get(key, (deque(), 0))
+        self._touch(self._failures, key, (failures, until))
+
+    async def locked_until(self, key, now):
+        entry = self._failures.get(key)
+        if entry is None or entry[1] <= now:
+            return 0
+        return entry[1]
+
+    async def clear(self, key):
+        self._failures.pop(key, None)
+
+
+class MongoRateLimitStore(RateLimitStore):
+    """
+    Store shared by all workers, one document per key updated with a single
+    pipeline update. Documents expire through the expires_at TTL index.
+    """
+    @property
+    def collection(self):
+        from database import database
+
+        return database[Collections.RATE_LIMITS]
+
+    async def take(self, key, burst, rate, now):
+        bucket = await self.collection.find_one_and_update(
+            {"_id": f"bucket:{key}"},
+            [
+                {"$set": {"tokens": {"$min": [burst, {"$add": [
+                    {"$ifNull": ["$tokens", burst]},
+                    {"$multiply": [{"$subtract": [now, {"$ifNull": ["$updated", now]}]}, rate]},
+                ]}]}}},
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", 1]},
+                    "tokens": {"$cond": [{"$gte": ["$tokens", 1]}, {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    "updated": now,
+                    "expires_at": to_datetime(now + burst / rate),
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return 0 if bucket["allowed"] else (1 - bucket["tokens"]) / rate
+
+    async def add_failure(self, key, window, now):
+        entry = await self.collection.find_one_and_update(
+            {"_id": f"failures:{key}"},
+            [{"$set": {
+                "failures": {"$concatArrays": [
+                    {"$filter": {"input": {"$ifNull": ["$failures", []]}, "cond": {"$gt": ["$$this", now - window]}}},
+                    [now],
+                ]},
+                "expires_at": {"$max": ["$expires_at", to_datetime(now + window)]},
+            }}],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return len(entry["failures"])
+
+    async def lock(self, key, until):
+        await self.collection.update_one(
+            {"_id": f"failures:{key}"},
+            {"$set": {"locked_until": until}, "$max": {"expires_at": to_datetime(until)}},
+            upsert=True,
+        )
+
+    async def locked_until(self, key, now):
+        entry = await self.collection.find_one(
+            {"_id": f"failures:{key}", "locked_until": {"$gt": now}},
+            {"_id": 0, "locked_until": 1}
+        )
+        return entry["locked_until"] if entry else 0
+
+    async def clear(self, key):
+        await self.collection.delete_one({"_id": f"failures:{key}"})
+
+
+class RateLimiter:
+    """
+    Token bucket limits per client IP and per email, and progressive lockout
+    of the emails with repeated failed logins.
+    Args:
+        store (RateLimitStore): The buckets and failures store.
+        ip_burst (int): Requests an IP can send at once, per path.
+        ip_per_minute (float): Requests per minute refilled per IP and path.
+        email_burst (int): Requests an email can send at once, per path.
+        email_per_minute (float): Requests per minute refilled per email and path.
+        lockout_threshold (int): Failed logins within the window before the email is locked.
+        lockout_seconds (int): First lock duration, doubled on every further failure.
+        lockout_max_seconds (int): Longest lock duration.
+        failure_window (int): Seconds failed logins are counted for.
+    """
+    def __init__(
+        self,
+        store,
+        ip_burst,
+        ip_per_minute,
+        email_burst,
+        email_per_minute,
+        lockout_threshold,
+        lockout_seconds,
+        lockout_max_seconds,
+        failure_window,
+    ):
+        self.store = store
+        self.ip_burst = ip_burst
+        self.ip_rate = ip_per_minute / 60
+        self.email_burst = email_burst
+        self.email_rate = email_per_minute / 60
+        self.lockout_threshold = lockout_threshold
+        self.lockout_seconds = lockout_seconds
+        self.lockout_max_seconds = lockout_max_seconds
+        self.failure_window = failure_window
+        self.allowed = 0
+        self.limited_ip = 0
+        self.limited_email = 0
+        self.locked = 0
+        self.failures = 0
+        self.lockouts = 0
+
+    async def check(self, path, ip, email, now):
+        """
+        Take the IP and email tokens of one request.
+        Args:
+            path (str): The limited path.
+            ip (str): The client IP.
+            email (str): The normalized email, None when the body has none.
+            now (float): The unix time.
+        Returns:
+            float: 0 when allowed, else seconds the client should wait.
+        """
+        retry_after = await self.store.take(f"ip:{path}:{ip}", self.ip_burst, self.ip_rate, now)
+        if retry_after:
+            self.limited_ip += 1
+            return retry_after
+
+        if email:
+            locked_until = await self.store.locked_until(f"login:{email}", now)
+            if locked_until:
+                self.locked += 1
+                return locked_until - now
+
+            retry_after = await self.store.take(f"email:{path}:{email}", self.email_burst, self.email_rate, now)
+            if retry_after:
+                self.limited_email += 1
+                return retry_after
+
+        self.allowed += 1
+        return 0
+
+    async def login_failed(self, email, now):
+        """
+        Count a failed login, locking the email for lockout_seconds doubled on
+        every failure past the threshold.
+        Args:
+            email (str): The normalized email.
+            now (float): The unix time.
+        """
+        self.failures += 1
+        failures = await self.store.add_failure(f"login:{email}", self.failure_window, now)
+        if failures < self.lockout_threshold:
+            return
+
+        duration = min(self.lockout_seconds * 2 ** (failures - self.lockout_threshold), self.lockout_max_seconds)
+        await self.store.lock(f"login:{email}", now + duration)
+        self.lockouts += 1
+        logger.warning("Login locked for %s seconds after %s failures", duration, failures)
+
+    async def login_succeeded(self, email):
+        await self.store.clear(f"login:{email}")
+
+    def stats(self):
+        """
+        Rate limiter counters.
+        """
+        return {
+            "allowed": self.allowed,
+            "limited_ip": self.limited_ip,
+            "limited_email": self.limited_email,
+            "locked": self.locked,
+            "login_failures": self.failures,
+            "lockouts": self.lockouts,
+        }
+
+
+def create_store():
+    if settings.RATE_LIMIT_BACKEND == "mongo":
+        return MongoRateLimitStore()
+    return MemoryRateLimitStore(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+
+
+rate_limiter = RateLimiter(
+    store=create_store(),
+    ip_burst=settings.RATE_LIMIT_IP_BURST,
+    ip_per_minute=settings.RATE_LIMIT_IP_PER_MINUTE,
+    email_burst=settings.RATE_LIMIT_EMAIL_BURST,
+    email_per_minute=settings.RATE_LIMIT_EMAIL_PER_MINUTE,
+    lockout_threshold=settings.LOGIN_LOCKOUT_THRESHOLD,
+    lockout_seconds=settings.LOGIN_LOCKOUT_SECONDS,
+    lockout_max_seconds=settings.LOGIN_LOCKOUT_MAX_SECONDS,
+    failure_window=settings.LOGIN_FAILURE_WINDOW,
+)
+
+
+def client_ip(scope):
+    """
+    The client IP, or the X-Forwarded-For hop added by the first of
+    RATE_LIMIT_TRUSTED_HOPS trusted proxies. Hops left of it are sent by the
+    client and are not trusted.
+    Args:
+        scope (dict): The ASGI scope.
+    """
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        hops = [
+            hop.strip()
+            for name, value in scope["headers"] if name == b"x-forwarded-for"
+            for hop in value.decode("latin-1").split(",")
+        ]
+        hops = [hop for hop in hops if hop]
+        if settings.RATE_LIMIT_TRUSTED_HOPS > 0 and len(hops) >= settings.RATE_LIMIT_TRUSTED_HOPS:
+            return hops[-settings.RATE_LIMIT_TRUSTED_HOPS]
+
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def read_email(body):
+    """
+    The lowercased email of a JSON body, None when it has none.
+    Args:
+        body (bytes): The request body.
+    """
+    try:
+        email = orjson.loads(body).get("email")
+
+    except (orjson.JSONDecodeError, AttributeError):
+        return None
+
+    return email.strip().lower() if isinstance(email, str) else None
+
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI middleware answering 429 before the request reaches the router,
+    so a rejected request never pays for a database lookup or bcrypt.
+    The body of limited paths is read to key them by email and replayed to the app.
+    Args:
+        app (ASGIApp): The wrapped app.
+        limiter (RateLimiter): The limiter.
+        paths (set): The limited POST paths.
+        login_path (str): The path whose 401 responses count as failed logins.
+    """
+    def __init__(self, app, limiter=rate_limiter, paths=("/login/", "/register/"), login_path="/login/"):
+        self.app = app
+        self.limiter = limiter
+        self.paths = set(paths)
+        self.login_path = login_path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        chunks = []
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            more_body = message.get("more_body", False)
+            if size > MAX_BODY_SIZE:
+                break
+
+        body = b"".join(chunks)
+        email = read_email(body) if not more_body else None
+        now = time()
+
+        retry_after = await self.limiter.check(scope["path"], client_ip(scope), email, now)
+        if retry_after:
+            response = FastJSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests, please try again later."},
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+            await response(scope, receive, send)
+            return
+
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": more_body}
+            return await receive()
+
+        if scope["path"] != self.login_path or not email:
+            await self.app(scope, replay, send)
+            return
+
+        status_code = None
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        await self.app(scope, replay, send_with_status)
+
+        if status_code == 401:
+            await self.limiter.login_failed(email, time())
+        elif status_code == 200:
+            await self.limiter.login_succeeded(email)
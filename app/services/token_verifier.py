@@ -0,0 +1,149 @@
+import base64
+
+from time import time, perf_counter
+from collections import OrderedDict
+
+import jwt
+
+from jwt.algorithms import get_default_algorithms
+
+from settings import settings
+
+
+def decode_pem(value):
+    """
+    Decode a base64 encoded PEM key as stored in the settings.
+    Args:
+        value (str): The base64 PEM.
+    """
+    return base64.b64decode(value).decode("utf-8")
+
+
+class TokenVerifier:
+    """
+    JWT signing and verification with key objects parsed once, and a memo of
+    recently verified tokens so the same token is only checked by crypto once
+    while it is cached. Entries live ttl seconds at most and never past the
+    token exp, the denylist is still checked on every request.
+    Tokens are signed with the current key and its kid, and verified with the
+    key of their kid header, so previous public keys keep validating the tokens
+    they signed during a rotation. Tokens without kid use the current key.
+    Args:
+        algorithm (str): The JWT algorithm.
+        private_key (str): The current private key PEM.
+        public_key (str): The current public key PEM.
+        key_id (str): The kid of the current key.
+        previous_public_keys (dict): kid to public key PEM of the rotated keys.
+        cache_size (int): Verified tokens kept.
+        cache_ttl (int): Seconds a verified token is kept.
+    """
+    def __init__(self, algorithm, private_key, public_key, key_id=None, previous_public_keys=None, cache_size=10000, cache_ttl=60):
+        prepare_key = get_default_algorithms()[algorithm].prepare_key
+        self.algorithm = algorithm
+        self.key_id = key_id
+        self.signing_key = prepare_key(private_key)
+        self.public_key = prepare_key(public_key)
+        self.public_keys = {kid: prepare_key(key) for kid, key in (previous_public_keys or {}).items()}
+        if key_id:
+            self.public_keys[key_id] = self.public_key
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.verifications = 0
+        self.failures = 0
+        self.cache_hits = 0
+        self.verify_seconds = 0.0
+        self._verified = OrderedDict()
+
+    def headers(self, headers=None):
+        """
+        Token headers with the kid of the signing key.
+        Args:
+            headers (dict): Extra headers.
+        """
+        if not self.key_id:
+            return headers
+        return {**(headers or {}), "kid": self.key_id}
+
+    def key_for(self, token):
+        """
+        Get the public key of the token kid.
+        Args:
+            token (str): The encoded token.
+        """
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid is None:
+            return self.public_key
+        if kid not in self.public_keys:
+            raise jwt.InvalidTokenError(f"Unknown kid {kid}")
+        return self.public_keys[kid]
+
+    def verify(self, token, issuer=None, audience=None, leeway=0):
+        """
+        Verify a token, from the memo when it was verified recently.
+        Args:
+            token (str): The encoded token.
+            issuer (str): Expected issuer.
+            audience (str): Expected audience.
+            leeway (int): Seconds of clock skew allowed on exp and nbf.
+        Returns:
+            dict: The token claims.
+        """
+        now = time()
+        key = (token, issuer, str(audience))
+        entry = self._verified.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._verified.move_to_end(key)
+                self.cache_hits += 1
+                return entry[1]
+            del self._verified[key]
+
+        started = perf_counter()
+        try:
+            claims = jwt.decode(
+                token,
+                self.key_for(token),
+                algorithms=[self.algorithm],
+                issuer=issuer,
+                audience=audience,
+                leeway=leeway,
+            )
+
+        except Exception:
+            self.failures += 1
+            raise
+
+        finally:
+            self.verifications += 1
+            self.verify_seconds += perf_counter() - started
+
+        expires_at = min(claims.get("exp", now + self.cache_ttl), now + self.cache_ttl)
+        if expires_at > now and self.cache_size:
+            self._verified[key] = (expires_at, claims)
+            if len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+
+        return claims
+
+    def stats(self):
+        """
+        Verifier counters.
+        """
+        return {
+            "verifications": self.verifications,
+            "failures": self.failures,
+            "cache_hits": self.cache_hits,
+            "cache_size": len(self._verified),
+            "verify_seconds_total": round(self.verify_seconds, 6),
+        }
+
+
+token_verifier = TokenVerifier(
+    algorithm=settings.JWT_ALGORITHM,
+    private_key=decode_pem(settings.JWT_PRIVATE_KEY),
+    public_key=decode_pem(settings.JWT_PUBLIC_KEY),
+    key_id=settings.JWT_KEY_ID,
+    previous_public_keys={kid: decode_pem(key) for kid, key in settings.JWT_PREVIOUS_PUBLIC_KEYS.items()},
+    cache_size=settings.JWT_VERIFY_CACHE_SIZE,
+    cache_ttl=settings.JWT_VERIFY_CACHE_TTL,
+)
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseSettings
 
 
@@ -16,11 +18,65 @@ class Settings(BaseSettings):
     CORS_ORIGINS: list
     DEBUG: bool
 
+    # Logging settings
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"
+    LOG_SAMPLE_RATE: float = 1.0
+
     # Database settings
     MONGO_URL: str
     MONGO_SSL: str
     PATH_CERT: str
     DATABASE_ENVIRONMENT: str
+    MONGO_DRIVER: str = "motor"
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None
+
+    # Pagination settings
+    PAGE_SIZE_DEFAULT: int = 50
+    PAGE_SIZE_MAX: int = 200
+    USER_VIEW_PAGE_SIZE: int = 10
+
+    # Batch settings
+    BATCH_MAX_ITEMS: int = 500
+    BULK_MAX_ITEMS: int = 5000
+
+    # Admin settings
+    ADMIN_API_KEY: Optional[str] = None
+    EXPORT_BATCH_SIZE: int = 1000
+    EXPORT_BATCH_SIZE_MAX: int = 10000
+    IMPORT_CHUNK_SIZE: int = 500
+    IMPORT_HASH_WORKERS: int = 2
+    IMPORT_MAX_ERRORS: int = 100
+
+    # Account number settings
+    ACCOUNT_AGENCY: str = "0001"
+    ACCOUNT_NUMBER_START: int = 1000000
+    ACCOUNT_NUMBER_BLOCK_SIZE: int = 100
+
+    # Archive settings
+    ARCHIVE_ENABLED: bool = False
+    ARCHIVE_AFTER_DAYS: int = 30
+    ARCHIVE_BATCH_SIZE: int = 1000
+    ARCHIVE_INTERVAL: int = 3600
+
+    # HTTP cache settings, CACHE_CONTROL maps a route path to its Cache-Control
+    CACHE_CONTROL_DEFAULT: str = "private, no-cache"
+    CACHE_CONTROL: dict = {}
+
+    # Response compression settings, COMPRESSION_ENCODINGS lists the preferred first
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_ENCODINGS: list = ["zstd", "br", "gzip"]
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    COMPRESSION_CACHE_BYTES: int = 0
+
+    # User profile read model settings
+    USER_PROFILES_ENABLED: bool = False
+    USER_PROFILES_CHECK_BATCH_SIZE: int = 1000
 
     # JWT settings
     ACCESS_TOKEN_EXPIRES_IN: int
@@ -28,5 +84,50 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str
     JWT_PRIVATE_KEY: str
     JWT_PUBLIC_KEY: str
+    JWT_KEY_ID: Optional[str] = None
+    JWT_PREVIOUS_PUBLIC_KEYS: dict = {}
+    JWT_VERIFY_CACHE_SIZE: int = 10000
+    JWT_VERIFY_CACHE_TTL: int = 60
+
+    # Password hashing settings
+    PASSWORD_POOL_SIZE: int = 2
+    PASSWORD_POOL_QUEUE_SIZE: int = 64
+
+    # Auth cache settings
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL: int = 30
+
+    # Email filter settings
+    EMAIL_FILTER_ENABLED: bool = False
+    EMAIL_FILTER_CAPACITY: int = 1000000
+    EMAIL_FILTER_ERROR_RATE: float = 0.001
+
+    # Token denylist settings
+    DENYLIST_BACKEND: str = "memory"
+    DENYLIST_SQLITE_PATH: str = "denylist.sqlite3"
+    DENYLIST_SYNC_INTERVAL: int = 5
+    DENYLIST_SYNC_OVERLAP: float = 1
+    DENYLIST_REBUILD_INTERVAL: int = 600
+    DENYLIST_BLOOM_CAPACITY: int = 100000
+    DENYLIST_BLOOM_ERROR_RATE: float = 0.001
+
+    # Rate limit settings
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMIT_TRUST_FORWARDED: bool = False
+    RATE_LIMIT_TRUSTED_HOPS: int = 1
+    RATE_LIMIT_IP_BURST: int = 20
+    RATE_LIMIT_IP_PER_MINUTE: float = 30
+    RATE_LIMIT_EMAIL_BURST: int = 5
+    RATE_LIMIT_EMAIL_PER_MINUTE: float = 6
+    LOGIN_LOCKOUT_THRESHOLD: int = 5
+    LOGIN_LOCKOUT_SECONDS: int = 30
+    LOGIN_LOCKOUT_MAX_SECONDS: int = 3600
+    LOGIN_FAILURE_WINDOW: int = 900
+
+    # Metrics settings
+    METRICS_ENABLED: bool = True
+    MONGO_METRICS_BYTES: bool = True
 
 settings = Settings()
@@ -0,0 +1,48 @@
+import os
+import base64
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+def pem_keys():
+    """
+    Generate a throwaway RS256 key pair, base64 encoded like the settings expect.
+    """
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public = key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    return base64.b64encode(private).decode(), base64.b64encode(public).decode()
+
+
+PRIVATE_KEY, PUBLIC_KEY = pem_keys()
+
+os.environ.update({
+    "MONGO_DRIVER": "memory",
+    "PASSWORD_POOL_SIZE": "0",
+    "RATE_LIMIT_ENABLED": "false",
+    "LOG_LEVEL": "WARNING",
+})
+for name, value in {
+    "APP_NAME": "luck-bank",
+    "APP_DESCRIPTION": "tests",
+    "CORS_ORIGINS": '["*"]',
+    "DEBUG": "false",
+    "MONGO_URL": "mongodb://localhost:27017",
+    "MONGO_SSL": "false",
+    "PATH_CERT": "",
+    "DATABASE_ENVIRONMENT": "tests",
+    "ACCESS_TOKEN_EXPIRES_IN": "15",
+    "REFRESH_TOKEN_EXPIRES_IN": "60",
+    "JWT_ALGORITHM": "RS256",
+    "JWT_PRIVATE_KEY": PRIVATE_KEY,
+    "JWT_PUBLIC_KEY": PUBLIC_KEY,
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,78 @@
+import os
+import uuid
+import random
+import asyncio
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from database.base import connect, disconnect
+from services.account_numbers import AccountNumberAllocator, check_digit
+
+
+TEST_MONGO_URL = os.environ.get("TEST_MONGO_URL")
+
+
+@pytest.mark.parametrize("number, digit", [(1000, 6), (12345678, 9), (100000, 4), (4, 3)])
+def test_check_digit(number, digit):
+    assert check_digit(number) == digit
+
+
+@pytest.mark.parametrize("block_sizes", [(1, 1, 1), (1, 7, 50), (100, 100, 100, 100)])
+def test_concurrent_workers_never_share_a_number(block_sizes):
+    async def scenario():
+        await connect()
+        try:
+            workers = [AccountNumberAllocator("0001", block_size, start=1000) for block_size in block_sizes]
+            calls = [
+                workers[index % len(workers)].allocate(random.randint(1, 12))
+                for index in range(200)
+            ]
+            return [pair for numbers in await asyncio.gather(*calls) for pair in numbers]
+
+        finally:
+            disconnect()
+
+    allocated = asyncio.run(scenario())
+    numbers = [number for number, _ in allocated]
+
+    assert len(numbers) == len(set(numbers))
+    assert min(numbers) >= 1000
+    assert all(digit == check_digit(number) for number, digit in allocated)
+
+
+def allocate_in_worker(agency, block_size, calls):
+    """
+    One worker process allocating concurrently from the shared counter.
+    """
+    async def allocate():
+        allocator = AccountNumberAllocator(agency, block_size, start=1000)
+        try:
+            numbers = await asyncio.gather(*(allocator.allocate(random.randint(1, 12)) for _ in range(calls)))
+            return [pair for pairs in numbers for pair in pairs]
+
+        finally:
+            disconnect()
+
+    return asyncio.run(allocate())
+
+
+@pytest.mark.skipif(not TEST_MONGO_URL, reason="workers share the counter on a real MongoDB, set TEST_MONGO_URL")
+def test_worker_processes_never_share_a_number(monkeypatch):
+    monkeypatch.setenv("MONGO_DRIVER", "motor")
+    monkeypatch.setenv("MONGO_URL", TEST_MONGO_URL)
+    monkeypatch.setenv("MONGO_SSL", "false")
+    monkeypatch.setenv("DATABASE_ENVIRONMENT", "luck_bank_allocation_tests")
+
+    agency = uuid.uuid4().hex[:8]
+    block_sizes = [1, 1, 7, 50, 100, 100]
+    with ProcessPoolExecutor(len(block_sizes), mp_context=multiprocessing.get_context("spawn")) as pool:
+        workers = [pool.submit(allocate_in_worker, agency, block_size, 100) for block_size in block_sizes]
+        allocated = [pair for worker in workers for pair in worker.result()]
+
+    numbers = [number for number, _ in allocated]
+    assert len(numbers) == len(set(numbers))
+    assert min(numbers) >= 1000
+    assert all(digit == check_digit(number) for number, digit in allocated)
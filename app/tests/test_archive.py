@@ -0,0 +1,66 @@
+import asyncio
+
+from datetime import datetime, timedelta
+
+from database import database, Collections
+from database.base import connect, disconnect
+from database.archive import acquire_lease, archive_collection, unarchive
+from database.indexes import create_indexes
+
+
+def run(scenario):
+    async def connected():
+        await connect()
+        try:
+            return await scenario()
+
+        finally:
+            disconnect()
+
+    return asyncio.run(connected())
+
+
+def test_one_worker_holds_the_lease():
+    async def scenario():
+        assert await acquire_lease("archiver", "worker-1", 60)
+        assert not await acquire_lease("archiver", "worker-2", 60)
+        assert await acquire_lease("archiver", "worker-1", 60)
+
+        await database[Collections.LOCKS].update_one(
+            {"_id": "archiver"}, {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+        )
+        assert await acquire_lease("archiver", "worker-2", 60)
+
+    run(scenario)
+
+
+def test_only_rows_deleted_before_the_cutoff_are_archived():
+    async def scenario():
+        now = datetime.now()
+        await database[Collections.USER_ADDRESSES].insert_many([
+            {"id": "live", "user_id": "u1", "deleted_at": ""},
+            {"id": "recent", "user_id": "u1", "deleted_at": now},
+            {"id": "old", "user_id": "u1", "deleted_at": now - timedelta(days=40)},
+        ])
+
+        assert await archive_collection(Collections.USER_ADDRESSES, now - timedelta(days=30)) == 1
+        assert set(await database[Collections.USER_ADDRESSES].distinct("id")) == {"live", "recent"}
+        assert await database[Collections.USER_ADDRESSES_ARCHIVE].distinct("id") == ["old"]
+
+    run(scenario)
+
+
+def test_concurrent_restore_returns_the_restored_row():
+    async def scenario():
+        await create_indexes(database)
+        deleted = {"id": "a1", "user_id": "u1", "street": "s", "deleted_at": datetime.now() - timedelta(days=40)}
+        await database[Collections.USER_ADDRESSES_ARCHIVE].insert_one(dict(deleted))
+        await database[Collections.USER_ADDRESSES].insert_one({**deleted, "deleted_at": "", "restored_by": "other"})
+
+        row = await unarchive(Collections.USER_ADDRESSES, {"id": "a1"})
+
+        assert row["restored_by"] == "other"
+        assert await database[Collections.USER_ADDRESSES].count_documents({"id": "a1"}) == 1
+        assert await database[Collections.USER_ADDRESSES_ARCHIVE].count_documents({}) == 0
+
+    run(scenario)
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from pymongo.errors import DuplicateKeyError
+
+from fastapi.testclient import TestClient
+
+from main import app
+from database.controllers.user import is_duplicate_email
+
+
+USER = {
+    "first_name": "luck",
+    "last_name": "bank",
+    "email": "luck@bank.com",
+    "password": "Str0ng!Passw0rd",
+    "confirm_password": "Str0ng!Passw0rd",
+    "phone": "5511999999999",
+    "documents": [{"document_type": "PASSPORT", "document_number": "P1"}],
+    "address": [{
+        "street": "paulista avenue",
+        "number": "1000",
+        "neighborhood": "bela vista",
+        "city": "sao paulo",
+        "state": "sp",
+        "country": "brazil",
+        "zip_code": "01310-100",
+    }],
+    "accounts": [{"account_type": "CHECKING"}],
+}
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def test_register_and_login(client):
+    response = client.post("/register/", json=USER)
+    assert response.status_code == 201
+
+    response = client.post("/login/", json={"email": USER["email"], "password": USER["password"]})
+    assert response.status_code == 200
+    assert response.json()["token_type"] == "bearer"
+    assert response.json()["access_token"]
+    assert response.json()["refresh_token"]
+
+
+def test_register_rejects_registered_email(client):
+    assert client.post("/register/", json=USER).status_code == 201
+
+    response = client.post("/register/", json=USER)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "email already exists in database"
+
+
+def test_login_rejects_wrong_password(client):
+    assert client.post("/register/", json=USER).status_code == 201
+
+    response = client.post("/login/", json={"email": USER["email"], "password": "Wr0ng!Passw0rd"})
+    assert response.status_code == 401
+
+
+def test_unverified_user_is_rejected(client):
+    assert client.post("/register/", json=USER).status_code == 201
+    token = client.post("/login/", json={"email": USER["email"], "password": USER["password"]}).json()["access_token"]
+
+    response = client.get("/user_details/", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Please verify your account"
+
+
+def test_refresh_and_logout(client):
+    assert client.post("/register/", json=USER).status_code == 201
+    tokens = client.post("/login/", json={"email": USER["email"], "password": USER["password"]}).json()
+    headers = {"Authorization": f"Bearer {tokens['refresh_token']}"}
+
+    response = client.post("/refresh/", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["access_token"]
+
+    response = client.post("/logout/", headers=headers)
+    assert response.status_code == 200
+
+
+def test_only_the_email_index_means_a_registered_email():
+    email = DuplicateKeyError("E11000", 11000, {"keyPattern": {"email": 1}})
+    account = DuplicateKeyError("E11000", 11000, {"keyPattern": {"agency": 1, "account_number": 1}})
+
+    assert asyncio.run(is_duplicate_email(email, USER["email"])) is True
+    assert asyncio.run(is_duplicate_email(account, USER["email"])) is False
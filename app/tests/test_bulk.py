@@ -0,0 +1,45 @@
+import pytest
+
+from fastapi.testclient import TestClient
+
+from main import app
+from settings import settings
+
+from database import Collections
+from database.base import get_sync_database
+
+from tests.test_auth import USER
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", "admin-key")
+    with TestClient(app) as client:
+        yield client
+
+
+def test_bulk_rejects_user_tokens(client):
+    assert client.post("/register/", json=USER).status_code == 201
+    token = client.post("/login/", json={"email": USER["email"], "password": USER["password"]}).json()["access_token"]
+
+    response = client.post("/bulk/accounts", json={"items": []}, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Invalid admin key"
+
+
+def test_bulk_accepts_the_admin_key(client):
+    assert client.post("/register/", json=USER).status_code == 201
+    user_id = get_sync_database()[Collections.USERS].find_one({"email": USER["email"]})["id"]
+
+    response = client.post(
+        "/bulk/accounts",
+        json={"items": [{"user_id": user_id, "account_type": "SAVINGS"}]},
+        headers={"X-Admin-Key": "admin-key"},
+    )
+    assert response.status_code == 201
+    result, = response.json()["results"]
+    assert result["status"] == 201
+
+    account = get_sync_database()[Collections.USER_BANK_ACCOUNTS].find_one({"id": result["id"]})
+    assert account["user_id"] == user_id
+    assert account["account_type"] == "SAVINGS"
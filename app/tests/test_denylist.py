@@ -0,0 +1,72 @@
+import asyncio
+
+from time import time
+
+import pytest
+
+from services.denylist import MemoryDenylist, DenylistLookupNeeded
+
+
+@pytest.fixture
+def store():
+    return MemoryDenylist(sync_interval=60, sync_overlap=1, rebuild_interval=600, bloom_capacity=1000, bloom_error_rate=0.01)
+
+
+def test_unknown_token_is_accepted_from_memory(store):
+    assert store.contains("unknown") is False
+    assert store.stats()["bloom_skips"] == 1
+
+
+def test_revoked_token_is_rejected(store):
+    store.add("revoked", time() + 60)
+    assert store.contains("revoked") is True
+    assert store.stats()["lookups"] == 0
+
+
+def test_sync_pulls_revocations_of_other_workers(store):
+    store._add("elsewhere", time() + 60, time())
+    assert store.contains("elsewhere") is False
+
+    store.sync()
+    assert store.contains("elsewhere") is True
+
+
+def test_filter_hit_is_confirmed_once(store):
+    store._bloom.add("false-positive")
+    with pytest.raises(DenylistLookupNeeded):
+        store.contains("false-positive")
+
+    assert asyncio.run(store.confirm("false-positive")) is False
+    assert store.contains("false-positive") is False
+    assert store.stats()["lookups"] == 1
+
+
+def test_sync_thread_stops(store):
+    store.start()
+    store.stop()
+    assert store._thread is None
+
+
+def test_sync_does_not_depend_on_the_worker_clock(monkeypatch):
+    import services.denylist as module
+
+    from database.base import connect, disconnect
+
+    asyncio.run(connect())
+    try:
+        reader = module.MongoDenylist(sync_interval=60, sync_overlap=1, rebuild_interval=600, bloom_capacity=1000, bloom_error_rate=0.01)
+        writer = module.MongoDenylist(sync_interval=60, sync_overlap=1, rebuild_interval=600, bloom_capacity=1000, bloom_error_rate=0.01)
+        writer.add("first", time() + 3600)
+        reader.sync()
+
+        ahead = time() + 600
+        monkeypatch.setattr(module, "time", lambda: ahead)
+        reader.sync()
+        monkeypatch.undo()
+
+        writer.add("second", time() + 3600)
+        reader.sync()
+        assert reader.contains("second") is True
+
+    finally:
+        disconnect()
@@ -0,0 +1,63 @@
+import copy
+import asyncio
+
+from database import database, Collections
+from database.base import connect, disconnect
+from database.importer import UserImporter
+
+from tests.test_auth import USER
+
+
+def user_row(email, document_number):
+    row = copy.deepcopy(USER)
+    row["email"] = email
+    row["documents"][0]["document_number"] = document_number
+    return row
+
+
+async def rows(*items):
+    for number, row in enumerate(items, start=1):
+        yield number, row
+
+
+def test_user_with_failed_children_is_removed():
+    async def scenario():
+        await connect()
+        try:
+            documents = database[Collections.USER_DOCUMENTS]
+            await documents.create_index("document_number", unique=True)
+            await documents.insert_one({"user_id": "other", "document_number": "TAKEN", "deleted_at": ""})
+
+            importer = UserImporter(chunk_size=10, hash_workers=0)
+            summary = await importer.run(rows(user_row("ok@bank.com", "FREE"), user_row("ko@bank.com", "TAKEN")))
+
+            assert summary["imported"] == 1
+            assert summary["failed"] == 1
+            assert importer.errors[0]["row"] == 2
+            assert await database[Collections.USERS].count_documents({"email": "ko@bank.com"}) == 0
+
+            user_ids = set(await database[Collections.USERS].distinct("id"))
+            for collection in (Collections.USER_ADDRESSES, Collections.USER_BANK_ACCOUNTS):
+                assert set(await database[collection].distinct("user_id")) == user_ids
+            assert set(await documents.distinct("user_id")) == user_ids | {"other"}
+
+        finally:
+            disconnect()
+
+    asyncio.run(scenario())
+
+
+def test_failed_rows_kept_are_capped():
+    async def scenario():
+        await connect()
+        try:
+            importer = UserImporter(chunk_size=10, hash_workers=0, max_errors=2)
+            summary = await importer.run(rows(*({"email": "not-an-email"} for _ in range(5))))
+
+            assert summary["failed"] == 5
+            assert [error["row"] for error in importer.errors] == [1, 2]
+
+        finally:
+            disconnect()
+
+    asyncio.run(scenario())
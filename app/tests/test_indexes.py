@@ -0,0 +1,40 @@
+import os
+import asyncio
+
+import pytest
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from database.collections import Collections
+from database.indexes import create_indexes, _stages
+
+
+TEST_MONGO_URL = os.environ.get("TEST_MONGO_URL")
+
+HOT_QUERIES = [
+    (Collections.USERS, {"email": "luck@bank.com"}, None),
+    (Collections.USER_BANK_ACCOUNTS, {"user_id": "u1", "deleted_at": ""}, {"created_at": 1, "id": 1}),
+    (Collections.USER_ADDRESSES, {"user_id": "u1", "deleted_at": ""}, {"created_at": 1, "id": 1}),
+    (Collections.USER_DOCUMENTS, {"user_id": "u1", "deleted_at": ""}, {"created_at": 1, "id": 1}),
+    (Collections.USER_BANK_ACCOUNTS, {"agency": "0001", "account_number": 1000}, None),
+]
+
+
+@pytest.mark.skipif(not TEST_MONGO_URL, reason="explain needs a real MongoDB, set TEST_MONGO_URL")
+@pytest.mark.parametrize("collection, query, sort", HOT_QUERIES)
+def test_hot_query_uses_an_index(collection, query, sort):
+    async def explain():
+        client = AsyncIOMotorClient(TEST_MONGO_URL)
+        database = client["luck_bank_explain_tests"]
+        try:
+            await create_indexes(database)
+            command = {"find": collection.value, "filter": query}
+            if sort:
+                command["sort"] = sort
+            return await database.command("explain", command, verbosity="queryPlanner")
+
+        finally:
+            client.close()
+
+    plan = asyncio.run(explain())["queryPlanner"]["winningPlan"]
+    assert "COLLSCAN" not in _stages(plan.get("queryPlan", plan))
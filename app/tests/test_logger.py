@@ -0,0 +1,26 @@
+import logging
+
+from utils.logger import Logger, LogPipeline
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_record_points_at_the_caller():
+    capture = Capture()
+    logger = Logger.init("tests.logger")
+    LogPipeline.root.addHandler(capture)
+    try:
+        logger.warning("caller")
+
+    finally:
+        LogPipeline.root.removeHandler(capture)
+
+    assert capture.records[-1].filename == "test_logger.py"
+    assert capture.records[-1].funcName == "test_record_points_at_the_caller"
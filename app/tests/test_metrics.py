@@ -0,0 +1,20 @@
+from fastapi.testclient import TestClient
+
+from main import app
+from settings import settings
+
+
+def test_metrics_require_the_admin_key(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", "admin-key")
+    with TestClient(app) as client:
+        assert client.get("/metrics").status_code == 401
+
+        response = client.get("/metrics", headers={"X-Admin-Key": "admin-key"})
+        assert response.status_code == 200
+        assert "denylist_bloom_items" in response.text
+
+
+def test_metrics_are_hidden_without_an_admin_key(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", None)
+    with TestClient(app) as client:
+        assert client.get("/metrics").status_code == 404
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from models.users.users_address_model import Address
+
+
+ADDRESS = {
+    "user_id": "u1",
+    "street": "paulista avenue",
+    "number": "1000",
+    "neighborhood": "bela vista",
+    "city": "sao paulo",
+    "state": "sp",
+    "country": "brazil",
+    "zip_code": "01310-100",
+}
+
+
+def test_new_record_has_one_timestamp():
+    address = Address(**ADDRESS)
+    assert address.updated_at == address.created_at
+    assert address.id
+
+
+def test_given_timestamps_are_kept():
+    created_at, updated_at = datetime(2023, 1, 1), datetime(2023, 2, 1)
+    address = Address(**ADDRESS, created_at=created_at, updated_at=updated_at)
+    assert (address.created_at, address.updated_at) == (created_at, updated_at)
@@ -0,0 +1,21 @@
+import asyncio
+
+from services.password import PasswordPool
+
+
+def test_broken_pool_is_replaced():
+    async def scenario():
+        pool = PasswordPool(max_workers=1, max_pending=10)
+        try:
+            hashed = await pool.get_password_hash("Str0ng!Passw0rd")
+            for process in list(pool._executor._processes.values()):
+                process.kill()
+            await asyncio.sleep(0.5)
+
+            assert await pool.verify_password("Str0ng!Passw0rd", hashed)
+            assert pool.restarts == 1
+
+        finally:
+            pool.shutdown(wait=True)
+
+    asyncio.run(scenario())
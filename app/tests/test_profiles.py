@@ -0,0 +1,95 @@
+import asyncio
+
+from database import database, Collections
+from database.base import connect, disconnect
+from database.indexes import create_indexes
+from database.profiles import UserProfiles, PROFILE_USER_FIELDS, build_profile
+
+
+def run(scenario):
+    async def connected():
+        await connect()
+        await create_indexes(database)
+        try:
+            return await scenario()
+
+        finally:
+            disconnect()
+
+    return asyncio.run(connected())
+
+
+async def insert_user(user_id, first_name):
+    await database[Collections.USERS].insert_one(
+        {field: "" for field in PROFILE_USER_FIELDS} | {"id": user_id, "first_name": first_name}
+    )
+
+
+def test_older_snapshot_does_not_overwrite_a_newer_one():
+    async def scenario():
+        profiles = UserProfiles(enabled=True)
+        await insert_user("u1", "old")
+
+        old_version = await profiles.next_sequence("u1")
+        old = await build_profile("u1")
+
+        await database[Collections.USERS].update_one({"id": "u1"}, {"$set": {"first_name": "new"}})
+        new_version = await profiles.next_sequence("u1")
+        await profiles.store(await build_profile("u1"), new_version)
+
+        await profiles.store(old, old_version)
+
+        assert (await profiles.get("u1"))["first_name"] == "new"
+        assert profiles.stats()["superseded"] == 1
+
+    run(scenario)
+
+
+def test_refresh_replaces_the_stored_profile():
+    async def scenario():
+        profiles = UserProfiles(enabled=True)
+        await insert_user("u1", "old")
+        assert (await profiles.get("u1"))["first_name"] == "old"
+
+        await database[Collections.USERS].update_one({"id": "u1"}, {"$set": {"first_name": "new"}})
+        await profiles.set_fields("u1", {"first_name": "new"})
+
+        profile = await profiles.get("u1")
+        assert profile["first_name"] == "new"
+        assert "version" not in profile
+
+    run(scenario)
+
+
+def test_superseded_store_keeps_the_user_stale():
+    async def scenario():
+        profiles = UserProfiles(enabled=True)
+        await insert_user("u1", "old")
+        old_version = await profiles.next_sequence("u1")
+        old = await build_profile("u1")
+
+        profiles._stale["u1"] = stale = object()
+        await profiles.store(await build_profile("u1"), await profiles.next_sequence("u1"))
+        await profiles.store(old, old_version, stale)
+
+        assert profiles.stats()["superseded"] == 1
+        assert profiles.stats()["stale"] == 1
+
+    run(scenario)
+
+
+def test_store_started_before_the_failure_keeps_the_user_stale():
+    async def scenario():
+        profiles = UserProfiles(enabled=True)
+        await insert_user("u1", "old")
+        version = await profiles.next_sequence("u1")
+        profile = await build_profile("u1")
+
+        profiles._stale["u1"] = object()
+        await profiles.store(profile, version)
+        assert profiles.stats()["stale"] == 1
+
+        assert (await profiles.get("u1"))["first_name"] == "old"
+        assert profiles.stats()["stale"] == 0
+
+    run(scenario)
@@ -0,0 +1,28 @@
+import pytest
+
+from settings import settings
+from services.rate_limit import client_ip
+
+
+def scope(forwarded):
+    return {"headers": [(b"x-forwarded-for", forwarded.encode())], "client": ("10.0.0.1", 5000)}
+
+
+@pytest.fixture(autouse=True)
+def trust_forwarded(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUST_FORWARDED", True)
+
+
+def test_spoofed_hops_are_ignored(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUSTED_HOPS", 1)
+    assert client_ip(scope("6.6.6.6, 203.0.113.7")) == "203.0.113.7"
+
+
+def test_trusted_hops_count_from_the_right(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUSTED_HOPS", 2)
+    assert client_ip(scope("6.6.6.6, 203.0.113.7, 10.0.0.2")) == "203.0.113.7"
+
+
+def test_short_header_falls_back_to_the_peer(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUSTED_HOPS", 2)
+    assert client_ip(scope("203.0.113.7")) == "10.0.0.1"
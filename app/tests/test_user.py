@@ -0,0 +1,45 @@
+import pytest
+
+from fastapi.testclient import TestClient
+
+from main import app
+
+from database import Collections
+from database.base import get_sync_database
+
+import database.profiles as profiles
+
+from tests.test_auth import USER
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def test_user_etag_reads_the_profile_once(client, monkeypatch):
+    assert client.post("/register/", json=USER).status_code == 201
+    users = get_sync_database()[Collections.USERS]
+    users.update_one({"email": USER["email"]}, {"$set": {"is_active": True}})
+    user_id = users.find_one({"email": USER["email"]})["id"]
+    token = client.post("/login/", json={"email": USER["email"], "password": USER["password"]}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    builds = []
+    build_profile = profiles.build_profile
+
+    async def counted(*args, **kwargs):
+        builds.append(args)
+        return await build_profile(*args, **kwargs)
+
+    monkeypatch.setattr(profiles, "build_profile", counted)
+
+    response = client.get(f"/users/{user_id}/", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["id"] == user_id
+    assert len(builds) == 1
+
+    response = client.get(f"/users/{user_id}/", headers={**headers, "If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+    assert len(builds) == 2
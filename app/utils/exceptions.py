@@ -16,3 +16,7 @@ class AccountNotSalary(Exception):
 
 class ExistOneInDatabase(Exception):
     pass
+
+
+class MissingUniqueIndexes(Exception):
+    pass
@@ -0,0 +1,82 @@
+import hashlib
+
+import orjson
+
+from fastapi import Response, status
+
+from settings import settings
+
+from utils.responses import FastJSONResponse, default
+
+
+def make_etag(*parts):
+    """
+    Build a strong ETag from the values a representation is rendered from.
+    Args:
+        parts (Any): The ids, updated_at values and request parameters.
+    """
+    raw = orjson.dumps(parts, default=default, option=orjson.OPT_NON_STR_KEYS)
+    return f'"{hashlib.blake2b(raw, digest_size=16).hexdigest()}"'
+
+
+def page_etag(page, *parts):
+    """
+    Build the ETag of a page from the id and updated_at of its items.
+    Args:
+        page (dict): The page read with fields="updated_at".
+        parts (Any): The request parameters shaping the page.
+    """
+    return make_etag(
+        parts,
+        [(item["id"], item.get("updated_at")) for item in page["items"]],
+        page["next"],
+        page.get("count"),
+    )
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Weak comparison of If-None-Match with the current ETag, as RFC 9110 requires for GET.
+    Args:
+        if_none_match (str): The request header, None when absent.
+        etag (str): The current ETag.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def cache_control(request):
+    """
+    The Cache-Control policy of the matched route, CACHE_CONTROL is keyed by route path.
+    Args:
+        request (Request): The request.
+    """
+    route = request.scope.get("route")
+    return settings.CACHE_CONTROL.get(getattr(route, "path", None), settings.CACHE_CONTROL_DEFAULT)
+
+
+async def conditional_response(request, etag, build):
+    """
+    Answer 304 when If-None-Match matches the ETag, else build the full payload.
+    Args:
+        request (Request): The request.
+        etag (str): The current ETag, None skips validation.
+        build (Callable): Coroutine function returning the response content.
+    """
+    headers = {"Cache-Control": cache_control(request)}
+    if etag is not None:
+        headers["ETag"] = etag
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    content = await build()
+    if content is None:
+        headers.pop("ETag", None)
+
+    return FastJSONResponse(status_code=status.HTTP_200_OK, content=content, headers=headers)
@@ -0,0 +1,58 @@
+import os
+import threading
+
+from time import time_ns
+from uuid import UUID
+
+
+_lock = threading.Lock()
+_last_ms = 0
+_sequence = 0
+
+SEQUENCE_MASK = 0xFFF
+
+
+def uuid7():
+    """
+    Time-ordered UUID version 7: 48 bits of unix milliseconds, a 12 bit
+    sequence and 62 random bits. Ids made by one process are strictly
+    increasing, even within the same millisecond.
+    Returns:
+        UUID: The new id.
+    """
+    global _last_ms, _sequence
+
+    random_bits = int.from_bytes(os.urandom(8), "big") & 0x3FFFFFFFFFFFFFFF
+    with _lock:
+        timestamp = time_ns() // 1_000_000
+        if timestamp > _last_ms:
+            _last_ms = timestamp
+            _sequence = random_bits >> 52 & 0x3FF
+        else:
+            _sequence += 1
+            if _sequence > SEQUENCE_MASK:
+                _last_ms += 1
+                _sequence = 0
+        timestamp, sequence = _last_ms, _sequence
+
+    value = timestamp << 80 | 0x7 << 76 | sequence << 64 | 0b10 << 62 | random_bits
+    return UUID(int=value)
+
+
+def new_id():
+    """
+    New document id as stored in the id field.
+    """
+    return str(uuid7())
+
+
+def id_timestamp(document_id):
+    """
+    Unix milliseconds of a time-ordered id, None for older uuid4 ids.
+    Args:
+        document_id (str): The document id.
+    """
+    value = UUID(document_id)
+    if value.version != 7:
+        return None
+    return value.int >> 80
@@ -1,5 +1,17 @@
+import os
+import sys
+import queue
+import atexit
+import random
 import logging
 
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+import orjson
+
+from settings import settings
+
 
 class EndpointFilter(logging.Filter):
     def filter(self, record: logging.LogRecord) -> bool:
@@ -7,31 +19,160 @@ class EndpointFilter(logging.Filter):
 
 
 logging.getLogger("uvicorn.access").addFilter(EndpointFilter())
-logger = logging.getLogger("app")
-logger.setLevel(logging.DEBUG)
-consoleHandler = logging.StreamHandler()
-consoleHandler.setLevel(logging.DEBUG)
-consoleHandler.setFormatter(logging.Formatter(fmt="%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
-logger.addHandler(consoleHandler)
 
 
-class Logger:
-    _instance = None
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line, rendered with orjson in the listener thread.
+    """
+    def format(self, record):
+        log = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "pid": record.process,
+        }
+        if record.exc_text:
+            log["exception"] = record.exc_text
+        return orjson.dumps(log).decode("utf-8")
+
+
+class Sampler:
+    """
+    Keeps a fraction of the INFO and DEBUG records, warnings and errors always pass.
+    The rate can be changed while running, per logger name or for every logger.
+    Args:
+        rate (float): Fraction of the records kept, 1 keeps everything.
+    """
+    def __init__(self, rate=1.0):
+        self.rate = rate
+        self.rates = {}
+        self.dropped = 0
+
+    def keep(self, name):
+        rate = self.rates.get(name, self.rate)
+        if rate >= 1 or random.random() < rate:
+            return True
+
+        self.dropped += 1
+        return False
+
+
+class SampledLogger(logging.LoggerAdapter):
+    """
+    Logger asking the sampler before the record is built, so a dropped
+    record costs a level check and a random draw. The record points at the
+    caller of the adapter, not at the adapter.
+    """
+    def __init__(self, logger, sampler):
+        super().__init__(logger, {})
+        self.sampler = sampler
+
+    def log(self, level, msg, *args, **kwargs):
+        if self.logger.isEnabledFor(level) and (level >= logging.WARNING or self.sampler.keep(self.logger.name)):
+            kwargs["stacklevel"] = kwargs.get("stacklevel", 1) + 1
+            self.logger.log(level, msg, *args, **kwargs)
+
+
+class AsyncQueueHandler(QueueHandler):
+    """
+    Queue handler leaving the formatting and the write to the listener thread.
+    Only the message is merged here so mutable arguments are captured as logged.
+    It is the only handler of the app records, so they are not copied.
+    """
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
 
-    def __init__(self) -> None:
-        self.logger = None
+
+class LogPipeline:
+    """
+    Sends the app records through a queue to a background thread writing them,
+    so request handlers never block on the stream.
+    Every app logger is a child of the "app" logger holding the queue handler.
+    The app starts it in its lifespan and the command line tools in their main.
+    """
+    root = logging.getLogger("app")
+    sampler = Sampler(settings.LOG_SAMPLE_RATE)
+    handler = None
+    listener = None
+    pid = None
+
+    @classmethod
+    def start(cls):
+        """
+        Start the listener thread of this process, once.
+        """
+        if cls.listener is not None and cls.pid == os.getpid():
+            return
+
+        stream = logging.StreamHandler(sys.stderr)
+        stream.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+
+        if cls.handler is not None:
+            cls.root.removeHandler(cls.handler)
+
+        log_queue = queue.SimpleQueue()
+        cls.handler = AsyncQueueHandler(log_queue)
+        cls.root.addHandler(cls.handler)
+        cls.root.setLevel(settings.LOG_LEVEL)
+        cls.root.propagate = False
+
+        cls.listener = QueueListener(log_queue, stream, respect_handler_level=True)
+        cls.listener.start()
+        cls.pid = os.getpid()
 
     @classmethod
-    def init(cls, name: str):
-        if cls._instance is not None:
-            return cls._instance.logger
-        logger = logging.getLogger(name)
-        logger.setLevel(logging.DEBUG)
-        ch = logging.StreamHandler()
-        ch.setLevel(logging.DEBUG)
-        formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-        ch.setFormatter(formatter)
-        logger.addHandler(ch)
-        cls.logger = logger
-        cls._instance = cls
-        return logger
+    def stop(cls):
+        """
+        Flush the queued records and stop the listener thread.
+        """
+        if cls.listener is not None and cls.pid == os.getpid():
+            cls.listener.stop()
+        cls.listener = None
+
+
+atexit.register(LogPipeline.stop)
+
+
+class Logger:
+    @staticmethod
+    def init(name: str):
+        """
+        Get the logger of a module, pass __name__.
+        Args:
+            name (str): The module name.
+        """
+        return SampledLogger(LogPipeline.root.getChild(name), LogPipeline.sampler)
+
+    @staticmethod
+    def set_level(level, name=None):
+        """
+        Change the level of every app logger, or of one module, while running.
+        Args:
+            level (str): The level name, like INFO.
+            name (str): The module name, None changes every logger.
+        """
+        logger = LogPipeline.root.getChild(name) if name else LogPipeline.root
+        logger.setLevel(level)
+
+    @staticmethod
+    def set_sample_rate(rate, name=None):
+        """
+        Change the fraction of INFO and DEBUG records kept while running.
+        Args:
+            rate (float): Fraction kept, 1 keeps everything.
+            name (str): The module name, None changes the default rate.
+        """
+        if name:
+            LogPipeline.sampler.rates[LogPipeline.root.getChild(name).name] = rate
+        else:
+            LogPipeline.sampler.rate = rate
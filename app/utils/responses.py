@@ -0,0 +1,49 @@
+import orjson
+
+from pydantic import BaseModel
+
+from fastapi.responses import JSONResponse
+
+
+def default(value):
+    """
+    Encode the types orjson does not handle natively.
+    datetime, enum and UUID values are encoded by orjson itself.
+    Args:
+        value (Any): The value to encode.
+    """
+    if isinstance(value, BaseModel):
+        return value.dict()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson, skipping jsonable_encoder.
+    Args:
+        JSONResponse (Response): The starlette JSON response.
+    """
+    def render(self, content):
+        return orjson.dumps(content, default=default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def batch_response(message, results):
+    """
+    Answer a batch request with one result per item.
+    201 when every item was written, 207 when some of them failed.
+    Args:
+        message (str): The response message.
+        results (list): The item results, each with its status.
+    """
+    failed = sum(1 for result in results if result["status"] >= 300)
+    return FastJSONResponse(
+        status_code=207 if failed else 201,
+        content={
+            "message": message,
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "results": results,
+        }
+    )